@@ -1,4 +1,5 @@
 from alp.ai.learning_plan import LearningPlan, LearningPlanNode
+from alp.ai.plan_cache import PlanCache
 from alp.ai.service import AIService, OpenAIService
 
-__all__ = ["AIService", "OpenAIService", "LearningPlan", "LearningPlanNode"]
+__all__ = ["AIService", "OpenAIService", "LearningPlan", "LearningPlanNode", "PlanCache"]
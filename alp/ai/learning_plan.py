@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import re
 import textwrap
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
@@ -93,6 +94,31 @@ def extract_plan_json(text: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def _parse_node(node: Dict[str, Any], seen: set[str]) -> Optional[LearningPlanNode]:
+    """Clean one raw plan node; returns None for nameless nodes and names already in `seen`."""
+    name = (node.get("name") or "").strip()
+    if not name:
+        return None
+    lname = name.lower()
+    if lname in seen:
+        return None  # skip duplicate concept names
+    seen.add(lname)
+    # Difficulty: ensure int in range 1-4
+    diff = node.get("difficulty", 1)
+    try:
+        diff = int(diff)
+    except Exception:
+        diff = 1
+    diff = max(1, min(4, diff))
+    # Prerequisites: ensure list of clean strings
+    prereqs = node.get("prerequisites") or []
+    if not isinstance(prereqs, list):
+        prereqs = []
+    prereqs_clean = [p.strip() for p in prereqs if isinstance(p, str) and p.strip()]
+    summary = (node.get("summary") or "").strip()
+    return LearningPlanNode(name=name, summary=summary, difficulty=diff, prerequisites=prereqs_clean)
+
+
 def parse_plan_json(raw: Dict[str, Any]) -> LearningPlan:
     """
     Parse a raw JSON dict (from extract_plan_json) into a LearningPlan object,
@@ -102,25 +128,94 @@ def parse_plan_json(raw: Dict[str, Any]) -> LearningPlan:
     nodes_list: List[LearningPlanNode] = []
     seen: set[str] = set()
     for node in raw.get("nodes", []):
-        name = (node.get("name") or "").strip()
-        if not name:
-            continue
-        lname = name.lower()
-        if lname in seen:
-            continue  # skip duplicate concept names
-        seen.add(lname)
-        # Difficulty: ensure int in range 1-4
-        diff = node.get("difficulty", 1)
-        try:
-            diff = int(diff)
-        except Exception:
-            diff = 1
-        diff = max(1, min(4, diff))
-        # Prerequisites: ensure list of clean strings
-        prereqs = node.get("prerequisites") or []
-        if not isinstance(prereqs, list):
-            prereqs = []
-        prereqs_clean = [p.strip() for p in prereqs if isinstance(p, str) and p.strip()]
-        summary = (node.get("summary") or "").strip()
-        nodes_list.append(LearningPlanNode(name=name, summary=summary, difficulty=diff, prerequisites=prereqs_clean))
+        parsed = _parse_node(node, seen) if isinstance(node, dict) else None
+        if parsed:
+            nodes_list.append(parsed)
     return LearningPlan(root_topic=root, nodes=nodes_list)
+
+
+_NODES_START = re.compile(r'"nodes"\s*:\s*\[')
+_ROOT_TOPIC = re.compile(r'"(?:root_topic|topic)"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+class PlanStreamParser:
+    """
+    Incremental parser for a learning plan response that arrives in chunks (a streamed completion).
+    feed() returns the nodes whose JSON objects in the "nodes" array completed with that chunk,
+    cleaned like parse_plan_json; finish() returns the whole plan once the stream has ended.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0  # next character to scan
+        self._in_nodes = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._obj_start = 0
+        self._seen: set[str] = set()
+        self.root_topic: Optional[str] = None
+        self.nodes: List[LearningPlanNode] = []
+
+    def feed(self, chunk: str) -> List[LearningPlanNode]:
+        """Consume the next chunk of response text and return the nodes it completed."""
+        self._text += chunk
+        if self.root_topic is None:
+            m = _ROOT_TOPIC.search(self._text)
+            if m:
+                self.root_topic = json.loads(m.group(1)).strip()
+        if not self._in_nodes:
+            m = _NODES_START.search(self._text)
+            if not m:
+                return []
+            self._in_nodes = True
+            self._pos = m.end()
+        if self._done:
+            return []
+        completed: List[LearningPlanNode] = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    node = self._parse_object(text[self._obj_start:i + 1])
+                    if node:
+                        self.nodes.append(node)
+                        completed.append(node)
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                break
+        self._pos = len(text)
+        return completed
+
+    def _parse_object(self, raw: str) -> Optional[LearningPlanNode]:
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return _parse_node(data, self._seen) if isinstance(data, dict) else None
+
+    def finish(self) -> Optional[LearningPlan]:
+        """
+        Return the complete plan after the last chunk, or None if the response held no plan.
+        Falls back to parsing the full text when no node could be parsed incrementally.
+        """
+        if not self.nodes:
+            data = extract_plan_json(self._text)
+            return parse_plan_json(data) if data else None
+        return LearningPlan(root_topic=self.root_topic or "Unknown Topic", nodes=list(self.nodes))
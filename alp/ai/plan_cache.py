@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import copy
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from alp.ai.learning_plan import LearningPlan, parse_plan_json
+
+PLAN_CACHE_SIZE = int(os.getenv("ALP_PLAN_CACHE_SIZE", "512"))
+PLAN_CACHE_TTL = float(os.getenv("ALP_PLAN_CACHE_TTL", str(7 * 24 * 3600)))  # seconds; 0 disables expiry
+# Also keep plans in the application database so they survive restarts and are shared between processes
+PLAN_CACHE_PERSIST = os.getenv("ALP_PLAN_CACHE_PERSIST", "0") not in ("0", "false", "False")
+
+
+def plan_cache_key(topic: str, depth: int, style: str, max_nodes: int, known_samples: List[str]) -> str:
+    """
+    Hash the inputs of build_plan_prompt after normalizing them, so requests that would produce
+    equivalent prompts (case, surrounding whitespace, sample order) share one cache entry.
+    Only the known samples the prompt actually includes (the first 15) are part of the key.
+    """
+    def norm(s: str) -> str:
+        return " ".join(s.split()).casefold()
+
+    samples = sorted(norm(s) for s in (known_samples or [])[:15])
+    payload = json.dumps([norm(topic), int(depth), norm(style or ""), int(max_nodes), samples])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PlanStore(Protocol):
+    """Persistent tier behind the in-memory plan cache."""
+
+    def get(self, key: str, max_age: float) -> Optional[LearningPlan]: ...
+
+    def put(self, key: str, plan: LearningPlan) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class SQLitePlanStore:
+    """Stores plans as JSON in the plan_cache table of the application database."""
+
+    def get(self, key: str, max_age: float) -> Optional[LearningPlan]:
+        from alp.db.models import PlanCacheEntry
+        from alp.db.session import session_scope
+
+        with session_scope() as db:
+            entry = db.get(PlanCacheEntry, key)
+            if entry is None:
+                return None
+            if max_age and time.time() - entry.created_at > max_age:
+                db.delete(entry)
+                return None
+            return parse_plan_json(json.loads(entry.plan))
+
+    def put(self, key: str, plan: LearningPlan) -> None:
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        from alp.db.models import PlanCacheEntry
+        from alp.db.session import session_scope
+
+        values = {"key": key, "plan": json.dumps(dataclasses.asdict(plan)), "created_at": time.time()}
+        stmt = sqlite_insert(PlanCacheEntry).values(**values).on_conflict_do_update(
+            index_elements=[PlanCacheEntry.key],
+            set_={"plan": values["plan"], "created_at": values["created_at"]},
+        )
+        with session_scope() as db:
+            db.execute(stmt)
+
+    def clear(self) -> None:
+        from sqlalchemy import delete
+
+        from alp.db.models import PlanCacheEntry
+        from alp.db.session import session_scope
+
+        with session_scope() as db:
+            db.execute(delete(PlanCacheEntry))
+
+
+class PlanCache:
+    """
+    Content-addressed cache of generated learning plans (see plan_cache_key).
+    An in-memory LRU with a TTL sits in front of an optional persistent store; persistent hits
+    are promoted into memory. Callers always receive their own copy of a cached plan.
+    """
+
+    def __init__(self, max_entries: int = PLAN_CACHE_SIZE, ttl: float = PLAN_CACHE_TTL,
+                 store: Optional[PlanStore] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        # key -> (plan, time stored)
+        self._entries: OrderedDict[str, Tuple[LearningPlan, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return bool(self.ttl) and time.monotonic() - stored_at > self.ttl
+
+    def _remember(self, key: str, plan: LearningPlan) -> None:
+        self._entries[key] = (plan, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[LearningPlan]:
+        """Return a copy of the cached plan for the key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry[0])
+                del self._entries[key]
+        plan = self.store.get(key, self.ttl) if self.store is not None else None
+        with self._lock:
+            if plan is None:
+                self.misses += 1
+                return None
+            self.store_hits += 1
+            self._remember(key, plan)
+        return copy.deepcopy(plan)
+
+    def put(self, key: str, plan: LearningPlan) -> None:
+        """Cache a plan under the key (write-through to the persistent store, if any)."""
+        plan = copy.deepcopy(plan)
+        with self._lock:
+            self._remember(key, plan)
+        if self.store is not None:
+            self.store.put(key, plan)
+
+    def clear(self) -> None:
+        """Drop all cached plans (including the persistent tier) and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.store_hits = self.misses = self.evictions = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss/eviction counters, hit rate and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                "hits": self.hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.store_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+# Shared by every OpenAIService instance in this process unless one is given its own cache
+plan_cache = PlanCache(store=SQLitePlanStore() if PLAN_CACHE_PERSIST else None)
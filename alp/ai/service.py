@@ -1,18 +1,222 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import os
 import random
+import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, List
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterator, Optional, Dict, List, Tuple, TypeVar
 
-# Import learning plan structures for type hints
-from alp.ai.learning_plan import LearningPlan
-from alp.logging.config import get_logger
-from alp.logging.instrumentation import traced
+from alp.ai.learning_plan import (
+    LearningPlan, LearningPlanNode, PlanStreamParser, SYSTEM_INSTRUCTION, build_plan_prompt, extract_plan_json,
+    parse_plan_json,
+)
+from alp.ai.plan_cache import PlanCache, plan_cache as _shared_plan_cache, plan_cache_key
+from alp.logging.config import get_logger, lazy
+from alp.logging.instrumentation import record_llm_call, set_span_attributes, traced
+
+T = TypeVar("T")
 
 # Supported learning styles
 STYLES: List[str] = ["Visual", "Auditory", "Kinesthetic", "Analytical"]
 
+# HTTP connection pool shared by all OpenAIService instances using the same key/base URL
+OPENAI_MAX_CONNECTIONS = int(os.getenv("ALP_OPENAI_MAX_CONNECTIONS", "200"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("ALP_OPENAI_MAX_KEEPALIVE", "50"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("ALP_OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_HTTP2 = os.getenv("ALP_OPENAI_HTTP2", "1") not in ("0", "false", "False")
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("ALP_OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("ALP_OPENAI_MAX_RETRIES", "2"))
+# Per-call read timeouts (seconds): short classification prompts vs. full plan generation
+OPENAI_SHORT_TIMEOUT = float(os.getenv("ALP_OPENAI_SHORT_TIMEOUT", "15"))
+OPENAI_PLAN_TIMEOUT = float(os.getenv("ALP_OPENAI_PLAN_TIMEOUT", "60"))
+
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+# Async clients hold connections bound to an event loop, so they are shared per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+_http2_warned = False
+
+
+def _http2_available() -> bool:
+    global _http2_warned
+    try:
+        import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    except ImportError:
+        if not _http2_warned:
+            _http2_warned = True
+            get_logger("ai.openai").warning(
+                "openai.http2_unavailable",
+                detail="ALP_OPENAI_HTTP2 is on but the h2 package is missing (install httpx[http2]); using HTTP/1.1",
+            )
+        return False
+    return True
+
+
+def _client_options() -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        "http2": OPENAI_HTTP2 and _http2_available(),
+        "timeout": httpx.Timeout(OPENAI_PLAN_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    }
+
+
+def get_openai_client(openai: Any, api_key: str, base_url: Optional[str] = None) -> Any:
+    """
+    Return the process-wide OpenAI client for this key/base URL, creating it on first use.
+    The client owns a keep-alive connection pool and is safe to share across threads.
+    """
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            options = _client_options()
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=openai.DefaultHttpxClient(limits=options["limits"], http2=options["http2"]),
+                timeout=options["timeout"],
+                max_retries=OPENAI_MAX_RETRIES,
+            )
+            _clients[(api_key, base_url)] = client
+        return client
+
+
+def get_async_openai_client(openai: Any, api_key: str, base_url: Optional[str] = None) -> Any:
+    """Return the AsyncOpenAI client for this key/base URL on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get((api_key, base_url))
+        if client is None:
+            options = _client_options()
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=openai.DefaultAsyncHttpxClient(limits=options["limits"], http2=options["http2"]),
+                timeout=options["timeout"],
+                max_retries=OPENAI_MAX_RETRIES,
+            )
+            clients[(api_key, base_url)] = client
+        return client
+
+
+def _traced_prompt(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Record the prompt size on the current span (if recorded) and return the messages."""
+    set_span_attributes(lambda: {"llm.prompt_chars": sum(len(m["content"]) for m in messages),
+                                 "llm.messages": len(messages)})
+    return messages
+
+
+def _plan_attributes(plan: Optional[LearningPlan]) -> Dict[str, Any]:
+    return {"plan.nodes": len(plan.nodes) if plan else 0}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight, other callers
+    with the same key wait for it and receive (a copy of) its result instead of issuing their own.
+    Threads share calls through do(); coroutines on the same event loop share them through ado().
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run fn for the key, or wait for the call already in flight for it."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await fn() for the key, or the call already in flight for it on this event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            tasks = self._tasks.setdefault(loop, {})
+            task = tasks.get(key)
+            leader = task is None
+            if leader:
+                task = tasks[key] = loop.create_task(fn())
+                task.add_done_callback(lambda t: tasks.pop(key, None) if tasks.get(key) is t else None)
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        # Shielded so a cancelled waiter does not cancel the call the others are waiting on
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters of executed and coalesced calls, and the number currently in flight."""
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + sum(len(tasks) for tasks in self._tasks.values()),
+            }
+
+    def reset(self) -> None:
+        """Reset the counters (calls in flight are unaffected)."""
+        with self._lock:
+            self.executed = self.coalesced = 0
+
+
+# Identical LLM requests in flight anywhere in this process are issued once
+llm_single_flight = SingleFlight()
+
+
+def _parent_flight_key(title: str, content: str) -> Tuple[str, str]:
+    # Only the first 4000 characters of the content reach the prompt
+    digest = hashlib.sha256(f"{title}\0{content[:4000]}".encode("utf-8")).hexdigest()
+    return ("parent", digest)
+
 
 class AIService(ABC):
     """Abstract interface for AI-related operations (can be implemented by different AI providers)."""
@@ -41,61 +245,92 @@ class AIService(ABC):
         """
         ...
 
+    # Async variants; providers without a native async client run the sync method in a worker thread.
+    async def adetect_learning_style(self, answers: Dict[str, str], use_gpt: bool = False) -> str:
+        """Async variant of detect_learning_style."""
+        return await asyncio.to_thread(self.detect_learning_style, answers, use_gpt)
+
+    async def asuggest_parent_topic(self, title: str, content: str) -> Optional[str]:
+        """Async variant of suggest_parent_topic."""
+        return await asyncio.to_thread(self.suggest_parent_topic, title, content)
+
+    async def agenerate_learning_plan(self, topic: str, depth: int, style: str,
+                                      max_nodes: int, known_samples: List[str]) -> Optional[LearningPlan]:
+        """Async variant of generate_learning_plan."""
+        return await asyncio.to_thread(self.generate_learning_plan, topic, depth, style, max_nodes, known_samples)
+
+    # Streaming variants yield plan nodes as they are generated; by default the whole plan is generated first.
+    def stream_learning_plan(self, topic: str, depth: int, style: str,
+                             max_nodes: int, known_samples: List[str]) -> Iterator[LearningPlanNode]:
+        """Yield the nodes of a generated learning plan as they become available."""
+        plan = self.generate_learning_plan(topic, depth, style, max_nodes, known_samples)
+        if plan:
+            yield from plan.nodes
+
+    async def astream_learning_plan(self, topic: str, depth: int, style: str,
+                                    max_nodes: int, known_samples: List[str]) -> AsyncIterator[LearningPlanNode]:
+        """Async variant of stream_learning_plan."""
+        plan = await self.agenerate_learning_plan(topic, depth, style, max_nodes, known_samples)
+        if plan:
+            for node in plan.nodes:
+                yield node
+
 
 class OpenAIService(AIService):
     """
     AIService implementation using OpenAI's API.
     This class handles detection of learning style, parent topic suggestion, and learning plan generation.
+    Requests go through a shared, pooled client (see get_openai_client) rather than the module-level API;
+    the async variants use the matching AsyncOpenAI client.
+    Generated plans are kept in a content-addressed PlanCache (the process-wide one by default),
+    so identical plan requests skip the LLM call; identical plan and parent-topic requests that
+    arrive while one is in flight wait for it (see llm_single_flight).
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 plan_cache: Optional[PlanCache] = None):
         self._log = get_logger("ai.openai")
+        self._plan_cache = plan_cache if plan_cache is not None else _shared_plan_cache
         try:
             import openai
         except ImportError as e:
             self._log.info("ai.provider.import_error", ex=e.msg)
             openai = None
-        self._openai = openai
-        self._log.info("ai.provider._openai", openai=self._openai)
-        # Configure API key if available
-        if self._openai and api_key:
-            self._openai.api_key = api_key
-        elif self._openai:
-            key = os.getenv("OPENAI_API_KEY")
-            self._log.info("ai.provider.key", openai_api_key=key)
+        self._log.debug("ai.provider.openai", version=lazy(getattr, openai, "__version__", None))
+        self._openai_module = openai
+        # Configure a client if an API key is available
+        self._openai = None
+        self._api_key: Optional[str] = None
+        self._base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        if openai:
+            key = api_key
+            if not key:
+                key = os.getenv("OPENAI_API_KEY")
+                self._log.debug("ai.provider.key", source="OPENAI_API_KEY", configured=bool(key))
+            # If no API key is provided or configured, OpenAI usage stays disabled
             if key:
-                self._openai.api_key = key
-            else:
-                # If no API key is provided or configured, disable OpenAI usage
-                self._openai = None
+                self._api_key = key
+                self._openai = get_openai_client(openai, key, self._base_url)
 
         self._log.info("ai.provider.init", openai_enabled=bool(self._openai))
 
-    @traced("ai.detect_learning_style")
-    def detect_learning_style(self, answers: Dict[str, str], use_gpt: bool = False) -> str:
-        # If allowed and OpenAI is configured, try using AI to classify the learning style
-        self._log.debug("detect_learning_style.call", answers=answers)
-        if use_gpt and self._openai:
-            prompt = (
-                    "You are an educational psychologist. "
-                    "Classify the learner into one of these styles: "
-                    f"{', '.join(STYLES)}.\n\nAnswers:\n"
-                    + "\n".join(f"- {q}: {a}" for q, a in answers.items())
-                    + "\nAnswer with ONLY the style word."
-            )
-            try:
-                resp = self._openai.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0
-                )
-                style = resp.choices[0].message.content.strip()
-                if style in STYLES:
-                    self._log.info("detect_learning_style.result", style=style, used_gpt=bool(use_gpt and self._openai))
-                    return style
-            except Exception:
-                # On any API error, fall back to heuristic
-                pass
+    def _async_client(self) -> Any:
+        return get_async_openai_client(self._openai_module, self._api_key, self._base_url)
+
+    # ----------------- Prompts and response handling (shared by sync/async) -----------------
+    @staticmethod
+    def _style_messages(answers: Dict[str, str]) -> List[Dict[str, str]]:
+        prompt = (
+                "You are an educational psychologist. "
+                "Classify the learner into one of these styles: "
+                f"{', '.join(STYLES)}.\n\nAnswers:\n"
+                + "\n".join(f"- {q}: {a}" for q, a in answers.items())
+                + "\nAnswer with ONLY the style word."
+        )
+        return _traced_prompt([{"role": "user", "content": prompt}])
+
+    @staticmethod
+    def _heuristic_style(answers: Dict[str, str]) -> str:
         # Heuristic fallback: decide based on keywords in answers
         ans_flat = " ".join(answers.values()).lower()
         if "diagram" in ans_flat or "visual" in ans_flat:
@@ -107,51 +342,33 @@ class OpenAIService(AIService):
         # Default to a random style if no clear signals
         return random.choice(STYLES)
 
-    @traced("ai.suggest_parent")
-    def suggest_parent_topic(self, title: str, content: str) -> Optional[str]:
-        self._log.debug("suggest_parent_topic.call", title=title)
-        if not self._openai:
-            return None
+    @staticmethod
+    def _parent_messages(title: str, content: str) -> List[Dict[str, str]]:
         prompt = (
             "You are a knowledge graph assistant. "
             f"Note title: {title}\n"
             "Suggest ONE broader parent topic; reply ROOT if none.\n\n"
             f"CONTENT:\n{content[:4000]}"
         )
-        try:
-            resp = self._openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0
-            )
-        except Exception:
-            return None
+        return _traced_prompt([{"role": "user", "content": prompt}])
+
+    def _parent_from_response(self, resp: Any) -> Optional[str]:
         ans = resp.choices[0].message.content.strip()
         self._log.info("suggest_parent_topic.result", ans=ans)
         if ans.upper() == "ROOT":
             return None
         return ans
 
-    @traced("ai.generate_learning_plan")
-    def generate_learning_plan(self, topic: str, depth: int, style: str,
-                               max_nodes: int, known_samples: List[str]) -> Optional[LearningPlan]:
-        self._log.info("generate_learning_plan.call", topic=topic, depth=depth, style=style, max_nodes=max_nodes)
-        if not self._openai:
-            return None
-        # Build the prompt for the AI
-        from alp.ai.learning_plan import SYSTEM_INSTRUCTION, build_plan_prompt, extract_plan_json, parse_plan_json
+    @staticmethod
+    def _plan_messages(topic: str, depth: int, style: str, max_nodes: int,
+                       known_samples: List[str]) -> List[Dict[str, str]]:
         prompt = build_plan_prompt(topic, depth, style, max_nodes, known_samples)
-        try:
-            resp = self._openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_INSTRUCTION},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2
-            )
-        except Exception:
-            return None
+        return _traced_prompt([
+            {"role": "system", "content": SYSTEM_INSTRUCTION},
+            {"role": "user", "content": prompt}
+        ])
+
+    def _plan_from_response(self, resp: Any, topic: str) -> Optional[LearningPlan]:
         content = resp.choices[0].message.content
         data = extract_plan_json(content)
         if not data:
@@ -162,3 +379,271 @@ class OpenAIService(AIService):
         else:
             self._log.info("generate_learning_plan.success", nodes=len(plan.nodes))
         return plan
+
+    def _complete(self, operation: str, **kwargs: Any) -> Any:
+        """chat.completions.create, recording the call's duration, outcome and token usage."""
+        start = time.perf_counter()
+        try:
+            resp = self._openai.chat.completions.create(**kwargs)
+        except Exception:
+            record_llm_call(operation, time.perf_counter() - start, error=True)
+            raise
+        record_llm_call(operation, time.perf_counter() - start, getattr(resp, "usage", None))
+        return resp
+
+    async def _acomplete(self, operation: str, **kwargs: Any) -> Any:
+        """Async variant of _complete."""
+        start = time.perf_counter()
+        try:
+            resp = await self._async_client().chat.completions.create(**kwargs)
+        except Exception:
+            record_llm_call(operation, time.perf_counter() - start, error=True)
+            raise
+        record_llm_call(operation, time.perf_counter() - start, getattr(resp, "usage", None))
+        return resp
+
+    # ----------------- Sync API -----------------
+    @traced("ai.detect_learning_style")
+    def detect_learning_style(self, answers: Dict[str, str], use_gpt: bool = False) -> str:
+        # If allowed and OpenAI is configured, try using AI to classify the learning style
+        self._log.debug("detect_learning_style.call", answers=answers)
+        if use_gpt and self._openai:
+            try:
+                resp = self._complete(
+                    "detect_learning_style",
+                    model="gpt-4o-mini",
+                    messages=self._style_messages(answers),
+                    temperature=0,
+                    timeout=OPENAI_SHORT_TIMEOUT,
+                )
+                style = resp.choices[0].message.content.strip()
+                if style in STYLES:
+                    self._log.info("detect_learning_style.result", style=style, used_gpt=True)
+                    return style
+            except Exception:
+                # On any API error, fall back to heuristic
+                pass
+        return self._heuristic_style(answers)
+
+    @traced("ai.suggest_parent")
+    def suggest_parent_topic(self, title: str, content: str) -> Optional[str]:
+        self._log.debug("suggest_parent_topic.call", title=title)
+        if not self._openai:
+            return None
+
+        def request() -> Optional[str]:
+            try:
+                resp = self._complete(
+                    "suggest_parent",
+                    model="gpt-4o-mini",
+                    messages=self._parent_messages(title, content),
+                    temperature=0,
+                    timeout=OPENAI_SHORT_TIMEOUT,
+                )
+            except Exception:
+                return None
+            return self._parent_from_response(resp)
+
+        return llm_single_flight.do(_parent_flight_key(title, content), request)
+
+    @traced("ai.generate_learning_plan", result_attributes=_plan_attributes)
+    def generate_learning_plan(self, topic: str, depth: int, style: str,
+                               max_nodes: int, known_samples: List[str]) -> Optional[LearningPlan]:
+        self._log.info("generate_learning_plan.call", topic=topic, depth=depth, style=style, max_nodes=max_nodes)
+        if not self._openai:
+            return None
+        key = plan_cache_key(topic, depth, style, max_nodes, known_samples)
+        cached = self._plan_cache.get(key)
+        if cached is not None:
+            self._log.info("generate_learning_plan.cache_hit", topic=topic, nodes=len(cached.nodes))
+            return cached
+
+        def request() -> Optional[LearningPlan]:
+            try:
+                resp = self._complete(
+                    "generate_learning_plan",
+                    model="gpt-4o-mini",
+                    messages=self._plan_messages(topic, depth, style, max_nodes, known_samples),
+                    temperature=0.2,
+                    timeout=OPENAI_PLAN_TIMEOUT,
+                )
+            except Exception:
+                return None
+            plan = self._plan_from_response(resp, topic)
+            if plan and plan.nodes:
+                self._plan_cache.put(key, plan)
+            return plan
+
+        return llm_single_flight.do(("plan", key), request)
+
+    # ----------------- Async API -----------------
+    @traced("ai.detect_learning_style")
+    async def adetect_learning_style(self, answers: Dict[str, str], use_gpt: bool = False) -> str:
+        self._log.debug("detect_learning_style.call", answers=answers)
+        if use_gpt and self._openai:
+            try:
+                resp = await self._acomplete(
+                    "detect_learning_style",
+                    model="gpt-4o-mini",
+                    messages=self._style_messages(answers),
+                    temperature=0,
+                    timeout=OPENAI_SHORT_TIMEOUT,
+                )
+                style = resp.choices[0].message.content.strip()
+                if style in STYLES:
+                    self._log.info("detect_learning_style.result", style=style, used_gpt=True)
+                    return style
+            except Exception:
+                pass
+        return self._heuristic_style(answers)
+
+    @traced("ai.suggest_parent")
+    async def asuggest_parent_topic(self, title: str, content: str) -> Optional[str]:
+        self._log.debug("suggest_parent_topic.call", title=title)
+        if not self._openai:
+            return None
+
+        async def request() -> Optional[str]:
+            try:
+                resp = await self._acomplete(
+                    "suggest_parent",
+                    model="gpt-4o-mini",
+                    messages=self._parent_messages(title, content),
+                    temperature=0,
+                    timeout=OPENAI_SHORT_TIMEOUT,
+                )
+            except Exception:
+                return None
+            return self._parent_from_response(resp)
+
+        return await llm_single_flight.ado(_parent_flight_key(title, content), request)
+
+    @traced("ai.generate_learning_plan", result_attributes=_plan_attributes)
+    async def agenerate_learning_plan(self, topic: str, depth: int, style: str,
+                                      max_nodes: int, known_samples: List[str]) -> Optional[LearningPlan]:
+        self._log.info("generate_learning_plan.call", topic=topic, depth=depth, style=style, max_nodes=max_nodes)
+        if not self._openai:
+            return None
+        key = plan_cache_key(topic, depth, style, max_nodes, known_samples)
+        # The persistent tier reads the database, so keep it off the event loop
+        if self._plan_cache.store is not None:
+            cached = await asyncio.to_thread(self._plan_cache.get, key)
+        else:
+            cached = self._plan_cache.get(key)
+        if cached is not None:
+            self._log.info("generate_learning_plan.cache_hit", topic=topic, nodes=len(cached.nodes))
+            return cached
+
+        async def request() -> Optional[LearningPlan]:
+            try:
+                resp = await self._acomplete(
+                    "generate_learning_plan",
+                    model="gpt-4o-mini",
+                    messages=self._plan_messages(topic, depth, style, max_nodes, known_samples),
+                    temperature=0.2,
+                    timeout=OPENAI_PLAN_TIMEOUT,
+                )
+            except Exception:
+                return None
+            plan = self._plan_from_response(resp, topic)
+            if plan and plan.nodes:
+                if self._plan_cache.store is not None:
+                    await asyncio.to_thread(self._plan_cache.put, key, plan)
+                else:
+                    self._plan_cache.put(key, plan)
+            return plan
+
+        return await llm_single_flight.ado(("plan", key), request)
+
+    # ----------------- Streaming API -----------------
+    def _finish_stream(self, parser: PlanStreamParser, key: str, topic: str) -> List[LearningPlanNode]:
+        """Cache the streamed plan; returns nodes only found by the full-text fallback parse."""
+        plan = parser.finish()
+        if not plan or not plan.nodes:
+            self._log.warning("stream_learning_plan.empty_or_parse_fail", topic=topic)
+            return []
+        self._log.info("stream_learning_plan.success", nodes=len(plan.nodes))
+        self._plan_cache.put(key, plan)
+        return plan.nodes if not parser.nodes else []
+
+    def stream_learning_plan(self, topic: str, depth: int, style: str,
+                             max_nodes: int, known_samples: List[str]) -> Iterator[LearningPlanNode]:
+        """
+        Stream the completion and yield each plan node as soon as its JSON object is complete.
+        Cached plans are replayed without an LLM call; a completed stream is added to the cache.
+        """
+        self._log.info("stream_learning_plan.call", topic=topic, depth=depth, style=style, max_nodes=max_nodes)
+        if not self._openai:
+            return
+        key = plan_cache_key(topic, depth, style, max_nodes, known_samples)
+        cached = self._plan_cache.get(key)
+        if cached is not None:
+            yield from cached.nodes
+            return
+        parser = PlanStreamParser()
+        start = time.perf_counter()
+        usage = None
+        try:
+            stream = self._openai.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=self._plan_messages(topic, depth, style, max_nodes, known_samples),
+                temperature=0.2,
+                timeout=OPENAI_PLAN_TIMEOUT,
+                stream=True,
+                # The last chunk then carries the token usage (and no choices)
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield from parser.feed(chunk.choices[0].delta.content)
+                usage = getattr(chunk, "usage", None) or usage
+        except Exception as e:
+            record_llm_call("stream_learning_plan", time.perf_counter() - start, usage, error=True)
+            self._log.warning("stream_learning_plan.error", topic=topic, error=str(e))
+            return
+        record_llm_call("stream_learning_plan", time.perf_counter() - start, usage)
+        yield from self._finish_stream(parser, key, topic)
+
+    async def astream_learning_plan(self, topic: str, depth: int, style: str,
+                                    max_nodes: int, known_samples: List[str]) -> AsyncIterator[LearningPlanNode]:
+        """Async variant of stream_learning_plan, using the AsyncOpenAI client."""
+        self._log.info("stream_learning_plan.call", topic=topic, depth=depth, style=style, max_nodes=max_nodes)
+        if not self._openai:
+            return
+        key = plan_cache_key(topic, depth, style, max_nodes, known_samples)
+        if self._plan_cache.store is not None:
+            cached = await asyncio.to_thread(self._plan_cache.get, key)
+        else:
+            cached = self._plan_cache.get(key)
+        if cached is not None:
+            for node in cached.nodes:
+                yield node
+            return
+        parser = PlanStreamParser()
+        start = time.perf_counter()
+        usage = None
+        try:
+            stream = await self._async_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=self._plan_messages(topic, depth, style, max_nodes, known_samples),
+                temperature=0.2,
+                timeout=OPENAI_PLAN_TIMEOUT,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    for node in parser.feed(chunk.choices[0].delta.content):
+                        yield node
+                usage = getattr(chunk, "usage", None) or usage
+        except Exception as e:
+            record_llm_call("stream_learning_plan", time.perf_counter() - start, usage, error=True)
+            self._log.warning("stream_learning_plan.error", topic=topic, error=str(e))
+            return
+        record_llm_call("stream_learning_plan", time.perf_counter() - start, usage)
+        if self._plan_cache.store is not None:
+            remaining = await asyncio.to_thread(self._finish_stream, parser, key, topic)
+        else:
+            remaining = self._finish_stream(parser, key, topic)
+        for node in remaining:
+            yield node
@@ -1,44 +1,88 @@
-from typing import Dict, List, Optional
+import asyncio
+import json
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi import Request
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 
-from alp.ai.service import OpenAIService, AIService
+from alp.ai.plan_cache import plan_cache
+from alp.ai.service import OpenAIService, AIService, llm_single_flight
+from alp.db.session import dispose_async_engine, init_db
 from alp.graph import GraphService
-from alp.logging.config import configure_logging, get_logger
+from alp.graph.service import NOTE_BATCH_SIZE, PlanStreamInjector, content_cache, graph_cache
+from alp.logging.config import configure_logging, get_log_writer, get_logger
 from alp.logging.context import new_request_context, clear_request_context
-from alp.logging.instrumentation import init_tracing
-from alp.user import UserService
+from alp.logging.instrumentation import (
+    finish_request_metrics, get_span_ring, init_tracing, metrics, start_request_metrics,
+)
+from alp.user import UserService, UserNotFoundError
 
 configure_logging()
 init_tracing()
 api_logger = get_logger("api")
 api_logger.info("api.startup")
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Schema creation is an explicit startup step rather than a side effect of importing the DB module
+    await run_in_threadpool(init_db)
+    yield
+    await dispose_async_engine()
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Adaptive Learning Platform API", version="1.0")
+app = FastAPI(title="Adaptive Learning Platform API", version="1.0", lifespan=lifespan)
+
+
+# Cache and queue stats, read when /metrics is scraped
+metrics.register_collector("alp_plan_cache", plan_cache.stats)
+metrics.register_collector("alp_graph_cache", graph_cache.stats)
+metrics.register_collector("alp_content_cache", content_cache.stats)
+metrics.register_collector("alp_llm_single_flight", llm_single_flight.stats)
+metrics.register_collector("alp_log_writer", lambda: get_log_writer() and get_log_writer().stats())
 
 
 @app.middleware("http")
 async def request_context_mw(request: Request, call_next):
     rid = new_request_context()
+    usage, token = start_request_metrics()
+    start = time.perf_counter()
+    status = 500
     try:
         response = await call_next(request)
+        status = response.status_code
         response.headers["X-Request-ID"] = rid
         return response
     finally:
+        # Label by route template (not the raw path) to keep the number of series bounded
+        route = request.scope.get("route")
+        finish_request_metrics(token, usage, request.method, getattr(route, "path", "unmatched"), status,
+                               time.perf_counter() - start)
         clear_request_context()
 
 
-# Instantiate a single AI service instance (for reuse across requests)
-_ai_service = OpenAIService()
+# A single AI service instance reused across requests, created on first use (importing openai is slow)
+_ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
 
 
 def get_ai_service() -> AIService:
     """
     Dependency to provide the AIService (can be replaced for testing or different implementations).
     """
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = OpenAIService()
     return _ai_service
 
 
@@ -65,6 +109,17 @@ class AddNoteResponse(BaseModel):
     concept_id: int
 
 
+class BatchNote(BaseModel):
+    title: str
+    content: str
+    parent_topic: Optional[str] = None
+
+
+class AddNotesResponse(BaseModel):
+    added: int
+    parents_created: int
+
+
 class LearningPlanRequest(BaseModel):
     user_id: str
     topic: str
@@ -80,22 +135,22 @@ class LearningPlanResponse(BaseModel):
 
 # User onboarding endpoint
 @app.post("/users/onboard", response_model=OnboardResponse)
-def onboard_user(request: OnboardRequest, ai_service: AIService = Depends(get_ai_service)):
+async def onboard_user(request: OnboardRequest, ai_service: AIService = Depends(get_ai_service)):
     """
     Onboard a new user by name and answers to questions.
     Returns the created user's ID and detected learning style.
     """
-    new_user = UserService.onboard_user(name=request.name, answers=request.answers, ai_service=ai_service)
+    new_user = await UserService.aonboard_user(name=request.name, answers=request.answers, ai_service=ai_service)
     return OnboardResponse(user_id=new_user.id, name=new_user.name, learning_style=new_user.learning_style or "")
 
 
 # Get user profile endpoint
 @app.get("/users/{user_id}", response_model=OnboardResponse)
-def get_user_profile(user_id: str):
+async def get_user_profile(user_id: str):
     """
     Retrieve a user's profile by ID.
     """
-    user = UserService.get_user_by_id(user_id)
+    user = await UserService.aget_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return OnboardResponse(user_id=user.id, name=user.name, learning_style=user.learning_style or "")
@@ -103,32 +158,179 @@ def get_user_profile(user_id: str):
 
 # Add a new note (concept) endpoint
 @app.post("/notes", response_model=AddNoteResponse)
-def add_note(request: AddNoteRequest):
+async def add_note(request: AddNoteRequest):
     """
     Add a new note (and concept) to the user's knowledge graph.
+    The user's existence is checked inside the write transaction.
     """
-    # Ensure the user exists
-    user = UserService.get_user_by_id(request.user_id)
-    if not user:
+    try:
+        concept_id = await GraphService.aadd_note(request.user_id, request.title, request.content,
+                                                  request.parent_topic or None, require_user=True)
+    except UserNotFoundError:
         raise HTTPException(status_code=404, detail="User not found")
-    concept_id = GraphService.add_note(request.user_id, request.title, request.content, request.parent_topic or None)
     return AddNoteResponse(concept_id=concept_id)
 
 
+async def _ndjson_notes(request: Request) -> AsyncIterator[List[Tuple[str, str, Optional[str]]]]:
+    """Parse a streamed NDJSON body of BatchNote objects into batches of (title, content, parent) tuples."""
+    buffer = b""
+    batch: List[Tuple[str, str, Optional[str]]] = []
+    line_no = 0
+
+    def parse(line: bytes) -> None:
+        nonlocal line_no
+        line_no += 1
+        if not line.strip():
+            return
+        try:
+            note = BatchNote.model_validate_json(line)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid note on line {line_no}: {e.errors()[0]['msg']}")
+        batch.append((note.title, note.content, note.parent_topic or None))
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            parse(line)
+        if len(batch) >= NOTE_BATCH_SIZE:
+            yield batch
+            batch = []
+    parse(buffer)
+    if batch:
+        yield batch
+
+
+# Bulk note import endpoint
+@app.post("/notes:batch", response_model=AddNotesResponse)
+async def add_notes(user_id: str, request: Request):
+    """
+    Import many notes for a user in one transaction.
+    The body is NDJSON, one {"title", "content", "parent_topic"} object per line. It is parsed as it
+    arrives and handed to GraphService.add_notes through a small bounded queue, so memory use does
+    not grow with the size of the import. The user's existence is checked inside the import transaction.
+    """
+    batches: "queue.Queue[object]" = queue.Queue(maxsize=2)
+    stopped = threading.Event()  # set once add_notes has stopped consuming (finished or failed)
+
+    def notes() -> Iterator[Tuple[str, str, Optional[str]]]:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if isinstance(batch, BaseException):
+                raise batch
+            yield from batch
+
+    def consume() -> Tuple[int, int]:
+        try:
+            return GraphService.add_notes(user_id, notes(), require_user=True)
+        finally:
+            stopped.set()
+
+    def put(item: object) -> None:
+        while not stopped.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    consumer = asyncio.ensure_future(run_in_threadpool(consume))
+    try:
+        async for batch in _ndjson_notes(request):
+            if stopped.is_set():
+                break  # add_notes failed (e.g. unknown user); no point reading the rest
+            await run_in_threadpool(put, batch)
+        await run_in_threadpool(put, None)
+    except BaseException as e:
+        # Abort the import: add_notes re-raises from its input and rolls the transaction back
+        await run_in_threadpool(put, e)
+        await asyncio.gather(consumer, return_exceptions=True)
+        raise
+    try:
+        added, parents_created = await consumer
+    except UserNotFoundError:
+        raise HTTPException(status_code=404, detail="User not found")
+    return AddNotesResponse(added=added, parents_created=parents_created)
+
+
 # Generate and inject a learning plan endpoint
 @app.post("/learning-plan", response_model=LearningPlanResponse)
-def generate_learning_plan(request: LearningPlanRequest, ai_service: AIService = Depends(get_ai_service)):
+async def generate_learning_plan(request: LearningPlanRequest, ai_service: AIService = Depends(get_ai_service)):
     """
     Generate a learning plan for the given user and topic, and integrate it into the user's graph.
+    The LLM call and the database work (through the async engine) are awaited on the event loop.
+    The user is read up front (for their learning style, usually from the user cache) and its
+    existence is checked again inside the injection transaction, as /notes does for its writes.
     """
-    user = UserService.get_user_by_id(request.user_id)
+    user = await UserService.aget_user_by_id(request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    plan = ai_service.generate_learning_plan(request.topic, request.depth, user.learning_style or "", request.max_nodes,
-                                             known_samples=[])
+    plan = await ai_service.agenerate_learning_plan(request.topic, request.depth, user.learning_style or "",
+                                                    request.max_nodes, known_samples=[])
     if not plan:
         raise HTTPException(status_code=500, detail="Failed to generate learning plan")
     # Load current graph, inject the plan into it
-    kg = GraphService.load_graph(request.user_id)
-    added, reused, skipped = GraphService.inject_plan(request.user_id, kg, plan, request.depth, request.max_nodes)
+    kg = await GraphService.aload_graph(request.user_id)
+    try:
+        added, reused, skipped = await GraphService.ainject_plan(request.user_id, kg, plan, request.depth,
+                                                                 request.max_nodes, require_user=True)
+    except UserNotFoundError:
+        raise HTTPException(status_code=404, detail="User not found")
     return LearningPlanResponse(added=added, reused=reused, skipped=skipped)
+
+
+# Stream a learning plan into the user's graph as it is generated
+@app.post("/learning-plan/stream")
+async def stream_learning_plan(request: LearningPlanRequest, ai_service: AIService = Depends(get_ai_service)):
+    """
+    Like /learning-plan, but injects plan nodes while the LLM is still generating them.
+    Responds with NDJSON: one line per injected node, then a final line with status "done"
+    (added/reused/skipped, as in LearningPlanResponse) or "error" if no plan was generated.
+    """
+    user = await UserService.aget_user_by_id(request.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    kg = await GraphService.aload_graph(request.user_id)
+    injector = PlanStreamInjector(request.user_id, kg, request.depth, request.max_nodes)
+
+    async def events():
+        received = 0
+        async for node in ai_service.astream_learning_plan(request.topic, request.depth, user.learning_style or "",
+                                                           request.max_nodes, known_samples=[]):
+            received += 1
+            event = await run_in_threadpool(injector.add, node)
+            if event:
+                yield json.dumps(event) + "\n"
+        if not received:
+            yield json.dumps({"status": "error", "detail": "Failed to generate learning plan"}) + "\n"
+            return
+        added, reused, skipped = injector.result()
+        yield json.dumps({"status": "done", "added": added, "reused": reused, "skipped": skipped}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+# Slowest recent spans per operation, from the in-memory span exporter
+@app.get("/debug/traces")
+async def debug_traces(operation: Optional[str] = None, limit: int = 10):
+    """
+    Latency summary of the spans kept by the in-memory exporter: per operation (span name, or only
+    `operation`), the count of recent spans, p50/p99/max duration in ms, errors and the `limit`
+    slowest spans with their trace ids and attributes. 404 unless the "memory" exporter is enabled.
+    """
+    ring = get_span_ring()
+    if ring is None:
+        raise HTTPException(status_code=404, detail="In-memory span exporter is not enabled")
+    return ring.summary(operation, limit)
+
+
+# Metrics in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Request latency per endpoint, SQL statement counts and time per request, LLM call latency and
+    token usage, and the stats of the plan cache, graph cache, LLM single-flight and log writer.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
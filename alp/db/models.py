@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime as dt
 import uuid
 
-from sqlalchemy import String, DateTime, Integer, ForeignKey, Text, Boolean
+from sqlalchemy import String, DateTime, Integer, Float, ForeignKey, Text, Boolean, Index, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -31,6 +31,8 @@ class Note(Base):
     title: Mapped[str] = mapped_column(String, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
 
+    __table_args__ = (Index("ix_note_user", "user_id"),)
+
 
 class Concept(Base):
     """Concept model representing a knowledge graph node (may reference a Note)."""
@@ -40,6 +42,13 @@ class Concept(Base):
     name: Mapped[str] = mapped_column(String, nullable=False, unique=False)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
     is_known: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Difficulty (1-4) for concepts created from a learning plan; None for user notes
+    difficulty: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Per-user graph revision at which this row was last inserted/updated (see GraphRevision)
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    # Per-user scans use the leading user_id column of these composite indexes
+    __table_args__ = (Index("ix_concept_user_revision", "user_id", "revision"),)
 
 
 class Edge(Base):
@@ -49,3 +58,28 @@ class Edge(Base):
     user_id: Mapped[str] = mapped_column(String, ForeignKey("user.id"), nullable=False)
     source_id: Mapped[int] = mapped_column(Integer, ForeignKey("concept.id"))
     target_id: Mapped[int] = mapped_column(Integer, ForeignKey("concept.id"))
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_edge_user_revision", "user_id", "revision"),
+        Index("ux_edge_user_source_target", "user_id", "source_id", "target_id", unique=True),
+    )
+
+
+# Case-insensitive name lookup within a user's graph (parent lookup in add_note, plan reuse)
+Index("ix_concept_user_lower_name", Concept.user_id, func.lower(Concept.name))
+
+
+class GraphRevision(Base):
+    """Monotonic per-user counter of knowledge graph changes; bumped by every graph write transaction."""
+    __tablename__ = "graph_revision"
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class PlanCacheEntry(Base):
+    """Generated learning plan (as JSON) keyed by a hash of its prompt inputs; see alp.ai.plan_cache."""
+    __tablename__ = "plan_cache"
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    plan: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[float] = mapped_column(Float, nullable=False)
@@ -1,31 +1,232 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
-from contextlib import contextmanager
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from typing import Any, Generator
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Dict, Generator, Optional, Tuple
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.schema import CreateColumn
 
 from alp.db.models import Base
+from alp.logging.instrumentation import instrument_engine
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 # Determine database file path (allow override via environment variable for testing)
 _default_db_path = Path.home() / ".alp" / "mvp.db"
 db_path = Path(os.getenv("ALP_DB_PATH", _default_db_path))
-db_path.parent.mkdir(exist_ok=True)
 
-engine = create_engine(f"sqlite:///{db_path}", echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+# Connection PRAGMAs per engine profile, selected with ALP_DB_PROFILE.
+# "production" lets readers proceed while a writer commits (WAL) and waits on locks instead of failing.
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # durable across app crashes; fsync only at WAL checkpoints
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative = KiB, i.e. 64 MiB page cache per connection
+        "busy_timeout": 5000,  # ms
+        "temp_store": "MEMORY",
+    },
+}
+DB_PROFILE = os.getenv("ALP_DB_PROFILE", "default")
+
+
+def apply_sqlite_profile(bind: Engine, profile: str) -> None:
+    """Set the PRAGMAs of the named profile on every new connection of the engine."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown ALP_DB_PROFILE {profile!r}; expected one of {sorted(SQLITE_PROFILES)}")
+    pragmas = SQLITE_PROFILES[profile]
+    if not pragmas:
+        return
+
+    @event.listens_for(bind, "connect")
+    def _set_pragmas(dbapi_conn, _record) -> None:
+        cursor = dbapi_conn.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
+
+
+def make_engine(url: str, profile: str = DB_PROFILE) -> Engine:
+    """Create an SQLite engine configured with the given profile."""
+    bind = create_engine(url, echo=False, future=True)
+    apply_sqlite_profile(bind, profile)
+    instrument_engine(bind)
+    return bind
+
 
-# Create all tables in the database
-Base.metadata.create_all(engine)
+# The main engine and its session factory are created on first use (see get_engine), so importing
+# this module opens no database. Assign both to point the application at another engine (e.g. in tests).
+engine: Optional[Engine] = None
+SessionLocal: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """Return the engine of the main database, creating it on first use."""
+    global engine, SessionLocal
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                db_path.parent.mkdir(parents=True, exist_ok=True)
+                bind = make_engine(f"sqlite:///{db_path}")
+                SessionLocal = sessionmaker(bind=bind, autoflush=False, autocommit=False, expire_on_commit=False)
+                engine = bind
+    return engine
+
+
+def get_sessionmaker() -> sessionmaker:
+    """Return the session factory of the main database."""
+    if SessionLocal is None:
+        get_engine()
+    return SessionLocal
+
+
+def upgrade_schema(bind: Engine) -> None:
+    """
+    Bring an existing database file up to date with the models.
+    create_all only creates missing tables, so columns and indexes added to existing
+    tables since the file was created are added here (e.g. an old ~/.alp/mvp.db).
+    """
+    insp = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {col["name"] for col in insp.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'))
+            # Read index names from sqlite_master: reflection skips expression indexes
+            existing_indexes = set(conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"),
+                {"t": table.name},
+            ).scalars())
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.name == "ux_edge_user_source_target":
+                    # Older files may hold duplicate edges; keep the first of each before enforcing uniqueness
+                    conn.execute(text(
+                        "DELETE FROM edge WHERE id NOT IN "
+                        "(SELECT MIN(id) FROM edge GROUP BY user_id, source_id, target_id)"
+                    ))
+                index.create(conn)
+
+
+def init_db(bind: Optional[Engine] = None) -> None:
+    """
+    Create missing tables and upgrade the schema of the main database (or of `bind`).
+    Not done on import: entry points (the API startup, the Streamlit app, scripts working on a
+    fresh database file) call this once before their first query. Shards initialize themselves.
+    """
+    bind = bind or get_engine()
+    Base.metadata.create_all(bind)
+    upgrade_schema(bind)
+
+
+# Optional sharding of per-user graph data (notes, concepts, edges, graph revisions) across database
+# files, selected with ALP_DB_SHARDS: a number of files users are hashed to, or "per-user" for one file
+# per user. Users and other global tables stay in the main database. Empty or "0" disables sharding.
+DB_SHARDS = os.getenv("ALP_DB_SHARDS", "0")
+PER_USER_SHARDS = "per-user"
+# Shard engines kept open at once; the least recently used one is disposed beyond this
+SHARD_ENGINE_CACHE_SIZE = int(os.getenv("ALP_DB_SHARD_ENGINES", "64"))
+_SAFE_FILE_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def sharding_enabled() -> bool:
+    """Whether per-user data is routed to shard files instead of the main database."""
+    return DB_SHARDS not in ("", "0")
+
+
+def shard_path(user_id: str) -> Path:
+    """Return the database file holding the user's graph data in sharded mode."""
+    if DB_SHARDS == PER_USER_SHARDS:
+        name = user_id if _SAFE_FILE_NAME.fullmatch(user_id) else hashlib.sha256(user_id.encode()).hexdigest()
+        return db_path.parent / f"{db_path.stem}-users" / f"{name}.db"
+    shards = int(DB_SHARDS)
+    digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+    return db_path.with_name(f"{db_path.stem}-shard{int.from_bytes(digest, 'big') % shards:03d}.db")
+
+
+class ShardEngines:
+    """
+    LRU of open engines (and session factories) for shard database files.
+    A shard's schema is created or upgraded when its engine is first opened, by one
+    thread per file (others wait for it without blocking the other shards);
+    evicted engines are disposed, closing their pooled connections.
+    """
+
+    def __init__(self, max_open: int = SHARD_ENGINE_CACHE_SIZE) -> None:
+        self.max_open = max_open
+        self._engines: OrderedDict[Path, Tuple[Engine, sessionmaker]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while a shard file is being opened, so its DDL runs once
+        self._opening: Dict[Path, threading.Lock] = {}
+
+    def sessionmaker_for(self, path: Path) -> sessionmaker:
+        """Return the session factory of the shard file at `path`, opening it if needed."""
+        with self._lock:
+            entry = self._engines.get(path)
+            if entry is not None:
+                self._engines.move_to_end(path)
+                return entry[1]
+            opening = self._opening.setdefault(path, threading.Lock())
+        with opening:
+            with self._lock:
+                entry = self._engines.get(path)
+                if entry is not None:
+                    # Another thread opened it while we waited
+                    self._engines.move_to_end(path)
+                    return entry[1]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            bind = make_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind)
+            upgrade_schema(bind)
+            factory = sessionmaker(bind=bind, autoflush=False, autocommit=False, expire_on_commit=False)
+            with self._lock:
+                self._engines[path] = (bind, factory)
+                self._opening.pop(path, None)
+                while len(self._engines) > self.max_open:
+                    _, (evicted, _) = self._engines.popitem(last=False)
+                    evicted.dispose()
+        return factory
+
+    def dispose_all(self) -> None:
+        """Dispose every open shard engine."""
+        with self._lock:
+            for bind, _ in self._engines.values():
+                bind.dispose()
+            self._engines.clear()
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+
+shard_engines = ShardEngines()
 
 
 @contextmanager
-def session_scope() -> Generator[Session, Any, None]:
+def session_scope(user_id: Optional[str] = None) -> Generator[Session, Any, None]:
     """
     Provide a transactional scope around a series of operations.
+    Pass the user_id when working on a user's graph data: in sharded mode the session is then
+    bound to that user's shard; otherwise (and for global tables) it uses the main database.
 
     Usage:
         with session_scope() as db:
@@ -33,7 +234,10 @@ def session_scope() -> Generator[Session, Any, None]:
             ...  # Perform DB operations
         (Commits on success, rolls back on exception)
     """
-    db: Session = SessionLocal()
+    if user_id is not None and sharding_enabled():
+        db: Session = shard_engines.sessionmaker_for(shard_path(user_id))()
+    else:
+        db = get_sessionmaker()()
     try:
         yield db
         db.commit()
@@ -42,3 +246,71 @@ def session_scope() -> Generator[Session, Any, None]:
         raise
     finally:
         db.close()
+
+
+# Async engines for the API's event loop, created on first use (needs an async driver, e.g. aiosqlite).
+# By default they open the same file as `engine`; ALP_ASYNC_DB_URL can name the same database through
+# another async driver. The schema is created and upgraded through the sync engine only (see init_db).
+ASYNC_DB_URL = os.getenv("ALP_ASYNC_DB_URL")
+# Set to override the per-loop engines with one session factory (e.g. in tests)
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+# Pooled async connections belong to the event loop that opened them, so engines are kept per loop
+_async_sessionmakers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, async_sessionmaker]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_lock = threading.Lock()
+
+
+def make_async_engine(url: str, profile: str = DB_PROFILE) -> AsyncEngine:
+    """Create an async engine; SQLite URLs get the PRAGMAs of the given profile."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    bind = create_async_engine(url, echo=False)
+    if bind.dialect.name == "sqlite":
+        apply_sqlite_profile(bind.sync_engine, profile)
+    instrument_engine(bind.sync_engine)
+    return bind
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Return the async session factory for the running event loop, creating its engine on first use."""
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        factory = _async_sessionmakers.get(loop)
+        if factory is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            bind = make_async_engine(ASYNC_DB_URL or f"sqlite+aiosqlite:///{db_path}")
+            factory = _async_sessionmakers[loop] = async_sessionmaker(bind=bind, autoflush=False,
+                                                                      expire_on_commit=False)
+        return factory
+
+
+async def dispose_async_engine() -> None:
+    """Close the pooled connections of the running event loop's async engine (e.g. at API shutdown)."""
+    with _async_lock:
+        factory = _async_sessionmakers.pop(asyncio.get_running_loop(), None)
+    if factory is not None:
+        await factory.kw["bind"].dispose()
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of session_scope on the main database: commits on success, rolls back on
+    exception. Sync ORM code can run inside it without blocking the event loop via
+    `await db.run_sync(fn, ...)`, which is how the async service methods reuse their sync logic.
+    Shards are not served asynchronously; in sharded mode the async service methods run their
+    sync versions in a worker thread instead.
+    """
+    db: AsyncSession = get_async_sessionmaker()()
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
@@ -1,4 +1,5 @@
 from alp.graph.knowledge_graph import KnowledgeGraph
+from alp.graph.compact_graph import CompactKnowledgeGraph
 from alp.graph.service import GraphService
 
-__all__ = ["KnowledgeGraph", "GraphService"]
+__all__ = ["KnowledgeGraph", "CompactKnowledgeGraph", "GraphService"]
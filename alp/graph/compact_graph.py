@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from itertools import chain
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, List, Dict, Tuple
+
+from alp.graph.knowledge_graph import (
+    KnowledgeGraph, KNOWN_ATTR, NAME_ATTR, CONTENT_ATTR, DIFFICULTY_ATTR, bidirectional_bfs, synchronized,
+)
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+
+class CompactKnowledgeGraph(KnowledgeGraph):
+    """
+    Array-backed KnowledgeGraph for large per-user graphs held in memory.
+    Concepts get dense indices; names are interned, `known` flags live in a bytearray and
+    content is stored out-of-line only for concepts that have it. Edges are appended to
+    int32 source/target arrays and compiled lazily into CSR adjacency (out and in) the
+    first time a query needs them after a change.
+    Create via KnowledgeGraph(backend="compact"); there is no `G` attribute.
+    """
+
+    def __init__(self, backend: str | None = None) -> None:
+        self._lock = threading.RLock()
+        self.version: int = 0
+        self.revision: int = 0
+        self._init_layout_cache()
+        self._init_path_memo()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._index: Dict[int, int] = {}  # concept id -> dense index
+        self._ids = array("q")
+        self._known = bytearray()
+        self._difficulty = array("b")  # 0 = no difficulty
+        self._name_ix = array("i")
+        self._names: List[str] = []
+        self._name_lookup: Dict[str, int] = {}
+        self._content: Dict[int, str] = {}  # dense index -> content
+        # Edge list (dense indices) in insertion order
+        self._src = array("i")
+        self._dst = array("i")
+        # CSR adjacency compiled from the first `_csr_edges` edges; later edges are in `_pending`
+        self._out_ptr = array("i", [0])
+        self._out_adj = array("i")
+        self._in_ptr = array("i", [0])
+        self._in_adj = array("i")
+        self._csr_edges = 0
+        self._pending: set[int] = set()
+        self._init_counters()
+
+    # ----------------- Graph Construction -----------------
+    @synchronized
+    def clear(self) -> None:
+        """Remove all nodes and edges from the graph."""
+        self._reset()
+        self.version += 1
+
+    def _intern(self, name: str) -> int:
+        ix = self._name_lookup.get(name)
+        if ix is None:
+            ix = len(self._names)
+            self._names.append(name)
+            self._name_lookup[name] = ix
+        return ix
+
+    @synchronized
+    def add_concept(self, concept_id: int, name: str, known: bool, content: str | None = None,
+                    difficulty: int | None = None) -> None:
+        """Add a concept node to the graph (updating its data if already present)."""
+        ix = self._index.get(concept_id)
+        if ix is None:
+            ix = len(self._ids)
+            self._index[concept_id] = ix
+            self._ids.append(concept_id)
+            self._known.append(1 if known else 0)
+            self._difficulty.append(difficulty or 0)
+            self._name_ix.append(self._intern(name))
+        else:
+            self._count_concept(bool(self._known[ix]), self._difficulty[ix], -1)
+            self._known[ix] = 1 if known else 0
+            self._difficulty[ix] = difficulty or 0
+            self._name_ix[ix] = self._intern(name)
+        self._count_concept(bool(known), difficulty, 1)
+        if content is None:
+            self._content.pop(ix, None)
+        else:
+            self._content[ix] = content
+        self.version += 1
+
+    @staticmethod
+    def _edge_key(a: int, b: int) -> int:
+        return (a << 32) | b
+
+    @synchronized
+    def add_edge(self, src_id: int, dst_id: int) -> None:
+        """Add a directed edge from src -> dst in the graph (ignores self-loops, duplicates or missing nodes)."""
+        if src_id == dst_id:
+            return
+        a = self._index.get(src_id)
+        b = self._index.get(dst_id)
+        if a is None or b is None or self._has_edge_ix(a, b):
+            return
+        self._src.append(a)
+        self._dst.append(b)
+        self._pending.add(self._edge_key(a, b))
+        self._edge_count += 1
+        self.version += 1
+
+    # ----------------- CSR maintenance -----------------
+    @staticmethod
+    def _build_csr(n: int, rows: array, cols: array) -> Tuple[array, array]:
+        # Counting sort of edges by row: O(nodes + edges), no per-node containers
+        ptr = array("i", bytes(4 * (n + 1)))
+        for r in rows:
+            ptr[r + 1] += 1
+        for i in range(n):
+            ptr[i + 1] += ptr[i]
+        fill = array("i", ptr[:n])
+        adj = array("i", bytes(4 * len(cols)))
+        for r, c in zip(rows, cols):
+            adj[fill[r]] = c
+            fill[r] += 1
+        return ptr, adj
+
+    def _ensure_csr(self) -> None:
+        n = len(self._ids)
+        if self._csr_edges == len(self._src):
+            # Only concepts were added: give the new rows empty adjacency
+            grow = n + 1 - len(self._out_ptr)
+            if grow > 0:
+                self._out_ptr.extend([self._out_ptr[-1]] * grow)
+                self._in_ptr.extend([self._in_ptr[-1]] * grow)
+            return
+        self._out_ptr, self._out_adj = self._build_csr(n, self._src, self._dst)
+        self._in_ptr, self._in_adj = self._build_csr(n, self._dst, self._src)
+        self._csr_edges = len(self._src)
+        self._pending.clear()
+
+    def _out_ix(self, a: int) -> array:
+        self._ensure_csr()
+        return self._out_adj[self._out_ptr[a]:self._out_ptr[a + 1]]
+
+    def _in_ix(self, a: int) -> array:
+        self._ensure_csr()
+        return self._in_adj[self._in_ptr[a]:self._in_ptr[a + 1]]
+
+    def _has_edge_ix(self, a: int, b: int) -> bool:
+        if self._edge_key(a, b) in self._pending:
+            return True
+        # Only consult the compiled CSR (rows may be shorter than the node count after new concepts)
+        if a + 1 >= len(self._out_ptr):
+            return False
+        return b in self._out_adj[self._out_ptr[a]:self._out_ptr[a + 1]]
+
+    # ----------------- Graph Queries -----------------
+    def has_concept(self, concept_id: int) -> bool:
+        """Check if a concept node with given ID exists in the graph."""
+        return concept_id in self._index
+
+    @synchronized
+    def has_edge(self, src_id: int, dst_id: int) -> bool:
+        """Check if a directed edge src -> dst exists in the graph."""
+        a = self._index.get(src_id)
+        b = self._index.get(dst_id)
+        return a is not None and b is not None and self._has_edge_ix(a, b)
+
+    def _data(self, ix: int) -> dict:
+        return {
+            NAME_ATTR: self._names[self._name_ix[ix]],
+            KNOWN_ATTR: bool(self._known[ix]),
+            CONTENT_ATTR: self._content.get(ix),
+            DIFFICULTY_ATTR: self._difficulty[ix] or None,
+        }
+
+    def concept_data(self, concept_id: int) -> dict:
+        """Get a (read-only snapshot) data dictionary for a concept node."""
+        return self._data(self._index[concept_id])
+
+    @synchronized
+    def concepts(self) -> Iterator[Tuple[int, dict]]:
+        """Iterate over (concept_id, data) pairs for all concept nodes (as of the call)."""
+        return iter([(cid, self._data(ix)) for ix, cid in enumerate(self._ids)])
+
+    @synchronized
+    def edges(self) -> Iterator[Tuple[int, int]]:
+        """Iterate over all directed (src, dst) edges (as of the call)."""
+        ids = self._ids
+        return iter([(ids[a], ids[b]) for a, b in zip(self._src, self._dst)])
+
+    @synchronized
+    def mark_known(self, concept_id: int) -> None:
+        """Mark a concept as known in the graph (if present)."""
+        ix = self._index.get(concept_id)
+        if ix is not None and not self._known[ix]:
+            self._known[ix] = 1
+            self._count_known(self._difficulty[ix])
+            self.version += 1
+
+    def is_known(self, concept_id: int) -> bool:
+        """Return True if the concept is marked as known, False otherwise."""
+        ix = self._index.get(concept_id)
+        return ix is not None and bool(self._known[ix])
+
+    @synchronized
+    def _find_path(self, start_id: int, end_id: int) -> Optional[List[int]]:
+        a = self._index[start_id]
+        b = self._index[end_id]
+        path = bidirectional_bfs(a, b, self._out_ix, self._in_ix)
+        if path is None:
+            def both(u: int) -> Iterable[int]:
+                return chain(self._out_ix(u), self._in_ix(u))
+
+            path = bidirectional_bfs(a, b, both, both)
+        return [self._ids[ix] for ix in path] if path is not None else None
+
+    def _require(self, concept_id: int) -> int:
+        # Same error as networkx's successors()/predecessors() for a missing node
+        ix = self._index.get(concept_id)
+        if ix is None:
+            import networkx as nx
+
+            raise nx.NetworkXError(f"The node {concept_id} is not in the digraph.")
+        return ix
+
+    @synchronized
+    def neighbors_out(self, concept_id: int) -> Iterable[int]:
+        """Iterate over concept IDs that are direct children (outgoing edges) of the given concept."""
+        ids = self._ids
+        return [ids[ix] for ix in self._out_ix(self._require(concept_id))]
+
+    @synchronized
+    def neighbors_in(self, concept_id: int) -> Iterable[int]:
+        """Iterate over concept IDs that are direct parents (incoming edges) of the given concept."""
+        ids = self._ids
+        return [ids[ix] for ix in self._in_ix(self._require(concept_id))]
+
+    # ----------------- Export for UI -----------------
+    @synchronized
+    def to_networkx(self) -> nx.DiGraph:
+        """Materialize the graph as a networkx.DiGraph (node attributes included)."""
+        import networkx as nx
+
+        G = nx.DiGraph()
+        G.add_nodes_from(self.concepts())
+        G.add_edges_from(self.edges())
+        return G
@@ -1,43 +1,195 @@
 from __future__ import annotations
 
-from typing import Iterable, Optional, List, Dict
+import functools
+import os
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Iterable, Iterator, Optional, List, Dict, Tuple
 
-import networkx as nx
+from alp.graph.layout import Position, incremental_layout
+
+if TYPE_CHECKING:
+    import networkx as nx
 
 # Attribute keys for node data in the graph
 KNOWN_ATTR = "known"
 NAME_ATTR = "name"
 CONTENT_ATTR = "content"
+DIFFICULTY_ATTR = "difficulty"
+
+# Storage backends: "networkx" (dict-of-dicts DiGraph) or "compact" (array-backed, see compact_graph)
+GRAPH_BACKENDS = ("networkx", "compact")
+GRAPH_BACKEND = os.getenv("ALP_GRAPH_BACKEND", "networkx")
+# Number of recent shortest_path results remembered per graph (cleared whenever the graph changes)
+PATH_MEMO_SIZE = 64
+
+
+def synchronized(method: Callable) -> Callable:
+    """Run a KnowledgeGraph method under the graph's lock (see KnowledgeGraph)."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def bidirectional_bfs(start: Hashable, end: Hashable,
+                      forward: Callable[[Hashable], Iterable[Hashable]],
+                      backward: Callable[[Hashable], Iterable[Hashable]]) -> Optional[List[Hashable]]:
+    """
+    Shortest unweighted path from start to end, searching forward from start and backward from end,
+    always expanding the smaller frontier. Returns None if the searches never meet.
+    """
+    if start == end:
+        return [start]
+    pred: Dict[Hashable, Hashable] = {start: None}
+    succ: Dict[Hashable, Hashable] = {end: None}
+    front, back = [start], [end]
+    meet = None
+    while front and back and meet is None:
+        if len(front) <= len(back):
+            level = []
+            for u in front:
+                for v in forward(u):
+                    if v not in pred:
+                        pred[v] = u
+                        if v in succ:
+                            meet = v
+                            break
+                        level.append(v)
+                if meet is not None:
+                    break
+            front = level
+        else:
+            level = []
+            for u in back:
+                for v in backward(u):
+                    if v not in succ:
+                        succ[v] = u
+                        if v in pred:
+                            meet = v
+                            break
+                        level.append(v)
+                if meet is not None:
+                    break
+            back = level
+    if meet is None:
+        return None
+    path = []
+    node = meet
+    while node is not None:
+        path.append(node)
+        node = pred[node]
+    path.reverse()
+    node = succ[meet]
+    while node is not None:
+        path.append(node)
+        node = succ[node]
+    return path
 
 
 class KnowledgeGraph:
     """
     In-memory directed knowledge graph for a single user.
     Wraps a networkx.DiGraph; node IDs correspond to Concept IDs from the database.
+    Constructing with backend="compact" (or ALP_GRAPH_BACKEND=compact) returns a
+    CompactKnowledgeGraph, which implements the same API on flat arrays.
+    Node/edge/known counts are maintained incrementally, so mutate the graph only through
+    its methods (not via `G` directly).
+    Cached graphs are shared between threads, so every method that changes the graph or walks
+    its containers holds the graph's lock; concepts(), edges() and neighbors_*() return snapshots
+    rather than live views, and are safe to iterate while other threads write.
     """
 
-    def __init__(self) -> None:
+    def __new__(cls, backend: str | None = None):
+        backend = backend or GRAPH_BACKEND
+        if backend not in GRAPH_BACKENDS:
+            raise ValueError(f"Unknown graph backend {backend!r}; expected one of {GRAPH_BACKENDS}")
+        if cls is KnowledgeGraph and backend == "compact":
+            from alp.graph.compact_graph import CompactKnowledgeGraph
+            return super().__new__(CompactKnowledgeGraph)
+        return super().__new__(cls)
+
+    def __init__(self, backend: str | None = None) -> None:
+        import networkx as nx  # deferred: only graphs of this backend need it
+
         self.G: nx.DiGraph = nx.DiGraph()
+        self._lock = threading.RLock()
         self.version: int = 0  # can be used to track modifications
+        self.revision: int = 0  # last database graph revision applied (see GraphService.refresh_graph)
+        self._init_counters()
+        self._init_layout_cache()
+        self._init_path_memo()
+
+    def _init_path_memo(self) -> None:
+        # (start, end) -> path, valid for graph version `_path_memo_version`; guarded by `_path_memo_lock`
+        # since cached graphs are shared between request threads
+        self._path_memo: OrderedDict[Tuple[int, int], Optional[List[int]]] = OrderedDict()
+        self._path_memo_version: int = -1
+        self._path_memo_lock = threading.Lock()
+
+    def _init_counters(self) -> None:
+        self._node_count = 0
+        self._edge_count = 0
+        self._known_count = 0
+        # difficulty level -> [nodes, known]; concepts without a difficulty (notes) are not tallied
+        self._difficulty_tally: Dict[int, List[int]] = {}
+
+    def _count_concept(self, known: bool, difficulty: Optional[int], sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) a concept's contribution to the counters."""
+        self._node_count += sign
+        if known:
+            self._known_count += sign
+        if difficulty:
+            tally = self._difficulty_tally.setdefault(difficulty, [0, 0])
+            tally[0] += sign
+            if known:
+                tally[1] += sign
+
+    def _count_known(self, difficulty: Optional[int]) -> None:
+        """Record that an existing concept became known."""
+        self._known_count += 1
+        if difficulty:
+            self._difficulty_tally[difficulty][1] += 1
+
+    def _init_layout_cache(self) -> None:
+        # Node positions for the UI and the graph version they were computed at; cached graphs are
+        # shared between request threads, so both are read and replaced under `_layout_lock`
+        self._positions: Dict[int, Position] = {}
+        self._positions_version: int = -1
+        self._layout_lock = threading.Lock()
 
     # ----------------- Graph Construction -----------------
+    @synchronized
     def clear(self) -> None:
         """Remove all nodes and edges from the graph."""
         self.G.clear()
+        self._init_counters()
         self.version += 1
 
-    def add_concept(self, concept_id: int, name: str, known: bool, content: str | None = None) -> None:
-        """Add a concept node to the graph (if not already present)."""
+    @synchronized
+    def add_concept(self, concept_id: int, name: str, known: bool, content: str | None = None,
+                    difficulty: int | None = None) -> None:
+        """Add a concept node to the graph (updating its data if already present)."""
+        old = self.G.nodes.get(concept_id)
+        if old is not None:
+            self._count_concept(old.get(KNOWN_ATTR), old.get(DIFFICULTY_ATTR), -1)
         self.G.add_node(
             concept_id,
             **{
                 NAME_ATTR: name,
                 KNOWN_ATTR: bool(known),
                 CONTENT_ATTR: content,
+                DIFFICULTY_ATTR: difficulty,
             },
         )
+        self._count_concept(bool(known), difficulty, 1)
         self.version += 1
 
+    @synchronized
     def add_edge(self, src_id: int, dst_id: int) -> None:
         """Add a directed edge from src -> dst in the graph (ignores self-loops or missing nodes)."""
         if src_id == dst_id:
@@ -45,6 +197,8 @@ class KnowledgeGraph:
         if not (src_id in self.G and dst_id in self.G):
             # If either node is missing, skip adding this edge
             return
+        if not self.G.has_edge(src_id, dst_id):
+            self._edge_count += 1
         self.G.add_edge(src_id, dst_id)
         self.version += 1
 
@@ -53,15 +207,32 @@ class KnowledgeGraph:
         """Check if a concept node with given ID exists in the graph."""
         return concept_id in self.G
 
+    def has_edge(self, src_id: int, dst_id: int) -> bool:
+        """Check if a directed edge src -> dst exists in the graph."""
+        return self.G.has_edge(src_id, dst_id)
+
     def concept_data(self, concept_id: int) -> dict:
         """Get the data dictionary for a concept node."""
         return self.G.nodes[concept_id]
 
+    @synchronized
+    def concepts(self) -> Iterator[Tuple[int, dict]]:
+        """Iterate over (concept_id, data) pairs for all concept nodes (as of the call)."""
+        return iter(list(self.G.nodes(data=True)))
+
+    @synchronized
+    def edges(self) -> Iterator[Tuple[int, int]]:
+        """Iterate over all directed (src, dst) edges (as of the call)."""
+        return iter(list(self.G.edges()))
+
+    @synchronized
     def mark_known(self, concept_id: int) -> None:
         """Mark a concept as known in the graph (if present)."""
         if concept_id in self.G:
-            if not self.G.nodes[concept_id].get(KNOWN_ATTR):
-                self.G.nodes[concept_id][KNOWN_ATTR] = True
+            data = self.G.nodes[concept_id]
+            if not data.get(KNOWN_ATTR):
+                data[KNOWN_ATTR] = True
+                self._count_known(data.get(DIFFICULTY_ATTR))
                 self.version += 1
 
     def is_known(self, concept_id: int) -> bool:
@@ -72,24 +243,55 @@ class KnowledgeGraph:
         """
         Find a shortest path (list of concept IDs) from start_id to end_id.
         Tries directed path first; falls back to undirected if no directed path exists.
-        Returns None if no path is found.
+        Returns None if no path is found; raises networkx.NodeNotFound if either concept is missing.
+        Recent results are memoized until the graph next changes.
         """
-        try:
-            return nx.shortest_path(self.G, start_id, end_id)
-        except nx.NetworkXNoPath:
-            pass
-        try:
-            return nx.shortest_path(self.G.to_undirected(), start_id, end_id)
-        except nx.NetworkXNoPath:
-            return None
+        for concept_id, role in ((start_id, "Source"), (end_id, "Target")):
+            if not self.has_concept(concept_id):
+                import networkx as nx
+
+                raise nx.NodeNotFound(f"{role} {concept_id} is not in G")
+        key = (start_id, end_id)
+        with self._path_memo_lock:
+            version = self.version
+            if self._path_memo_version != version:
+                self._path_memo.clear()
+                self._path_memo_version = version
+            found = key in self._path_memo
+            if found:
+                self._path_memo.move_to_end(key)
+                path = self._path_memo[key]
+        if not found:
+            # Search outside the lock; the result is only kept if the graph did not change meanwhile
+            path = self._find_path(start_id, end_id)
+            with self._path_memo_lock:
+                if self._path_memo_version == version:
+                    self._path_memo[key] = path
+                    if len(self._path_memo) > PATH_MEMO_SIZE:
+                        self._path_memo.popitem(last=False)
+        return list(path) if path is not None else None
+
+    @synchronized
+    def _find_path(self, start_id: int, end_id: int) -> Optional[List[int]]:
+        succ, pred = self.G.succ, self.G.pred
+        path = bidirectional_bfs(start_id, end_id, succ.__getitem__, pred.__getitem__)
+        if path is None:
+            # Treat edges as undirected on the fly instead of copying the graph
+            def both(u: int) -> Iterable[int]:
+                return chain(succ[u], pred[u])
+
+            path = bidirectional_bfs(start_id, end_id, both, both)
+        return path
 
+    @synchronized
     def neighbors_out(self, concept_id: int) -> Iterable[int]:
         """Iterate over concept IDs that are direct children (outgoing edges) of the given concept."""
-        return self.G.successors(concept_id)
+        return list(self.G.successors(concept_id))
 
+    @synchronized
     def neighbors_in(self, concept_id: int) -> Iterable[int]:
         """Iterate over concept IDs that are direct parents (incoming edges) of the given concept."""
-        return self.G.predecessors(concept_id)
+        return list(self.G.predecessors(concept_id))
 
     # ----------------- Export for UI -----------------
     def to_cytoscape_elements(self, highlight_path: List[int] | None = None) -> List[Dict]:
@@ -100,13 +302,16 @@ class KnowledgeGraph:
         highlight_edges: set[tuple[int, int]] = set()
         if highlight_path and len(highlight_path) > 1:
             for u, v in zip(highlight_path, highlight_path[1:]):
-                if self.G.has_edge(u, v):
+                if self.has_edge(u, v):
                     highlight_edges.add((u, v))
-                elif self.G.has_edge(v, u):
+                elif self.has_edge(v, u):
                     highlight_edges.add((v, u))  # highlight undirected edge if path goes opposite direction
 
-        # Layout the graph for visualization
-        pos = nx.spring_layout(self.G, seed=42)
+        # Layout the graph for visualization; nodes and edges come from one snapshot, so writers
+        # adding concepts meanwhile cannot leave a node without a position
+        snapshot = self._snapshot()
+        _, concepts, edges = snapshot
+        pos = self._layout(snapshot)
 
         def scale(point: tuple[float, float]) -> tuple[float, float]:
             # Scale and translate graph coordinates for nicer appearance
@@ -114,7 +319,7 @@ class KnowledgeGraph:
 
         elements: List[Dict] = []
         # Nodes
-        for cid, data in self.G.nodes(data=True):
+        for cid, data in concepts:
             x, y = scale(pos[cid])
             node_el = {
                 "data": {
@@ -128,17 +333,57 @@ class KnowledgeGraph:
                 node_el["data"]["pathHighlight"] = "true"
             elements.append(node_el)
         # Edges
-        for u, v in self.G.edges():
+        for u, v in edges:
             edge_el = {"data": {"source": str(u), "target": str(v)}}
             if (u, v) in highlight_edges:
                 edge_el["data"]["pathHighlight"] = "true"
             elements.append(edge_el)
         return elements
 
-    def counts(self) -> Dict[str, int]:
-        """Return counts of nodes, edges, and known nodes in the graph."""
-        return {
-            "nodes": self.G.number_of_nodes(),
-            "edges": self.G.number_of_edges(),
-            "known": sum(1 for _, d in self.G.nodes(data=True) if d.get(KNOWN_ATTR)),
+    @synchronized
+    def _snapshot(self) -> Tuple[int, List[Tuple[int, dict]], List[Tuple[int, int]]]:
+        """Return (version, concepts, edges) as of one instant."""
+        return self.version, list(self.concepts()), list(self.edges())
+
+    def _layout(self, snapshot: Optional[Tuple[int, List[Tuple[int, dict]], List[Tuple[int, int]]]] = None
+                ) -> Dict[int, Position]:
+        """
+        Return 2D positions for all nodes of `snapshot` (default: the graph now), cached per graph version.
+        After changes only newly added nodes are laid out; existing positions stay pinned.
+        The layout runs without the graph lock, so writers are not held up by it; concurrent callers
+        wait for one computation instead of each laying out the graph.
+        """
+        version, concepts, edges = snapshot or self._snapshot()
+        with self._layout_lock:
+            if self._positions_version != version:
+                self._positions = incremental_layout([cid for cid, _ in concepts], edges, self._positions)
+                self._positions_version = version
+            return self._positions
+
+    @synchronized
+    def counts(self, detailed: bool = False) -> Dict[str, Any]:
+        """
+        Return counts of nodes, edges, and known nodes in the graph (constant time).
+        With detailed=True, also return "by_difficulty" ({level: {"nodes", "known"}}) and
+        "by_depth" (cumulative tallies of concepts a plan of that depth covers, i.e. difficulty <= depth).
+        """
+        result: Dict[str, Any] = {
+            "nodes": self._node_count,
+            "edges": self._edge_count,
+            "known": self._known_count,
         }
+        if detailed:
+            by_difficulty = {
+                level: {"nodes": tally[0], "known": tally[1]}
+                for level, tally in sorted(self._difficulty_tally.items())
+                if tally[0]
+            }
+            by_depth: Dict[int, Dict[str, int]] = {}
+            nodes = known = 0
+            for level, tally in by_difficulty.items():
+                nodes += tally["nodes"]
+                known += tally["known"]
+                by_depth[level] = {"nodes": nodes, "known": known}
+            result["by_difficulty"] = by_difficulty
+            result["by_depth"] = by_depth
+        return result
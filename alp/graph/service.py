@@ -1,16 +1,565 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple, List, Dict
+import asyncio
+import functools
+import itertools
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, Optional, Tuple, List, Dict
 
-from alp.ai.learning_plan import LearningPlan
-from alp.db.models import Note, Concept, Edge
-from alp.db.session import session_scope
-from alp.graph.knowledge_graph import KnowledgeGraph
+from sqlalchemy import func, insert, null, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from alp.ai.learning_plan import LearningPlan, LearningPlanNode
+from alp.db.models import Note, Concept, Edge, GraphRevision
+from alp.db.session import async_session_scope, session_scope, sharding_enabled
+from alp.graph.knowledge_graph import KnowledgeGraph, CONTENT_ATTR
 from alp.logging.config import get_logger
 from alp.logging.instrumentation import traced
+from alp.user.service import UserService
 
 log = get_logger("graph.service")
 
+# Upper bound on the total size (nodes + edges) of all graphs held by the shared cache
+GRAPH_CACHE_MAX_WEIGHT = int(os.getenv("ALP_GRAPH_CACHE_MAX_WEIGHT", "200000"))
+# Lazy mode keeps concept content out of in-memory graphs; it is fetched on demand via concept_content()
+LAZY_CONTENT = os.getenv("ALP_GRAPH_LAZY_CONTENT", "0") not in ("0", "false", "False")
+# Concept contents kept by the lazy-mode content cache, across all users
+CONTENT_CACHE_SIZE = int(os.getenv("ALP_CONTENT_CACHE_SIZE", "256"))
+# Notes read from the input and inserted per round trip by add_notes
+NOTE_BATCH_SIZE = int(os.getenv("ALP_NOTE_BATCH_SIZE", "500"))
+
+
+def _graph_attributes(graph: KnowledgeGraph) -> Dict[str, int]:
+    counts = graph.counts()
+    return {"graph.nodes": counts["nodes"], "graph.edges": counts["edges"]}
+
+
+def _inject_attributes(result: Tuple[int, int, List[str]]) -> Dict[str, int]:
+    added, reused, skipped = result
+    return {"plan.added": added, "plan.reused": reused, "plan.skipped": len(skipped)}
+
+
+def _add_notes_attributes(result: Tuple[int, int]) -> Dict[str, int]:
+    return {"notes.added": result[0], "notes.parents_created": result[1]}
+
+
+class GraphCache:
+    """
+    Process-wide LRU cache of per-user KnowledgeGraphs.
+    Capacity is measured in graph weight (nodes + edges) rather than entries, so a handful of
+    huge graphs cannot pin unbounded memory; the least recently used users are evicted first.
+    Writers update cached graphs in place, and each entry remembers the graph version it was
+    weighed at so its size is only re-measured after the graph actually changed.
+
+    Cached graphs are shared, not copied: load_graph hands every caller the same instance. In-place
+    writes to a graph that may be shared therefore go through apply or update, which run them under
+    the cache lock, so concurrent writers (API worker threads, Streamlit sessions) never interleave.
+    Callers must not mutate a loaded graph directly; GraphService's write methods do it for them.
+    Readers need no cache lock: each graph method holds the graph's own lock, and the iterating
+    ones (concepts, edges, neighbors_*) return snapshots, so reads never race a write in progress.
+    """
+
+    def __init__(self, max_weight: int = GRAPH_CACHE_MAX_WEIGHT) -> None:
+        self.max_weight = max_weight
+        # user_id -> (graph, version when weighed, weight)
+        self._entries: OrderedDict[str, Tuple[KnowledgeGraph, int, int]] = OrderedDict()
+        self._weight = 0
+        self._lock = threading.RLock()
+        # Loads in flight per user, and writes seen for those users while loading
+        self._inflight: Dict[str, int] = {}
+        self._writes: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _weigh(graph: KnowledgeGraph) -> int:
+        counts = graph.counts()
+        return counts["nodes"] + counts["edges"]
+
+    def _store(self, user_id: str, graph: KnowledgeGraph) -> None:
+        old = self._entries.pop(user_id, None)
+        if old:
+            self._weight -= old[2]
+        weight = self._weigh(graph)
+        if weight > self.max_weight:
+            return  # too big to ever fit; serve it uncached
+        self._entries[user_id] = (graph, graph.version, weight)
+        self._weight += weight
+        while self._weight > self.max_weight:
+            _, (_, _, evicted_weight) = self._entries.popitem(last=False)
+            self._weight -= evicted_weight
+            self.evictions += 1
+
+    def get(self, user_id: str) -> Optional[KnowledgeGraph]:
+        """Return the cached graph for a user (marking it most recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            graph, version, _ = entry
+            if graph.version != version:
+                self._store(user_id, graph)
+            else:
+                self._entries.move_to_end(user_id)
+            return graph
+
+    def begin_load(self, user_id: str) -> int:
+        """Register a load from the database; the returned token must be passed to finish_load."""
+        with self._lock:
+            self._inflight[user_id] = self._inflight.get(user_id, 0) + 1
+            return self._writes.get(user_id, 0)
+
+    def finish_load(self, user_id: str, token: int, graph: Optional[KnowledgeGraph]) -> None:
+        """
+        Complete a load started with begin_load and cache its graph, unless a write for the same
+        user landed while it was being read (the loaded graph may then be stale).
+        """
+        with self._lock:
+            remaining = self._inflight.get(user_id, 0) - 1
+            if remaining > 0:
+                self._inflight[user_id] = remaining
+                writes = self._writes.get(user_id, 0)
+            else:
+                self._inflight.pop(user_id, None)
+                writes = self._writes.pop(user_id, 0)
+            if graph is not None and writes == token:
+                self._store(user_id, graph)
+
+    def apply(self, user_id: str, fn: Callable[[KnowledgeGraph], None],
+              graph: Optional[KnowledgeGraph] = None) -> None:
+        """
+        Apply an in-place update, under the cache lock, to `graph` (the caller's copy, if given) and
+        to the user's cached graph (if cached), once per distinct instance.
+        """
+        with self._lock:
+            if graph is not None:
+                fn(graph)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                if user_id in self._inflight:
+                    self._writes[user_id] = self._writes.get(user_id, 0) + 1
+                return
+            if entry[0] is not graph:
+                fn(entry[0])
+            self._store(user_id, entry[0])
+
+    def update(self, graph: KnowledgeGraph, fn: Callable[[KnowledgeGraph], None]) -> None:
+        """Apply an in-place update to `graph` alone, under the cache lock (it may be a cached graph)."""
+        with self._lock:
+            fn(graph)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's graph from the cache."""
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+            if entry:
+                self._weight -= entry[2]
+            if user_id in self._inflight:
+                self._writes[user_id] = self._writes.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        """Drop all cached graphs and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+            self._writes.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "users": len(self._entries),
+                "weight": self._weight,
+                "max_weight": self.max_weight,
+            }
+
+
+class ContentCache:
+    """
+    LRU of concept contents fetched in lazy mode, grouped per user so that a user's entries can be
+    evicted together by the writes that change their graph. Holds at most `max_entries` contents in
+    total; the oldest entry of the least recently used user goes first.
+    """
+
+    def __init__(self, max_entries: int = CONTENT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        # user_id -> (concept_id -> content), both in least recently used order
+        self._users: OrderedDict[str, OrderedDict[int, Optional[str]]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a fetch that overlapped one is not stored
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, concept_id: int, fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        """Return the cached content, or call `fetch` (outside the lock) and cache its result."""
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries is not None and concept_id in entries:
+                self.hits += 1
+                self._users.move_to_end(user_id)
+                entries.move_to_end(concept_id)
+                return entries[concept_id]
+            self.misses += 1
+            epoch = self._epoch
+        content = fetch()
+        with self._lock:
+            if epoch == self._epoch and self.max_entries > 0:
+                entries = self._users.setdefault(user_id, OrderedDict())
+                self._users.move_to_end(user_id)
+                if concept_id not in entries:
+                    self._size += 1
+                entries[concept_id] = content
+                while self._size > self.max_entries:
+                    oldest_user, oldest = next(iter(self._users.items()))
+                    oldest.popitem(last=False)
+                    self._size -= 1
+                    if not oldest:
+                        del self._users[oldest_user]
+        return content
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's cached contents."""
+        with self._lock:
+            self._epoch += 1
+            entries = self._users.pop(user_id, None)
+            if entries:
+                self._size -= len(entries)
+
+    def clear(self) -> None:
+        """Drop all cached contents and reset counters."""
+        with self._lock:
+            self._epoch += 1
+            self._users.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "users": len(self._users),
+                "entries": self._size,
+                "max_entries": self.max_entries,
+            }
+
+
+def _current_revision(db: Session, user_id: str) -> int:
+    """Return the user's latest graph revision (0 if the graph was never written)."""
+    return db.scalar(select(GraphRevision.revision).where(GraphRevision.user_id == user_id)) or 0
+
+
+def _next_revision(db: Session, user_id: str) -> int:
+    """
+    Atomically bump and return the user's graph revision.
+    The upsert takes SQLite's write lock, so revisions commit in increasing order.
+    """
+    stmt = (
+        sqlite_insert(GraphRevision)
+        .values(user_id=user_id, revision=1)
+        .on_conflict_do_update(
+            index_elements=[GraphRevision.user_id],
+            set_={"revision": GraphRevision.revision + 1},
+        )
+        .returning(GraphRevision.revision)
+    )
+    return db.execute(stmt).scalar_one()
+
+
+def _graph_content(content: Optional[str]) -> Optional[str]:
+    """Content to hold in an in-memory graph node (none in lazy mode)."""
+    return None if LAZY_CONTENT else content
+
+
+def _concept_rows(db: Session, *criteria) -> list:
+    """Select (id, name, is_known, difficulty, content) concept rows; lazy mode projects away the content column."""
+    content = null().label("content") if LAZY_CONTENT else Concept.content
+    return db.execute(
+        select(Concept.id, Concept.name, Concept.is_known, Concept.difficulty, content).where(*criteria)
+    ).all()
+
+
+# Bound parameters allowed in one SQLite statement (999 before SQLite 3.32)
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+@functools.lru_cache(maxsize=64)
+def _insert_concepts_sql(columns: Tuple[str, ...], rows: int, returning: Tuple[str, ...]) -> str:
+    row = "(" + ", ".join("?" * len(columns)) + ")"
+    return (f"INSERT INTO {Concept.__tablename__} ({', '.join(columns)}) VALUES {', '.join([row] * rows)} "
+            f"RETURNING {', '.join(returning)}")
+
+
+def _insert_concepts(db: Session, rows: List[Dict[str, object]]) -> List[int]:
+    """
+    Insert concept rows (dicts with the same keys) with multi-row INSERT ... RETURNING statements,
+    as many rows per statement as SQLite's parameter limit allows; returns the ids in `rows` order.
+    The statement is written out directly: compiling a multi-row insert().values() through
+    SQLAlchemy costs more than the round trips it saves. SQLite does not guarantee the order of
+    RETURNING rows, so they are matched back by name (and content, when names repeat); rows
+    equal on those are interchangeable.
+    """
+    columns = tuple(rows[0])
+    with_content = len({row["name"] for row in rows}) < len(rows)
+    returning = ("id", "name", "content") if with_content else ("id", "name")
+    conn = db.connection()
+    ids: Dict[Tuple[object, ...], List[int]] = {}
+    chunk = SQLITE_MAX_VARIABLES // len(columns)
+    for start in range(0, len(rows), chunk):
+        batch = rows[start:start + chunk]
+        params = tuple(row[column] for row in batch for column in columns)
+        for cid, *key in conn.exec_driver_sql(_insert_concepts_sql(columns, len(batch), returning), params):
+            ids.setdefault(tuple(key), []).append(cid)
+    return [ids[(row["name"], row["content"]) if with_content else (row["name"],)].pop() for row in rows]
+
+
+def _insert_edges(db: Session, user_id: str, edges: Iterable[Tuple[int, int]], revision: int) -> None:
+    """
+    Insert (source, target) edges, skipping those already stored: a caller's graph may be stale
+    (a concurrent writer or a cached copy may have missed an edge), and edges are unique per user.
+    """
+    db.execute(
+        sqlite_insert(Edge).on_conflict_do_nothing(index_elements=["user_id", "source_id", "target_id"]),
+        [{"user_id": user_id, "source_id": src, "target_id": tgt, "revision": revision} for src, tgt in edges],
+    )
+
+
+def _fetch_content(user_id: str, concept_id: int) -> Optional[str]:
+    with session_scope(user_id) as db:
+        return db.scalar(select(Concept.content).where(Concept.user_id == user_id, Concept.id == concept_id))
+
+
+def _read_graph(db: Session, user_id: str) -> KnowledgeGraph:
+    """Read the user's concepts and edges from `db` into a new KnowledgeGraph."""
+    graph = KnowledgeGraph()
+    # Read the revision first: rows changed after this point are re-applied by the next refresh
+    graph.revision = _current_revision(db, user_id)
+    # Load all concepts for the user
+    concepts = _concept_rows(db, Concept.user_id == user_id)
+    for concept in concepts:
+        graph.add_concept(
+            concept_id=concept.id,
+            name=concept.name,
+            known=concept.is_known,
+            content=concept.content,
+            difficulty=concept.difficulty,
+        )
+    # Load all edges for the user
+    edges = db.execute(select(Edge.source_id, Edge.target_id).where(Edge.user_id == user_id)).all()
+    for edge in edges:
+        graph.add_edge(edge.source_id, edge.target_id)
+    return graph
+
+
+def _add_note_tx(db: Session, user_id: str, title: str, content: str, parent_name: Optional[str],
+                 require_user: bool) -> Tuple[int, Optional[int], bool]:
+    """Write add_note's rows in `db`; returns (concept_id, parent_id, whether the parent was created)."""
+    if require_user:
+        UserService.ensure_user(db, user_id)
+    revision = _next_revision(db, user_id)
+    # Create and save the Note
+    note = Note(user_id=user_id, title=title, content=content)
+    db.add(note)
+    db.flush()  # flush to assign note.id if needed (not used further here)
+    # Create the Concept linked to this note
+    concept = Concept(user_id=user_id, name=title, content=content, is_known=True, revision=revision)
+    db.add(concept)
+    db.flush()  # assign concept.id
+    concept_id = concept.id
+    parent_id: Optional[int] = None
+    new_parent = False
+    if parent_name:
+        # Find existing parent concept by name (case-insensitive, indexed), or create if it doesn't exist
+        parent = db.query(Concept).filter(
+            Concept.user_id == user_id,
+            func.lower(Concept.name) == parent_name.lower(),
+        ).first()
+        if not parent:
+            parent = Concept(user_id=user_id, name=parent_name, content=None, is_known=False,
+                             revision=revision)
+            db.add(parent)
+            db.flush()
+            new_parent = True
+        parent_id = parent.id
+        # Create an edge from parent -> new concept
+        db.add(Edge(user_id=user_id, source_id=parent.id, target_id=concept.id, revision=revision))
+    return concept_id, parent_id, new_parent
+
+
+def _inject_plan_tx(db: Session, user_id: str, graph: KnowledgeGraph, plan: LearningPlan, depth: int,
+                    max_nodes: int, require_user: bool = False
+                    ) -> Tuple[int, int, List[str], List[Tuple[int, str, Optional[str], int]], List[Tuple[int, int]]]:
+    """
+    Write inject_plan's concepts and edges in `db`; returns (added, reused, skipped prerequisites,
+    new concepts, new edges), the last two to be applied to in-memory graphs after commit.
+    """
+    if require_user:
+        UserService.ensure_user(db, user_id)
+    # Filter the plan nodes by depth and limit
+    filtered_plan = plan.filtered(depth, max_nodes)
+    # Map existing concept names (lowercase) to their IDs in the current graph
+    existing_map: Dict[str, int] = {
+        data.get("name").lower(): cid
+        for cid, data in graph.concepts()
+        if data.get("name")
+    }
+    added = 0
+    reused = 0
+    skipped_prereqs: set[str] = set()
+    name_to_id: Dict[str, int] = {}
+    # Changes applied to `graph`, replayed onto the cached graph if the caller holds a different copy
+    new_concepts: List[Tuple[int, str, Optional[str], int]] = []
+    new_edges: List[Tuple[int, int]] = []
+    # 1. Reuse concepts already in the graph; collect the rest for a single batched insert
+    to_insert: List[LearningPlanNode] = []
+    pending: set[str] = set()
+    for node in filtered_plan.nodes:
+        lname = node.name.lower()
+        if lname in existing_map or lname in pending:
+            reused += 1
+        else:
+            to_insert.append(node)
+            pending.add(lname)
+    revision = _next_revision(db, user_id) if to_insert else None
+    if to_insert:
+        # New concepts are marked as unknown/learning
+        ids = _insert_concepts(db, [
+            {"user_id": user_id, "name": node.name, "content": node.summary or None,
+             "is_known": False, "difficulty": node.difficulty, "revision": revision}
+            for node in to_insert
+        ])
+        for node, cid in zip(to_insert, ids):
+            existing_map[node.name.lower()] = cid
+            new_concepts.append((cid, node.name, _graph_content(node.summary or None), node.difficulty))
+        added = len(new_concepts)
+    for node in filtered_plan.nodes:
+        name_to_id[node.name] = existing_map[node.name.lower()]
+    # 2. Resolve prerequisite edges in one pass, then insert them as one batch
+    seen_edges: set[Tuple[int, int]] = set()
+    for node in filtered_plan.nodes:
+        tgt = name_to_id[node.name]
+        for prereq_name in node.prerequisites:
+            lname = prereq_name.lower()
+            if lname not in existing_map:
+                skipped_prereqs.add(prereq_name)
+                continue
+            src = existing_map[lname]
+            if src == tgt or (src, tgt) in seen_edges or graph.has_edge(src, tgt):
+                continue
+            seen_edges.add((src, tgt))
+            new_edges.append((src, tgt))
+    if new_edges:
+        if revision is None:
+            revision = _next_revision(db, user_id)
+        _insert_edges(db, user_id, new_edges, revision)
+    return added, reused, sorted(skipped_prereqs), new_concepts, new_edges
+
+
+# Shared by every GraphService caller in this process (API worker threads, Streamlit sessions)
+graph_cache = GraphCache()
+content_cache = ContentCache()
+
+
+def _apply_plan_changes(user_id: str, graph: KnowledgeGraph, new_concepts: List[Tuple[int, str, Optional[str], int]],
+                        new_edges: List[Tuple[int, int]]) -> None:
+    """Add committed plan concepts/edges to `graph`, and to the cached graph if the caller holds a different copy."""
+
+    def _update(target: KnowledgeGraph) -> None:
+        for cid, name, content, difficulty in new_concepts:
+            target.add_concept(cid, name, False, content, difficulty)
+        for src, tgt in new_edges:
+            target.add_edge(src, tgt)
+
+    graph_cache.apply(user_id, _update, graph)
+    content_cache.invalidate(user_id)
+
+
+class PlanStreamInjector:
+    """
+    Injects learning plan nodes into a user's graph one at a time, as a streamed plan produces them.
+    Nodes are taken in arrival order (rather than sorted by difficulty as inject_plan does), up to
+    max_nodes with difficulty <= depth. A prerequisite that has not arrived yet is linked as soon as
+    it does; those still missing when the stream ends are reported as skipped.
+    """
+
+    def __init__(self, user_id: str, graph: KnowledgeGraph, depth: int, max_nodes: int) -> None:
+        self.user_id = user_id
+        self.graph = graph
+        self.depth = depth
+        self.max_nodes = max_nodes
+        self.added = 0
+        self.reused = 0
+        self._existing: Dict[str, int] = {
+            data.get("name").lower(): cid for cid, data in graph.concepts() if data.get("name")
+        }
+        self._accepted: set[str] = set()
+        # Prerequisite name (lowercase) -> (original name, concept ids waiting for it)
+        self._waiting: Dict[str, Tuple[str, List[int]]] = {}
+
+    def add(self, node: LearningPlanNode) -> Optional[Dict[str, object]]:
+        """
+        Inject one node in its own transaction. Returns an event describing it
+        (name, concept_id, difficulty, status "added"/"reused"), or None if the node was filtered out.
+        """
+        lname = node.name.lower()
+        if int(node.difficulty) > self.depth or lname in self._accepted:
+            return None
+        if self.max_nodes and len(self._accepted) >= self.max_nodes:
+            return None
+        self._accepted.add(lname)
+        new_concepts: List[Tuple[int, str, Optional[str], int]] = []
+        edges: Dict[Tuple[int, int], None] = {}
+        with session_scope(self.user_id) as db:
+            revision: Optional[int] = None
+            cid = self._existing.get(lname)
+            if cid is None:
+                revision = _next_revision(db, self.user_id)
+                cid = db.scalar(insert(Concept).returning(Concept.id).values(
+                    user_id=self.user_id, name=node.name, content=node.summary or None,
+                    is_known=False, difficulty=node.difficulty, revision=revision,
+                ))
+                self._existing[lname] = cid
+                new_concepts.append((cid, node.name, _graph_content(node.summary or None), node.difficulty))
+                self.added += 1
+                status = "added"
+            else:
+                self.reused += 1
+                status = "reused"
+            for prereq_name in node.prerequisites:
+                plname = prereq_name.lower()
+                src = self._existing.get(plname)
+                if src is None:
+                    self._waiting.setdefault(plname, (prereq_name, []))[1].append(cid)
+                else:
+                    edges[(src, cid)] = None
+            for tgt in self._waiting.pop(lname, ("", []))[1]:
+                edges[(cid, tgt)] = None
+            new_edges = [(src, tgt) for src, tgt in edges if src != tgt and not self.graph.has_edge(src, tgt)]
+            if new_edges:
+                if revision is None:
+                    revision = _next_revision(db, self.user_id)
+                _insert_edges(db, self.user_id, new_edges, revision)
+        _apply_plan_changes(self.user_id, self.graph, new_concepts, new_edges)
+        return {"name": node.name, "concept_id": cid, "difficulty": node.difficulty, "status": status}
+
+    def result(self) -> Tuple[int, int, List[str]]:
+        """Return (added_count, reused_count, skipped_prerequisites) so far, like inject_plan."""
+        return self.added, self.reused, sorted(name for name, _ in self._waiting.values())
+
 
 class GraphService:
     """
@@ -19,62 +568,249 @@ class GraphService:
     """
 
     @classmethod
-    @traced("graph.load_graph")
-    def load_graph(cls, user_id: str) -> KnowledgeGraph:
+    @traced("graph.load_graph", result_attributes=_graph_attributes)
+    def load_graph(cls, user_id: str, use_cache: bool = True) -> KnowledgeGraph:
         """
-        Load the knowledge graph for the given user from the database.
+        Load the knowledge graph for the given user.
+        Served from the shared graph cache when possible; otherwise read from the database and cached.
+        The cached instance is shared with other callers: its methods are safe to call while other
+        threads write (see KnowledgeGraph), but change it only through GraphService's write methods.
         Returns a KnowledgeGraph object containing all concepts and edges for that user.
         """
+        if use_cache:
+            cached = graph_cache.get(user_id)
+            if cached is not None:
+                log.debug("load_graph.cache_hit", user_id=user_id)
+                return cached
+        else:
+            graph_cache.invalidate(user_id)
+            content_cache.invalidate(user_id)
+        token = graph_cache.begin_load(user_id)
+        graph: Optional[KnowledgeGraph] = None
+        try:
+            graph = cls._load_graph_from_db(user_id)
+        finally:
+            graph_cache.finish_load(user_id, token, graph)
+        return graph
+
+    @classmethod
+    @traced("graph.load_graph", result_attributes=_graph_attributes)
+    async def aload_graph(cls, user_id: str, use_cache: bool = True) -> KnowledgeGraph:
+        """Async variant of load_graph; database reads go through the async engine."""
+        if sharding_enabled():
+            return await asyncio.to_thread(cls.load_graph, user_id, use_cache)
+        if use_cache:
+            cached = graph_cache.get(user_id)
+            if cached is not None:
+                log.debug("load_graph.cache_hit", user_id=user_id)
+                return cached
+        else:
+            graph_cache.invalidate(user_id)
+            content_cache.invalidate(user_id)
+        token = graph_cache.begin_load(user_id)
+        graph: Optional[KnowledgeGraph] = None
+        try:
+            log.debug("load_graph.start", user_id=user_id)
+            async with async_session_scope() as db:
+                graph = await db.run_sync(_read_graph, user_id)
+            counts = graph.counts()
+            log.info("load_graph.done", nodes=counts["nodes"], edges=counts["edges"])
+        finally:
+            graph_cache.finish_load(user_id, token, graph)
+        return graph
+
+    @classmethod
+    def cache_stats(cls) -> Dict[str, int]:
+        """Return counters of the shared graph cache (hits, misses, evictions, occupancy)."""
+        return graph_cache.stats()
+
+    @classmethod
+    def invalidate_cache(cls, user_id: str) -> None:
+        """Drop the user's graph and fetched contents from the shared caches so the next load re-reads the database."""
+        graph_cache.invalidate(user_id)
+        content_cache.invalidate(user_id)
+
+    @classmethod
+    def _load_graph_from_db(cls, user_id: str) -> KnowledgeGraph:
         log.debug("load_graph.start", user_id=user_id)
-        graph = KnowledgeGraph()
-        with session_scope() as db:
-            # Load all concepts for the user
-            concepts = db.query(Concept).filter(Concept.user_id == user_id).all()
+        with session_scope(user_id) as db:
+            graph = _read_graph(db, user_id)
+        counts = graph.counts()
+        log.info("load_graph.done", nodes=counts["nodes"], edges=counts["edges"])
+        return graph
+
+    @classmethod
+    @traced("graph.refresh_graph")
+    def refresh_graph(cls, user_id: str, graph: KnowledgeGraph, since_revision: Optional[int] = None) -> int:
+        """
+        Apply to `graph` only the concepts and edges changed since `since_revision`
+        (defaults to the last revision the graph has seen), so catching up costs O(changes).
+        Returns the number of rows applied.
+        """
+        since = graph.revision if since_revision is None else since_revision
+        with session_scope(user_id) as db:
+            revision = _current_revision(db, user_id)
+            if revision <= since:
+                return 0
+            concepts = _concept_rows(db, Concept.user_id == user_id, Concept.revision > since)
+            edges = db.execute(
+                select(Edge.source_id, Edge.target_id).where(Edge.user_id == user_id, Edge.revision > since)
+            ).all()
+
+        def _update(target: KnowledgeGraph) -> None:
             for concept in concepts:
-                graph.add_concept(
+                target.add_concept(
                     concept_id=concept.id,
                     name=concept.name,
                     known=concept.is_known,
                     content=concept.content,
+                    difficulty=concept.difficulty,
                 )
-            # Load all edges for the user
-            edges = db.query(Edge).filter(Edge.user_id == user_id).all()
             for edge in edges:
-                graph.add_edge(edge.source_id, edge.target_id)
-        log.info("load_graph.done", nodes=graph.counts()["nodes"], edges=graph.counts()["edges"])
-        return graph
+                target.add_edge(edge.source_id, edge.target_id)
+            target.revision = max(target.revision, revision)
+
+        # `graph` may be the shared cached instance
+        graph_cache.update(graph, _update)
+        content_cache.invalidate(user_id)
+        log.debug("refresh_graph.done", since=since, revision=revision, concepts=len(concepts), edges=len(edges))
+        return len(concepts) + len(edges)
+
+    @classmethod
+    def concept_content(cls, user_id: str, concept_id: int, graph: Optional[KnowledgeGraph] = None) -> Optional[str]:
+        """
+        Return a concept's content: from the in-memory graph if it holds it, otherwise from the
+        database through the per-user LRU of recently viewed concepts (the lazy-mode path), which
+        the user's graph writes evict.
+        """
+        if graph is not None and graph.has_concept(concept_id):
+            content = graph.concept_data(concept_id).get(CONTENT_ATTR)
+            if content is not None:
+                return content
+        return content_cache.get(user_id, concept_id, lambda: _fetch_content(user_id, concept_id))
 
     @classmethod
     @traced("graph.add_note")
-    def add_note(cls, user_id: str, title: str, content: str, parent_name: Optional[str] = None) -> int:
+    def add_note(cls, user_id: str, title: str, content: str, parent_name: Optional[str] = None,
+                 require_user: bool = False) -> int:
         """
         Create a new Note and corresponding Concept (marked as known) for the user.
         If parent_name is provided, ensure a parent concept exists (or create it if not)
         and link it via an Edge to the new concept.
+        With require_user, raises UserNotFoundError (in the same transaction) if the user does not exist.
         Returns the concept ID of the newly created concept.
         """
         log.info("add_note.call", user_id=user_id, title=title, parent=parent_name)
-        with session_scope() as db:
-            # Create and save the Note
-            note = Note(user_id=user_id, title=title, content=content)
-            db.add(note)
-            db.flush()  # flush to assign note.id if needed (not used further here)
-            # Create the Concept linked to this note
-            concept = Concept(user_id=user_id, name=title, content=content, is_known=True)
-            db.add(concept)
-            db.flush()  # assign concept.id
-            if parent_name:
-                # Find existing parent concept by name, or create if it doesn't exist
-                parent = db.query(Concept).filter_by(user_id=user_id, name=parent_name).first()
-                if not parent:
-                    parent = Concept(user_id=user_id, name=parent_name, content=None, is_known=False)
-                    db.add(parent)
-                    db.flush()
-                # Create an edge from parent -> new concept
-                db.add(Edge(user_id=user_id, source_id=parent.id, target_id=concept.id))
-            log.info("add_note.done", concept_id=concept.id)
-            # Note: session_scope will commit on exit
-            return concept.id
+        with session_scope(user_id) as db:
+            concept_id, parent_id, new_parent = _add_note_tx(db, user_id, title, content, parent_name,
+                                                             require_user)
+        log.info("add_note.done", concept_id=concept_id)
+        cls._note_added(user_id, concept_id, title, content, parent_id, parent_name, new_parent)
+        return concept_id
+
+    @classmethod
+    @traced("graph.add_note")
+    async def aadd_note(cls, user_id: str, title: str, content: str, parent_name: Optional[str] = None,
+                        require_user: bool = False) -> int:
+        """Async variant of add_note; the transaction runs on the async engine."""
+        if sharding_enabled():
+            return await asyncio.to_thread(cls.add_note, user_id, title, content, parent_name, require_user)
+        log.info("add_note.call", user_id=user_id, title=title, parent=parent_name)
+        async with async_session_scope() as db:
+            concept_id, parent_id, new_parent = await db.run_sync(
+                _add_note_tx, user_id, title, content, parent_name, require_user
+            )
+        log.info("add_note.done", concept_id=concept_id)
+        cls._note_added(user_id, concept_id, title, content, parent_id, parent_name, new_parent)
+        return concept_id
+
+    @classmethod
+    def _note_added(cls, user_id: str, concept_id: int, title: str, content: str, parent_id: Optional[int],
+                    parent_name: Optional[str], new_parent: bool) -> None:
+        """Replay a committed add_note onto the user's cached graph."""
+
+        def _update(graph: KnowledgeGraph) -> None:
+            graph.add_concept(concept_id, title, True, _graph_content(content))
+            if parent_id is not None:
+                if new_parent:
+                    graph.add_concept(parent_id, parent_name, False, None)
+                graph.add_edge(parent_id, concept_id)
+
+        graph_cache.apply(user_id, _update)
+        content_cache.invalidate(user_id)
+
+    @classmethod
+    @traced("graph.add_notes", result_attributes=_add_notes_attributes)
+    def add_notes(cls, user_id: str, notes: Iterable[Tuple[str, str, Optional[str]]],
+                  require_user: bool = False) -> Tuple[int, int]:
+        """
+        Bulk variant of add_note for (title, content, parent_name) tuples, all in one transaction.
+        The input is consumed in batches of NOTE_BATCH_SIZE, so it can be a generator of any length;
+        each batch resolves its parents with one query and inserts notes, concepts and edges in bulk.
+        Parents are matched like repeated add_note calls would: an existing concept or an earlier
+        note of the import with that name (case-insensitive), otherwise a new unknown concept.
+        With require_user, raises UserNotFoundError before reading any input if the user does not exist.
+        Returns (notes_added, parents_created).
+        """
+        log.info("add_notes.call", user_id=user_id)
+        added = 0
+        parents_created = 0
+        # Lowercase name -> concept id, for every parent looked up and every concept created by this import
+        name_map: Dict[str, int] = {}
+        notes_iter = iter(notes)
+        with session_scope(user_id) as db:
+            if require_user:
+                UserService.ensure_user(db, user_id)
+            revision = _next_revision(db, user_id)
+            while True:
+                batch = list(itertools.islice(notes_iter, NOTE_BATCH_SIZE))
+                if not batch:
+                    break
+                # 1. Resolve parents not seen yet with one query (the first match wins, as in add_note)
+                lookup = {parent.lower() for _, _, parent in batch if parent} - name_map.keys()
+                if lookup:
+                    rows = db.execute(
+                        select(func.lower(Concept.name), Concept.id)
+                        .where(Concept.user_id == user_id, func.lower(Concept.name).in_(lookup))
+                        .order_by(Concept.id)
+                    ).all()
+                    for lname, cid in rows:
+                        name_map.setdefault(lname, cid)
+                # 2. Insert the notes and their (known) concepts
+                db.execute(insert(Note), [
+                    {"user_id": user_id, "title": title, "content": content} for title, content, _ in batch
+                ])
+                ids = _insert_concepts(db, [
+                    {"user_id": user_id, "name": title, "content": content, "is_known": True, "revision": revision}
+                    for title, content, _ in batch
+                ])
+                # 3. Walk the batch in order so a parent can be a note imported before its child
+                links: List[Tuple[str, int]] = []
+                missing: Dict[str, str] = {}
+                for (title, _, parent), cid in zip(batch, ids):
+                    if parent:
+                        lparent = parent.lower()
+                        links.append((lparent, cid))
+                        if lparent not in name_map:
+                            missing.setdefault(lparent, parent)
+                    if title.lower() not in missing:
+                        name_map.setdefault(title.lower(), cid)
+                # Parents not found become unknown concepts, created once per name
+                if missing:
+                    parent_ids = _insert_concepts(db, [
+                        {"user_id": user_id, "name": name, "content": None, "is_known": False, "revision": revision}
+                        for name in missing.values()
+                    ])
+                    name_map.update(zip(missing, parent_ids))
+                    parents_created += len(parent_ids)
+                if links:
+                    _insert_edges(db, user_id, [(name_map[lparent], cid) for lparent, cid in links], revision)
+                added += len(batch)
+        # Too many changes to replay onto a cached graph; the next load reads them from the database
+        graph_cache.invalidate(user_id)
+        content_cache.invalidate(user_id)
+        log.info("add_notes.done", added=added, parents_created=parents_created)
+        return added, parents_created
 
     @classmethod
     def mark_concept_known(cls, user_id: str, concept_id: int, graph: Optional[KnowledgeGraph] = None) -> None:
@@ -82,68 +818,65 @@ class GraphService:
         Mark the given concept as known in the database (and optionally in-memory graph).
         If a KnowledgeGraph object is provided, also update it in memory.
         """
-        with session_scope() as db:
+        with session_scope(user_id) as db:
             concept = db.query(Concept).filter(Concept.user_id == user_id, Concept.id == concept_id).first()
             if concept and not concept.is_known:
                 concept.is_known = True
-        if graph:
-            graph.mark_known(concept_id)
+                concept.revision = _next_revision(db, user_id)
+        graph_cache.apply(user_id, lambda target: target.mark_known(concept_id), graph)
+        content_cache.invalidate(user_id)
+
+    @classmethod
+    def inject_plan_stream(cls, user_id: str, graph: KnowledgeGraph, nodes: Iterable[LearningPlanNode],
+                           depth: int, max_nodes: int) -> Iterator[Dict[str, object]]:
+        """
+        Inject plan nodes progressively as `nodes` yields them (see PlanStreamInjector), yielding an
+        event per injected node and finally {"status": "done", "added", "reused", "skipped"}.
+        """
+        log.info("inject_plan_stream.call", user_id=user_id, depth=depth, max_nodes=max_nodes)
+        injector = PlanStreamInjector(user_id, graph, depth, max_nodes)
+        for node in nodes:
+            event = injector.add(node)
+            if event:
+                yield event
+        added, reused, skipped = injector.result()
+        log.info("inject_plan_stream.result", added=added, reused=reused, skipped=len(skipped))
+        yield {"status": "done", "added": added, "reused": reused, "skipped": skipped}
 
     @classmethod
-    @traced("graph.inject_plan")
+    @traced("graph.inject_plan", result_attributes=_inject_attributes)
     def inject_plan(cls, user_id: str, graph: KnowledgeGraph, plan: LearningPlan,
-                    depth: int, max_nodes: int) -> Tuple[int, int, List[str]]:
+                    depth: int, max_nodes: int, require_user: bool = False) -> Tuple[int, int, List[str]]:
         """
         Integrate a generated LearningPlan into the user's knowledge graph and database.
         Filters the plan to the given depth and size, then adds any new concepts and edges.
+        With require_user, raises UserNotFoundError (in the same transaction) if the user does not exist.
         Returns a tuple (added_count, reused_count, skipped_prerequisites).
         """
         log.info("inject_plan.call", user_id=user_id, depth=depth, max_nodes=max_nodes,
                  plan_root=plan.root_topic, raw_nodes=len(plan.nodes))
-        # Filter the plan nodes by depth and limit
-        filtered_plan = plan.filtered(depth, max_nodes)
-        # Map existing concept names (lowercase) to their IDs in the current graph
-        existing_map: Dict[str, int] = {
-            data.get("name").lower(): cid
-            for cid, data in graph.G.nodes(data=True)
-            if data.get("name")
-        }
-        added = 0
-        reused = 0
-        skipped_prereqs: set[str] = set()
-        name_to_id: Dict[str, int] = {}
-        with session_scope() as db:
-            # 1. Add or reuse concepts from the plan
-            for node in filtered_plan.nodes:
-                lname = node.name.lower()
-                if lname in existing_map:
-                    cid = existing_map[lname]
-                    reused += 1
-                else:
-                    # Create a new Concept for this plan node (mark as unknown/learning)
-                    c = Concept(user_id=user_id, name=node.name, content=(node.summary or None), is_known=False)
-                    db.add(c)
-                    db.flush()
-                    cid = c.id
-                    # Add to graph in-memory
-                    graph.add_concept(cid, node.name, False, node.summary or None)
-                    added += 1
-                    existing_map[lname] = cid
-                name_to_id[node.name] = cid
-            # 2. Add edges for prerequisites relationships
-            for node in filtered_plan.nodes:
-                tgt = name_to_id[node.name]
-                for prereq_name in node.prerequisites:
-                    lname = prereq_name.lower()
-                    if lname not in existing_map:
-                        skipped_prereqs.add(prereq_name)
-                        continue
-                    src = existing_map[lname]
-                    if src == tgt:
-                        continue
-                    if not graph.G.has_edge(src, tgt):
-                        db.add(Edge(user_id=user_id, source_id=src, target_id=tgt))
-                        graph.add_edge(src, tgt)
+        with session_scope(user_id) as db:
+            added, reused, skipped, new_concepts, new_edges = _inject_plan_tx(db, user_id, graph, plan, depth,
+                                                                              max_nodes, require_user)
+        # Update the in-memory graph once the transaction has committed
+        _apply_plan_changes(user_id, graph, new_concepts, new_edges)
         # Return counts and sorted list of any prerequisites that were missing (skipped)
-        log.info("inject_plan.result", added=added, reused=reused, skipped=len(skipped_prereqs))
-        return added, reused, sorted(skipped_prereqs)
+        log.info("inject_plan.result", added=added, reused=reused, skipped=len(skipped))
+        return added, reused, skipped
+
+    @classmethod
+    @traced("graph.inject_plan", result_attributes=_inject_attributes)
+    async def ainject_plan(cls, user_id: str, graph: KnowledgeGraph, plan: LearningPlan,
+                           depth: int, max_nodes: int, require_user: bool = False) -> Tuple[int, int, List[str]]:
+        """Async variant of inject_plan; the transaction runs on the async engine."""
+        if sharding_enabled():
+            return await asyncio.to_thread(cls.inject_plan, user_id, graph, plan, depth, max_nodes, require_user)
+        log.info("inject_plan.call", user_id=user_id, depth=depth, max_nodes=max_nodes,
+                 plan_root=plan.root_topic, raw_nodes=len(plan.nodes))
+        async with async_session_scope() as db:
+            added, reused, skipped, new_concepts, new_edges = await db.run_sync(
+                _inject_plan_tx, user_id, graph, plan, depth, max_nodes, require_user
+            )
+        _apply_plan_changes(user_id, graph, new_concepts, new_edges)
+        log.info("inject_plan.result", added=added, reused=reused, skipped=len(skipped))
+        return added, reused, skipped
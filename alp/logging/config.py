@@ -1,15 +1,37 @@
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
 import sys
-from typing import Any
+import threading
+import zlib
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
 
 import structlog
 
 LOG_LEVEL = os.getenv("ALP_LOG_LEVEL", "INFO").upper()
 LOG_JSON = os.getenv("ALP_LOG_JSON", "1") not in ("0", "false", "False")
 SERVICE_NAME = os.getenv("ALP_SERVICE_NAME", "alp-app")
+# Capacity of the log queue; 0 renders and writes each event synchronously on the calling thread.
+# Otherwise a writer thread renders and writes queued events; events that find the queue full are dropped.
+LOG_QUEUE_SIZE = int(os.getenv("ALP_LOG_QUEUE_SIZE", "0"))
+# JSON serializer for ALP_LOG_JSON: "json" (stdlib) or "orjson" (faster, used if installed)
+LOG_SERIALIZER = os.getenv("ALP_LOG_SERIALIZER", "json")
+# Events the writer thread renders per write to the stream
+LOG_WRITE_BATCH = 256
+# Sampling of events below warning level, as "event=rate" pairs, e.g. "load_graph.done=0.01";
+# "*" sets the rate for events not listed. Empty keeps everything.
+LOG_SAMPLE_RATES = os.getenv("ALP_LOG_SAMPLE_RATES", "")
+# Key-based sampling as "field=rate", e.g. "request_id=0.1": keeps or drops all events of a request together
+LOG_SAMPLE_KEY = os.getenv("ALP_LOG_SAMPLE_KEY", "")
+# Logger methods that sampling never drops
+_ALWAYS_KEEP = frozenset({"warning", "warn", "error", "err", "exception", "critical", "fatal", "failure"})
 
 
 def _add_service(_, __, event_dict: dict[str, Any]) -> dict[str, Any]:
@@ -17,8 +39,343 @@ def _add_service(_, __, event_dict: dict[str, Any]) -> dict[str, Any]:
     return event_dict
 
 
-def configure_logging() -> None:
-    """Configure stdlib + structlog once at process start."""
+class LazyValue:
+    """A log field computed only if its event is kept and rendered (see lazy)."""
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn: Callable[..., Any], args: Tuple[Any, ...]) -> None:
+        self.fn = fn
+        self.args = args
+
+    def __call__(self) -> Any:
+        return self.fn(*self.args)
+
+    # Loggers configured without resolve_lazy (e.g. by third-party code) still render the value
+    def __repr__(self) -> str:
+        return repr(self())
+
+    def __str__(self) -> str:
+        return str(self())
+
+
+def lazy(fn: Callable[..., Any], *args: Any) -> LazyValue:
+    """
+    Defer computing a log field: `log.info("x", size=lazy(len, items))` calls len(items) only
+    when the event passes level filtering and sampling.
+    """
+    return LazyValue(fn, args)
+
+
+def resolve_lazy(_, __, event_dict: dict[str, Any]) -> dict[str, Any]:
+    for key, value in event_dict.items():
+        if isinstance(value, LazyValue):
+            event_dict[key] = value()
+    return event_dict
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "name=rate,name=rate" (as in ALP_LOG_SAMPLE_RATES) into a dict."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, rate = item.rpartition("=")
+        if not sep or not name:
+            raise ValueError(f"Invalid log sampling entry {item!r}; expected name=rate")
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class EventSampler:
+    """
+    Keeps each event with the rate configured for its name (the "*" rate, or all of them, for
+    names not listed). Warnings and errors are always kept. Kept events of a sampled name carry
+    `sample_rate`, so counts can be scaled back up; dropped ones are counted per name.
+    configure_logging applies it in the bound logger, before the event dict is even built; it
+    also works as a regular structlog processor.
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        self.rates = dict(rates)
+        self.default = self.rates.pop("*", 1.0)
+        self.dropped: Counter[str] = Counter()
+        self._random = random.random
+
+    def sample(self, method_name: str, event: Optional[str]) -> Optional[float]:
+        """Return the rate the event was kept at (1.0 if not sampled), or None if it is dropped."""
+        if method_name in _ALWAYS_KEEP:
+            return 1.0
+        rate = self.rates.get(event, self.default)
+        if rate >= 1.0 or (rate > 0.0 and self._random() < rate):
+            return rate
+        self.dropped[event] += 1
+        return None
+
+    def __call__(self, _, method_name: str, event_dict: dict[str, Any]) -> dict[str, Any]:
+        rate = self.sample(method_name, event_dict.get("event"))
+        if rate is None:
+            raise structlog.DropEvent
+        if rate < 1.0:
+            event_dict["sample_rate"] = rate
+        return event_dict
+
+
+def make_sampling_bound_logger(level: int, sampler: EventSampler) -> type:
+    """Filtering bound logger class (see structlog.make_filtering_bound_logger) that also samples."""
+    base = structlog.make_filtering_bound_logger(level)
+
+    class SamplingBoundLogger(base):  # type: ignore[misc, valid-type]
+        def _proxy_to_logger(self, method_name: str, event: Optional[str] = None, **event_kw: Any) -> Any:
+            rate = sampler.sample(method_name, event)
+            if rate is None:
+                return None
+            if rate < 1.0:
+                event_kw["sample_rate"] = rate
+            return super()._proxy_to_logger(method_name, event, **event_kw)
+
+    return SamplingBoundLogger
+
+
+class KeySampler:
+    """
+    structlog processor keeping the events whose `key` field (e.g. request_id or user_id) hashes
+    into the kept fraction `rate`, so a sampled request is logged completely and others not at all.
+    Events without the field, warnings and errors are always kept.
+    """
+
+    def __init__(self, key: str, rate: float) -> None:
+        self.key = key
+        self.rate = rate
+        self._threshold = int(rate * 0xFFFFFFFF)
+        self.dropped = 0
+
+    def __call__(self, _, method_name: str, event_dict: dict[str, Any]) -> dict[str, Any]:
+        value = event_dict.get(self.key)
+        if value is None or method_name in _ALWAYS_KEEP:
+            return event_dict
+        if zlib.crc32(str(value).encode()) <= self._threshold:
+            return event_dict
+        self.dropped += 1
+        raise structlog.DropEvent
+
+
+def _orjson_available() -> bool:
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def json_serializer(name: str = LOG_SERIALIZER) -> Callable[..., str]:
+    """Return a `dumps(obj, default=...) -> str` for JSONRenderer; falls back to json without orjson."""
+    if name not in ("json", "orjson"):
+        raise ValueError(f"Unknown ALP_LOG_SERIALIZER {name!r}; expected 'json' or 'orjson'")
+    if name == "orjson" and _orjson_available():
+        import orjson
+
+        def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None, **_: Any) -> str:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+        return dumps
+    return json.dumps
+
+
+class LogWriter:
+    """
+    Renders and writes log events on a dedicated daemon thread, so logging calls on request
+    threads only enqueue. The queue is bounded: an event that finds it full is dropped and
+    counted instead of blocking the caller. Accepts structlog event dicts (rendered here, after
+    the caller-side processors stamped them) and stdlib LogRecords already formatted by a
+    QueueHandler. Events are written in batches of up to LOG_WRITE_BATCH per stream write.
+    """
+
+    def __init__(self, renderer: Callable[[Any, Optional[str], Dict[str, Any]], Any],
+                 stream: Optional[TextIO] = None, max_size: int = 10_000) -> None:
+        self._renderer = renderer
+        self._stream = stream
+        self.max_size = max_size
+        self._queue: queue.Queue = queue.Queue(max_size)
+        # Counters are bumped from caller threads and the writer thread: += alone can lose updates
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="alp-log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, item: Any) -> None:
+        """Queue an event for writing, or drop it if the queue is full."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    # QueueHandler interface, so stdlib records share the queue and the drop policy
+    put_nowait = put
+
+    def _format(self, item: Any) -> str:
+        if isinstance(item, logging.LogRecord):
+            return item.getMessage()
+        line = self._renderer(None, None, item)
+        return line.decode() if isinstance(line, (bytes, bytearray)) else line
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < LOG_WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            stop = False
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    continue  # flush marker, released below once the preceding events are written
+                else:
+                    try:
+                        lines.append(self._format(item))
+                    except Exception:
+                        with self._lock:
+                            self.errors += 1
+            if lines:
+                self._write(lines)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if stop:
+                return
+
+    def _write(self, lines: List[str]) -> None:
+        stream = self._stream or sys.stdout
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except Exception:
+            with self._lock:
+                self.errors += len(lines)
+            return
+        with self._lock:
+            self.written += len(lines)
+
+    def write(self, item: Any) -> None:
+        """Render and write an event on the calling thread, bypassing the queue."""
+        self._write([self._format(item)])
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every event queued so far is written; False if that took longer than `timeout`."""
+        if not self._thread.is_alive():
+            return False
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the queued events and stop the writer thread."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Return enqueued/written/dropped/error counters and the current queue depth."""
+        with self._lock:
+            counters = {"enqueued": self.enqueued, "written": self.written,
+                        "dropped": self.dropped, "errors": self.errors}
+        return {
+            **counters,
+            "queued": self._queue.qsize(),
+            "max_size": self.max_size,
+        }
+
+
+class QueueLogger:
+    """structlog logger that hands the processed event dict to a LogWriter instead of printing it."""
+
+    def __init__(self, writer: LogWriter) -> None:
+        self._writer = writer
+
+    def msg(self, **event_dict: Any) -> None:
+        # Loggers cached before a reconfiguration follow the current writer (or write directly)
+        writer = _writer
+        if writer is None:
+            self._writer.write(event_dict)
+        else:
+            writer.put(event_dict)
+
+    log = debug = info = warn = warning = error = err = critical = exception = fatal = failure = msg
+
+
+# Writer of the queued mode and the root handler feeding it stdlib records, if configured
+_writer: Optional[LogWriter] = None
+_queue_handler: Optional[logging.Handler] = None
+# Active samplers, if configured
+_event_sampler: Optional[EventSampler] = None
+_key_sampler: Optional[KeySampler] = None
+
+
+def get_log_writer() -> Optional[LogWriter]:
+    """Return the active LogWriter, or None when logging is synchronous."""
+    return _writer
+
+
+def sampling_stats() -> Dict[str, Any]:
+    """Return the events dropped by sampling: per event name (rate sampling) and by key."""
+    return {
+        "by_event": dict(_event_sampler.dropped) if _event_sampler is not None else {},
+        "by_key": _key_sampler.dropped if _key_sampler is not None else 0,
+    }
+
+
+def _close_writer() -> None:
+    global _writer, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+atexit.register(_close_writer)
+
+
+def configure_logging(queue_size: Optional[int] = None, serializer: Optional[str] = None,
+                      stream: Optional[TextIO] = None, sample_rates: Optional[str] = None,
+                      sample_key: Optional[str] = None) -> None:
+    """
+    Configure stdlib + structlog once at process start.
+    Arguments override ALP_LOG_QUEUE_SIZE, ALP_LOG_SERIALIZER, the output stream (stdout),
+    ALP_LOG_SAMPLE_RATES and ALP_LOG_SAMPLE_KEY.
+    With a queue, stdlib records go through the same writer via a QueueHandler; calling this
+    again flushes and replaces the previous writer.
+    Events below the configured level and events dropped by rate sampling are discarded by the
+    bound logger before any processing; key sampling runs once the request context is merged.
+    Lazy fields are computed only for the events left.
+    """
+    global _writer, _queue_handler, _event_sampler, _key_sampler
+    queue_size = LOG_QUEUE_SIZE if queue_size is None else queue_size
+    level = getattr(logging, LOG_LEVEL, logging.INFO)
+    rates = parse_sample_rates(LOG_SAMPLE_RATES if sample_rates is None else sample_rates)
+    _event_sampler = EventSampler(rates) if rates else None
+    key_spec = parse_sample_rates(LOG_SAMPLE_KEY if sample_key is None else sample_key)
+    _key_sampler = KeySampler(*next(iter(key_spec.items()))) if key_spec else None
+    head: List[Callable[..., Any]] = [structlog.contextvars.merge_contextvars]
+    if _key_sampler:
+        head.append(_key_sampler)
+    head += [structlog.processors.add_log_level, resolve_lazy]
     timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
     shared_processors = [
         timestamper,
@@ -28,28 +385,40 @@ def configure_logging() -> None:
     ]
 
     if LOG_JSON:
-        renderer = structlog.processors.JSONRenderer()
+        renderer = structlog.processors.JSONRenderer(serializer=json_serializer(serializer or LOG_SERIALIZER))
     else:
         renderer = structlog.dev.ConsoleRenderer(colors=True)
 
+    _close_writer()
+    if queue_size > 0:
+        # Stamp events (time, context, level) on the calling thread; render them on the writer thread
+        _writer = writer = LogWriter(renderer, stream, queue_size)
+        processors = [*head, *shared_processors]
+        logger_factory: Callable[..., Any] = lambda *_: QueueLogger(writer)  # noqa: E731
+    else:
+        processors = [*head, *shared_processors, renderer]
+        logger_factory = structlog.PrintLoggerFactory(stream or sys.stdout)
+
     structlog.configure(
-        processors=[
-            structlog.contextvars.merge_contextvars,
-            structlog.processors.add_log_level,
-            *shared_processors,
-            renderer,
-        ],
-        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, LOG_LEVEL, logging.INFO)),
+        processors=processors,
+        wrapper_class=(make_sampling_bound_logger(level, _event_sampler) if _event_sampler
+                       else structlog.make_filtering_bound_logger(level)),
         context_class=dict,
+        logger_factory=logger_factory,
         cache_logger_on_first_use=True,
     )
 
-    # stdlib logging -> structlog
-    logging.basicConfig(
-        level=getattr(logging, LOG_LEVEL, logging.INFO),
-        format="%(message)s",
-        stream=sys.stdout,
-    )
+    # stdlib logging -> stdout, or through the writer's queue (replacing other root handlers)
+    if _writer is not None:
+        _queue_handler = logging.handlers.QueueHandler(_writer)  # type: ignore[arg-type]
+        _queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        logging.basicConfig(level=level, handlers=[_queue_handler], force=True)
+    else:
+        logging.basicConfig(
+            level=level,
+            format="%(message)s",
+            stream=stream or sys.stdout,
+        )
 
 
 def get_logger(name: str | None = None):
@@ -1,47 +1,158 @@
 from __future__ import annotations
 
+import functools
+import inspect
 import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 
-from opentelemetry import trace
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-)
-
-try:
-    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-except ImportError:
-    OTLPSpanExporter = None  # optional
+from opentelemetry import context as otel_context, trace
+from opentelemetry.trace import Status, StatusCode
 
 OTEL_ENABLED = os.getenv("ALP_OTEL_ENABLED", "1") not in ("0", "false", "False")
 OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")  # e.g. http://localhost:4318/v1/traces
 SERVICE_NAME = os.getenv("ALP_SERVICE_NAME", "alp-app")
+# Fraction of traces recorded (parent-based: a span follows its parent's decision, so traces stay whole)
+OTEL_SAMPLE_RATIO = float(os.getenv("ALP_OTEL_SAMPLE_RATIO", "1.0"))
+# Span exporters, comma-separated: "otlp" (to OTEL_EXPORTER_OTLP_ENDPOINT, if set), "memory" (in-process
+# ring buffer served at /debug/traces; opt-in, since it exposes span attributes over HTTP) and
+# "console" (pretty-printed to stdout, for development)
+OTEL_EXPORTERS = os.getenv("ALP_OTEL_EXPORTERS", "otlp")
+SPAN_EXPORTERS = ("memory", "otlp", "console")
+# Most recent spans the in-memory exporter keeps per operation (span name)
+SPAN_RING_SIZE = int(os.getenv("ALP_OTEL_RING_SIZE", "512"))
 
 _tracer = None
 
 
-def init_tracing():
-    global _tracer
+class SpanRing:
+    """
+    Span exporter keeping the most recent finished spans of each operation (span name) in
+    bounded ring buffers, as small records rather than span objects. Used to inspect latency
+    in-process (see summary and the /debug/traces endpoint) without shipping spans anywhere.
+    Spans of operations beyond `max_operations` distinct names are not kept.
+    """
+
+    def __init__(self, size: int = SPAN_RING_SIZE, max_operations: int = 256) -> None:
+        self.size = size
+        self.max_operations = max_operations
+        self._rings: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> Any:
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        for span in spans:
+            record = {
+                "trace_id": f"{span.context.trace_id:032x}",
+                "span_id": f"{span.context.span_id:016x}",
+                "start": span.start_time / 1e9,
+                "duration_ms": (span.end_time - span.start_time) / 1e6,
+                "status": span.status.status_code.name,
+                "attributes": dict(span.attributes or {}),
+            }
+            with self._lock:
+                ring = self._rings.get(span.name)
+                if ring is None:
+                    if len(self._rings) >= self.max_operations:
+                        continue
+                    ring = self._rings[span.name] = deque(maxlen=self.size)
+                ring.append(record)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rings.clear()
+
+    def summary(self, operation: Optional[str] = None, limit: int = 10) -> Dict[str, Dict[str, Any]]:
+        """
+        Per operation (or only `operation`): number of recent spans, p50/p99/max duration in ms,
+        errors, and the `limit` slowest of them, slowest first.
+        """
+        with self._lock:
+            rings = {name: list(ring) for name, ring in self._rings.items() if operation in (None, name)}
+        result = {}
+        for name, records in sorted(rings.items()):
+            durations = sorted(r["duration_ms"] for r in records)
+            result[name] = {
+                "count": len(records),
+                "p50_ms": durations[len(durations) // 2],
+                "p99_ms": durations[max(0, -(-len(durations) * 99 // 100) - 1)],
+                "max_ms": durations[-1],
+                "errors": sum(r["status"] == "ERROR" for r in records),
+                "slowest": sorted(records, key=lambda r: r["duration_ms"], reverse=True)[:limit],
+            }
+        return result
+
+
+# Process-wide ring buffer, attached to the tracer provider when the "memory" exporter is enabled
+span_ring = SpanRing()
+_span_ring_enabled = False
+
+
+def get_span_ring() -> Optional[SpanRing]:
+    """Return the in-memory span ring buffer, or None unless tracing exports to it."""
+    return span_ring if _span_ring_enabled else None
+
+
+def init_tracing(exporters: Optional[str] = None):
+    """
+    Install the tracer provider (unless ALP_OTEL_ENABLED=0) with the parent-based ratio sampler
+    and the span exporters named in `exporters` (default ALP_OTEL_EXPORTERS). If none of them can be
+    attached (e.g. only "otlp" without OTEL_EXPORTER_OTLP_ENDPOINT), nothing is installed and None is
+    returned: recording spans that nobody exports would only cost time.
+    """
+    global _tracer, _span_ring_enabled
+    names = [name.strip() for name in (OTEL_EXPORTERS if exporters is None else exporters).split(",") if name.strip()]
+    unknown = set(names) - set(SPAN_EXPORTERS)
+    if unknown:
+        raise ValueError(f"Unknown ALP_OTEL_EXPORTERS {sorted(unknown)}; expected some of {SPAN_EXPORTERS}")
     if not OTEL_ENABLED:
         return None
+    # The SDK and exporters are only needed once tracing is switched on
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
 
     resource = Resource.create({
         "service.name": SERVICE_NAME,
         "service.version": os.getenv("ALP_VERSION", "0.1.0")
     })
-    provider = TracerProvider(resource=resource)
+    provider = TracerProvider(resource=resource, sampler=ParentBased(TraceIdRatioBased(OTEL_SAMPLE_RATIO)))
+    processors = []
 
-    # Always console exporter for dev
-    provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    if "memory" in names:
+        # Recording a span is a deque append: do it inline rather than through a batch thread
+        processors.append(SimpleSpanProcessor(span_ring))
 
     # Optional OTLP (to collector)
-    if OTLP_ENDPOINT and OTLPSpanExporter:
-        provider.add_span_processor(
-            BatchSpanProcessor(OTLPSpanExporter(endpoint=OTLP_ENDPOINT, insecure=True))
-        )
+    if "otlp" in names and OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            OTLPSpanExporter = None  # optional
+        if OTLPSpanExporter:
+            processors.append(BatchSpanProcessor(OTLPSpanExporter(endpoint=OTLP_ENDPOINT)))
+
+    if "console" in names:
+        processors.append(BatchSpanProcessor(ConsoleSpanExporter()))
 
+    if not processors:
+        return None
+    for processor in processors:
+        provider.add_span_processor(processor)
+    _span_ring_enabled = "memory" in names
     trace.set_tracer_provider(provider)
     _tracer = trace.get_tracer(SERVICE_NAME)
     return _tracer
@@ -51,22 +162,321 @@ def get_tracer():
     return _tracer or trace.get_tracer(SERVICE_NAME)
 
 
+def set_span_attributes(attributes: Dict[str, Any] | Callable[[], Dict[str, Any]]) -> None:
+    """
+    Add attributes to the current span if it is being recorded. Pass a callable to defer computing
+    them; it is not called when tracing is off or the span was sampled out.
+    """
+    if _tracer is None:
+        return
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes(attributes() if callable(attributes) else attributes)
+
+
 # Decorator helper
-def traced(name: str | None = None):
+def traced(name: str | None = None, result_attributes: Callable[[Any], Dict[str, Any]] | None = None):
+    """
+    Run the function (sync or async) in a span named `name` (default: its qualified name).
+    Until init_tracing has attached an exporter, the wrapper just calls the function. Spans follow the
+    provider's sampler; `result_attributes(result)` adds attributes such as result sizes, and is
+    only called for recorded spans. Exceptions are recorded and set the span status to ERROR.
+    """
     def deco(fn):
         span_name = name or fn.__qualname__
+        static_attributes = {"code.function": fn.__name__}
 
-        def wrapper(*args, **kwargs):
-            tracer = get_tracer()
-            with tracer.start_as_current_span(span_name) as span:
-                span.set_attribute("code.function", fn.__name__)
+        # start_span + attach instead of start_as_current_span: same context handling, without
+        # the generator-based context manager (a large part of the cost of a sampled-out span)
+        def start(tracer):
+            span = tracer.start_span(span_name, attributes=static_attributes)
+            return span, otel_context.attach(trace.set_span_in_context(span))
+
+        def finish(span, token, result=None, error: BaseException | None = None) -> None:
+            otel_context.detach(token)
+            if span.is_recording():
+                if error is not None:
+                    span.record_exception(error)
+                    span.set_status(Status(StatusCode.ERROR, f"{type(error).__name__}: {error}"))
+                elif result_attributes is not None:
+                    span.set_attributes(result_attributes(result))
+            span.end()
+
+        if inspect.iscoroutinefunction(fn):
+            # Keep the span open until the coroutine finishes, not just until it is created
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                tracer = _tracer
+                if tracer is None:
+                    return await fn(*args, **kwargs)
+                span, token = start(tracer)
                 try:
-                    return fn(*args, **kwargs)
-                except Exception as e:
-                    span.record_exception(e)
-                    span.set_status(trace.status.Status(trace.status.StatusCode.ERROR, str(e)))
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    finish(span, token, error=e)
                     raise
+                finish(span, token, result)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            span, token = start(tracer)
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                finish(span, token, error=e)
+                raise
+            finish(span, token, result)
+            return result
 
         return wrapper
 
     return deco
+
+
+# ----------------- Metrics -----------------
+# Recorded in-process and served in the Prometheus text format at /metrics; ALP_METRICS_ENABLED=0
+# stops recording (the endpoint then serves only the stats collectors)
+METRICS_ENABLED = os.getenv("ALP_METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per combination of label values (given positionally, in `labels` order)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}_total{_label_text(self.labels, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """
+    Histogram with fixed upper bounds per combination of label values. Observations are counted in
+    their bucket only; the cumulative counts Prometheus expects are computed when rendering.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = []
+        bounds = [f'le="{_number(float(b))}"' for b in self.buckets] + ['le="+Inf"']
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, n in zip(bounds, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of the process, plus stats collectors: callables returning a dict of
+    numbers (like PlanCache.stats) read at scrape time and rendered as gauges named prefix_key.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, prefix: str, stats: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._collectors[prefix] = stats
+
+    def clear(self) -> None:
+        """Reset every counter and histogram (collectors stay registered)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+            collectors = sorted(self._collectors.items())
+        lines = []
+        for name, metric in metrics:
+            full_name = f"{name}_total" if metric.kind == "counter" else name
+            lines.append(f"# HELP {full_name} {metric.help}")
+            lines.append(f"# TYPE {full_name} {metric.kind}")
+            lines.extend(metric.render())
+        for prefix, stats in collectors:
+            for key, value in sorted((stats() or {}).items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+http_request_duration = metrics.histogram(
+    "alp_http_request_duration_seconds", "Time to produce the response (headers, for streamed bodies)",
+    ("method", "route", "status"))
+db_query_duration = metrics.histogram(
+    "alp_db_query_duration_seconds", "Duration of single SQL statements", ("statement",))
+db_queries_per_request = metrics.histogram(
+    "alp_db_queries_per_request", "SQL statements executed while handling a request", ("route",),
+    QUERY_COUNT_BUCKETS)
+db_time_per_request = metrics.histogram(
+    "alp_db_time_per_request_seconds", "Time spent in SQL statements while handling a request", ("route",))
+llm_request_duration = metrics.histogram(
+    "alp_llm_request_duration_seconds", "Duration of LLM calls (whole stream, for streamed calls)",
+    ("operation", "outcome"), LLM_BUCKETS)
+llm_tokens = metrics.counter("alp_llm_tokens", "Tokens reported by the LLM API", ("operation", "kind"))
+
+_STATEMENTS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA"))
+
+
+class DbUsage:
+    """SQL statements and their total duration, accumulated for one request."""
+
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Usage of the request being handled; worker threads and tasks started for it share the same object
+_db_usage: ContextVar[Optional[DbUsage]] = ContextVar("alp_db_usage", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._alp_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - context._alp_query_start
+    verb = statement.lstrip()[:6].upper()
+    db_query_duration.observe(elapsed, verb if verb in _STATEMENTS else "OTHER")
+    usage = _db_usage.get()
+    if usage is not None:
+        usage.queries += 1
+        usage.seconds += elapsed
+
+
+def instrument_engine(bind) -> None:
+    """Time every SQL statement of a (sync) engine; for async engines pass engine.sync_engine."""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    if not event.contains(bind, "before_cursor_execute", _before_cursor_execute):
+        event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+        event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+
+
+def start_request_metrics() -> Tuple[DbUsage, Token]:
+    """Start accumulating SQL usage for the current request; pass the token to finish_request_metrics."""
+    usage = DbUsage()
+    return usage, _db_usage.set(usage)
+
+
+def finish_request_metrics(token: Token, usage: DbUsage, method: str, route: str, status: int,
+                           seconds: float) -> None:
+    """Record a handled request: its latency and the SQL statements it ran."""
+    _db_usage.reset(token)
+    if not METRICS_ENABLED:
+        return
+    http_request_duration.observe(seconds, method, route, str(status))
+    db_queries_per_request.observe(usage.queries, route)
+    db_time_per_request.observe(usage.seconds, route)
+
+
+def record_llm_call(operation: str, seconds: float, usage: Any = None, error: bool = False) -> None:
+    """Record an LLM call's duration and outcome, and its token usage if the API reported it."""
+    if not METRICS_ENABLED:
+        return
+    llm_request_duration.observe(seconds, operation, "error" if error else "ok")
+    if usage is not None:
+        llm_tokens.inc(getattr(usage, "prompt_tokens", 0) or 0, operation, "prompt")
+        llm_tokens.inc(getattr(usage, "completion_tokens", 0) or 0, operation, "completion")
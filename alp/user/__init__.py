@@ -1,3 +1,3 @@
-from alp.user.service import UserService
+from alp.user.service import UserService, UserNotFoundError
 
-__all__ = ["UserService"]
+__all__ = ["UserService", "UserNotFoundError"]
@@ -1,16 +1,35 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict
 
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
 from alp.ai.service import AIService
 from alp.db.models import User
-from alp.db.session import session_scope
+from alp.db.session import async_session_scope, session_scope, sharding_enabled
 
 from alp.logging.config import get_logger
 from alp.logging.instrumentation import traced
 
 log = get_logger("user.service")
 
+# Users kept by the process-wide lookup cache (see UserService.get_user_by_id)
+USER_CACHE_SIZE = int(os.getenv("ALP_USER_CACHE_SIZE", "1024"))
+
+
+class UserNotFoundError(LookupError):
+    """Raised by write operations asked to check that their user exists, when it does not."""
+
+
+# user_id -> detached snapshot of the User row; users are never deleted, so only found users are cached
+_users: OrderedDict[str, User] = OrderedDict()
+_users_lock = threading.Lock()
+
 
 class UserService:
     """
@@ -18,10 +37,77 @@ class UserService:
     """
 
     @classmethod
-    def get_user_by_id(cls, user_id: str) -> Optional[User]:
-        """Retrieve a user by their ID (returns None if not found)."""
-        with session_scope() as db:
-            return db.query(User).filter(User.id == user_id).first()
+    def _cached(cls, user_id: str) -> Optional[User]:
+        with _users_lock:
+            user = _users.get(user_id)
+            if user is not None:
+                _users.move_to_end(user_id)
+            return user
+
+    @classmethod
+    def _remember(cls, user: User) -> None:
+        # Cache a copy detached from any session: the instance itself belongs to the caller's
+        # transaction and is expired (unusable once detached) if that transaction rolls back
+        snapshot = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+        make_transient_to_detached(snapshot)
+        with _users_lock:
+            _users[user.id] = snapshot
+            _users.move_to_end(user.id)
+            while len(_users) > USER_CACHE_SIZE:
+                _users.popitem(last=False)
+
+    @classmethod
+    def invalidate_user(cls, user_id: str) -> None:
+        """Drop a user from the lookup cache (call after changing the user's row)."""
+        with _users_lock:
+            _users.pop(user_id, None)
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all users from the lookup cache."""
+        with _users_lock:
+            _users.clear()
+
+    @classmethod
+    def get_user_by_id(cls, user_id: str, db: Optional[Session] = None) -> Optional[User]:
+        """
+        Retrieve a user by their ID (returns None if not found).
+        Served from the lookup cache when possible, otherwise by primary key in `db`
+        (or a session of its own), so callers can fold the lookup into their transaction.
+        """
+        user = cls._cached(user_id)
+        if user is not None:
+            return user
+        if db is None:
+            with session_scope() as own_db:
+                user = own_db.get(User, user_id)
+        else:
+            user = db.get(User, user_id)
+        if user is not None:
+            cls._remember(user)
+        return user
+
+    @classmethod
+    async def aget_user_by_id(cls, user_id: str) -> Optional[User]:
+        """Async variant of get_user_by_id; cache misses are read through the async engine."""
+        user = cls._cached(user_id)
+        if user is not None:
+            return user
+        async with async_session_scope() as db:
+            user = await db.get(User, user_id)
+        if user is not None:
+            cls._remember(user)
+        return user
+
+    @classmethod
+    def ensure_user(cls, db: Session, user_id: str) -> None:
+        """
+        Raise UserNotFoundError unless the user exists; meant to run inside a write transaction.
+        In sharded mode users live in the main database, not in the transaction's shard, so the
+        lookup falls back to a session of its own.
+        """
+        if cls.get_user_by_id(user_id, None if sharding_enabled() else db) is None:
+            raise UserNotFoundError(user_id)
 
     @classmethod
     def get_first_user(cls) -> Optional[User]:
@@ -40,8 +126,9 @@ class UserService:
             db.add(user)
             # Flush to generate user.id; commit will happen on context exit
             db.flush()
-            # We can return the user instance (detached after session close, but with fields populated)
-            return user
+        # The user instance is detached after the session closes, but with fields populated
+        cls._remember(user)
+        return user
 
     @classmethod
     @traced("user.onboard")
@@ -59,3 +146,16 @@ class UserService:
         user = cls.create_user(name=name, learning_style=style)
         log.info("onboard.done", user_id=user.id, style=style)
         return user
+
+    @classmethod
+    @traced("user.onboard")
+    async def aonboard_user(cls, name: str, answers: Dict[str, str], ai_service: AIService) -> User:
+        """
+        Async variant of onboard_user: awaits the AI style detection and runs the
+        database insert in a worker thread so the event loop is never blocked.
+        """
+        log.info("onboard.start", name=name)
+        style = await ai_service.adetect_learning_style(answers)
+        user = await asyncio.to_thread(cls.create_user, name=name, learning_style=style)
+        log.info("onboard.done", user_id=user.id, style=style)
+        return user
@@ -2,6 +2,7 @@ import streamlit as st
 from dotenv import load_dotenv
 
 from alp.ai.service import OpenAIService
+from alp.db.session import init_db
 from alp.graph import GraphService
 from alp.logging.config import configure_logging, get_logger
 from alp.logging.instrumentation import init_tracing
@@ -15,6 +16,8 @@ log = get_logger("streamlit-app")
 # Initialize environment and services
 # ---------------------------------------------------------------------------
 load_dotenv(".env")
+# Create/upgrade the schema once per server process, not on every script rerun
+st.cache_resource(init_db)()
 # Instantiate AI service (e.g., OpenAI integration)
 ai_service = OpenAIService()
 # Load current user (for simplicity, use the first user in DB)
@@ -85,9 +88,7 @@ if user is None:
 # If we reach here, `user` exists
 st.sidebar.markdown(f"**User:** {user.name}  \nStyle: *{user.learning_style}*")
 
-# Initialize session state caches if not present
-if "kg_cache" not in st.session_state:
-    st.session_state["kg_cache"] = {}
+# Initialize session state if not present
 if "graph_ui" not in st.session_state:
     st.session_state["graph_ui"] = {
         "mode": "explore",  # 'explore' or 'path' mode for graph interaction
@@ -127,10 +128,8 @@ elif PAGE == "Add Note":
             st.error("Title and content are required.")
         else:
             # Add the new note and concept to the knowledge graph (and DB)
+            # (the shared graph cache is updated in place, so no invalidation is needed)
             GraphService.add_note(user.id, title, content, parent or None)
-            # Invalidate cached graph so the new concept will appear on next load
-            cache_key = f"kg_{user.id}"
-            st.session_state["kg_cache"].pop(cache_key, None)
             st.success(f"Note '{title}' saved and added to your graph!")
 
 # ---------------------------------------------------------------------------
@@ -145,13 +144,10 @@ elif PAGE == "Learn":
         if not topic.strip():
             st.error("Please enter a topic.")
         else:
-            # Load or retrieve cached knowledge graph
-            cache_key = f"kg_{user.id}"
-            if cache_key not in st.session_state["kg_cache"]:
-                st.session_state["kg_cache"][cache_key] = GraphService.load_graph(user.id)
-            kg = st.session_state["kg_cache"][cache_key]
+            # Load the knowledge graph (served from the shared graph cache when warm)
+            kg = GraphService.load_graph(user.id)
             # Get a sample of known concept names to provide context to the AI (limit to 25 to constrain prompt size)
-            known_names = [data.get("name") for _, data in kg.G.nodes(data=True) if data.get("known")]
+            known_names = [data.get("name") for _, data in kg.concepts() if data.get("known")]
             known_sample = known_names[:25]
             with st.spinner("Calling AI..."):
                 plan = ai_service.generate_learning_plan(topic, depth, user.learning_style or "", max_nodes,
@@ -181,18 +177,15 @@ elif PAGE == "Graph":
     st.header("Knowledge Graph")
     from streamlit_cytoscapejs import st_cytoscapejs
 
-    # Load or cache the KnowledgeGraph for the user
-    cache_key = f"kg_{user.id}"
-    if cache_key not in st.session_state["kg_cache"]:
-        st.session_state["kg_cache"][cache_key] = GraphService.load_graph(user.id)
-    kg = st.session_state["kg_cache"][cache_key]
+    # Load the KnowledgeGraph for the user (shared across sessions via GraphService's cache)
+    kg = GraphService.load_graph(user.id)
 
     # Top control bar: reload, mode toggle, reset path, stats
     col_reload, col_mode, col_reset, col_stats = st.columns([1, 1.3, 1.2, 3])
     with col_reload:
         if st.button("↻ Reload"):
-            # Clear cached graph and reset any selected nodes
-            st.session_state["kg_cache"].pop(cache_key, None)
+            # Drop the cached graph and reset any selected nodes
+            GraphService.invalidate_cache(user.id)
             ui_state["path_start"] = None
             ui_state["path_end"] = None
             _rerun()
@@ -307,8 +300,8 @@ elif PAGE == "Graph":
             if st.button("Mark Entire Path Known"):
                 for cid in highlight_path:
                     if not kg.is_known(cid):
-                        kg.mark_known(cid)
-                        GraphService.mark_concept_known(user.id, cid)
+                        # Updates `kg` (the shared cached graph) under the cache lock
+                        GraphService.mark_concept_known(user.id, cid, kg)
                 st.success("Entire path marked as known.")
                 _rerun()
     else:
@@ -322,6 +315,7 @@ elif PAGE == "Graph":
         st.write(f"**ID:** {selected_id}")
         st.write(f"**Name:** {data.get('name')}")
         st.write(f"**Known:** {data.get('known')}")
-        if data.get("content"):
+        content = GraphService.concept_content(user.id, selected_id, kg)
+        if content:
             with st.expander("Content"):
-                st.markdown(data["content"])
+                st.markdown(content)
@@ -0,0 +1,78 @@
+"""
+Benchmark: importing N notes with one add_note call each vs. a single GraphService.add_notes.
+
+Each note names the previous one as its parent (every tenth names a fresh topic instead), so
+both paths resolve parents; the notes are streamed from a generator. Runs on a scratch database file.
+Also counts the SQL statements add_notes sends (cursor executions) and asserts they stay a small
+constant number per batch of NOTE_BATCH_SIZE notes.
+
+Usage:
+    python benchmarks/bench_add_notes.py [notes ...]   (default: 100 1000 10000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ.setdefault("ALP_LOG_LEVEL", "WARNING")
+
+import alp.db.session as session_module  # noqa: E402
+from alp.graph import GraphService  # noqa: E402
+from alp.graph.service import NOTE_BATCH_SIZE  # noqa: E402
+from alp.logging.config import configure_logging  # noqa: E402
+from alp.user import UserService  # noqa: E402
+
+
+def make_notes(n: int):
+    for i in range(n):
+        parent = f"Topic {i}" if i % 10 == 0 else f"Note {i - 1}"
+        yield f"Note {i}", "content " * 50, parent
+
+
+def one_by_one(user_id: str, n: int) -> None:
+    for title, content, parent in make_notes(n):
+        GraphService.add_note(user_id, title, content, parent)
+
+
+def batched(user_id: str, n: int) -> None:
+    GraphService.add_notes(user_id, make_notes(n))
+
+
+def main(sizes: list[int]) -> None:
+    configure_logging()
+    print(f"{'notes':>8} {'add_note ms':>12} {'add_notes ms':>13} {'statements':>11}")
+    for n in sizes:
+        timings = []
+        statements: list[str] = []
+        for fn in (one_by_one, batched):
+            with tempfile.TemporaryDirectory() as tmp:
+                engine = session_module.make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+                session_module.engine = engine
+                session_module.SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False,
+                                                           expire_on_commit=False)
+                session_module.Base.metadata.create_all(engine)
+                user_id = UserService.create_user(name="bench").id
+                if fn is batched:
+                    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+                start = time.perf_counter()
+                fn(user_id, n)
+                timings.append((time.perf_counter() - start) * 1000)
+                if fn is batched:
+                    # Per batch: parent lookup, notes, concepts, missing parents, edges (+ user check, revision)
+                    batches = -(-n // NOTE_BATCH_SIZE)
+                    assert len(statements) <= 5 * batches + 2, len(statements)
+                assert GraphService.load_graph(user_id, use_cache=False).counts()["nodes"] == n + (n + 9) // 10
+                engine.dispose()
+        print(f"{n:>8} {timings[0]:>12.1f} {timings[1]:>13.1f} {len(statements):>11}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1000, 10000])
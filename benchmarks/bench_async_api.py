@@ -0,0 +1,95 @@
+"""
+Benchmark: throughput of POST /learning-plan under concurrent load, sync vs. async endpoint.
+
+Starts the local fake LLM server (benchmarks/fake_llm.py) with a fixed response latency and fires
+CONCURRENCY simultaneous requests at the FastAPI app in-process (httpx ASGI transport), each for a
+different user. The sync baseline is the previous endpoint shape (a plain `def` handler, which
+FastAPI runs in its 40-thread pool, making a blocking LLM call); the async endpoint awaits the
+AsyncOpenAI client, so concurrency is bounded by the HTTP pool size (ALP_OPENAI_MAX_CONNECTIONS)
+instead, which is varied here.
+
+Usage:
+    python benchmarks/bench_async_api.py [concurrency] [llm_latency_seconds]   (default: 200 0.5)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ["ALP_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench_async_api.db")
+
+from fake_llm import start_fake_llm  # noqa: E402
+
+LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+_, _base_url = start_fake_llm(LATENCY)
+os.environ["OPENAI_BASE_URL"] = _base_url
+os.environ["OPENAI_API_KEY"] = "bench"
+
+import httpx  # noqa: E402
+
+import alp.ai.service as ai_service  # noqa: E402
+from alp.ai.plan_cache import plan_cache  # noqa: E402
+from alp.api import LearningPlanRequest, LearningPlanResponse, app, get_ai_service  # noqa: E402
+from alp.db.session import init_db  # noqa: E402
+from alp.graph import GraphService  # noqa: E402
+from alp.user import UserService  # noqa: E402
+
+POOL_LIMITS = (20, 50, 200)
+plan_cache.max_entries = 0  # every request must reach the LLM
+for _name in ("httpx", "openai"):
+    logging.getLogger(_name).setLevel(logging.WARNING)
+
+
+@app.post("/bench/learning-plan-sync", response_model=LearningPlanResponse)
+def generate_learning_plan_sync(request: LearningPlanRequest):
+    """The previous, blocking endpoint shape (benchmark only)."""
+    user = UserService.get_user_by_id(request.user_id)
+    plan = get_ai_service().generate_learning_plan(request.topic, request.depth, user.learning_style or "",
+                                                   request.max_nodes, known_samples=[])
+    kg = GraphService.load_graph(request.user_id)
+    added, reused, skipped = GraphService.inject_plan(request.user_id, kg, plan, request.depth, request.max_nodes)
+    return LearningPlanResponse(added=added, reused=reused, skipped=skipped)
+
+
+async def fire(path: str, user_ids: list[str]) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post(path, json={"user_id": uid, "topic": "Recursion", "depth": 3, "max_nodes": 10})
+            for uid in user_ids
+        ))
+        elapsed = time.perf_counter() - start
+    assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+    return elapsed
+
+
+def main(concurrency: int) -> None:
+    init_db()  # ASGITransport does not run the app's lifespan
+    print(f"{concurrency} concurrent requests, fake LLM latency {LATENCY * 1e3:.0f} ms")
+    print(f"{'endpoint':>24} {'pool':>6} {'total s':>9} {'req/s':>9}")
+
+    def users() -> list[str]:
+        return [UserService.create_user(f"bench-{i}", "Visual").id for i in range(concurrency)]
+
+    elapsed = asyncio.run(fire("/bench/learning-plan-sync", users()))
+    print(f"{'sync def (threadpool)':>24} {ai_service.OPENAI_MAX_CONNECTIONS:>6} "
+          f"{elapsed:>9.2f} {concurrency / elapsed:>9.1f}")
+    for limit in POOL_LIMITS:
+        # Async clients are created per event loop, so each run picks up the new limit
+        ai_service.OPENAI_MAX_CONNECTIONS = limit
+        ai_service.OPENAI_MAX_KEEPALIVE = limit
+        elapsed = asyncio.run(fire("/learning-plan", users()))
+        print(f"{'async def':>24} {limit:>6} {elapsed:>9.2f} {concurrency / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
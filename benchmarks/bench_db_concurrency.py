@@ -0,0 +1,91 @@
+"""
+Benchmark: mixed add_note / load_graph traffic from concurrent threads, per SQLite profile.
+
+Each profile gets a fresh database file; WRITERS threads add notes while READERS threads
+reload graphs (bypassing the graph cache) for DURATION seconds. With the rollback journal
+("default") writers block readers; with WAL ("production") both proceed concurrently.
+
+Usage:
+    python benchmarks/bench_db_concurrency.py [profile ...]   (default: default production)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ.setdefault("ALP_LOG_LEVEL", "WARNING")
+
+import alp.db.session as session_module  # noqa: E402
+from alp.graph import GraphService  # noqa: E402
+from alp.logging.config import configure_logging  # noqa: E402
+from alp.user import UserService  # noqa: E402
+
+WRITERS = 4
+READERS = 8
+USERS = 8
+SEED_NOTES = 200
+DURATION = 5.0
+
+
+def run(profile: str) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = session_module.make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile)
+        session_module.engine = engine
+        session_module.SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False,
+                                                   expire_on_commit=False)
+        session_module.Base.metadata.create_all(engine)
+        users = [UserService.create_user(name=f"u{i}").id for i in range(USERS)]
+        for user_id in users:
+            for j in range(SEED_NOTES):
+                GraphService.add_note(user_id, f"Seed {j}", "content " * 20, parent_name="Root")
+
+        stop = threading.Event()
+        counts = {"writes": 0, "reads": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def worker(i: int, write: bool) -> None:
+            n = 0
+            while not stop.is_set():
+                user_id = users[(i + n) % USERS]
+                try:
+                    if write:
+                        GraphService.add_note(user_id, f"Note {i}-{n}", "content " * 20, parent_name="Root")
+                    else:
+                        GraphService.load_graph(user_id, use_cache=False)
+                    key = "writes" if write else "reads"
+                except Exception:
+                    key = "errors"
+                with lock:
+                    counts[key] += 1
+                n += 1
+
+        threads = [threading.Thread(target=worker, args=(i, True)) for i in range(WRITERS)]
+        threads += [threading.Thread(target=worker, args=(i, False)) for i in range(READERS)]
+        for t in threads:
+            t.start()
+        time.sleep(DURATION)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+    return {k: v / DURATION for k, v in counts.items()}
+
+
+def main(profiles: list[str]) -> None:
+    configure_logging()
+    print(f"{'profile':>12} {'writes/s':>10} {'reads/s':>10} {'errors/s':>10}")
+    for profile in profiles:
+        rates = run(profile)
+        print(f"{profile:>12} {rates['writes']:>10.1f} {rates['reads']:>10.1f} {rates['errors']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["default", "production"])
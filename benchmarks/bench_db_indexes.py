@@ -0,0 +1,82 @@
+"""
+Benchmark: per-user concept/edge lookups as the shared SQLite file grows.
+
+Populates a scratch database with many users (ROWS_PER_USER concepts and edges each) and
+times the queries GraphService issues: the case-insensitive parent lookup from add_note,
+the per-user concept/edge scans from load_graph and the edge existence check.
+With the composite user_id indexes the per-query cost should stay flat as the table grows.
+
+Usage:
+    python benchmarks/bench_db_indexes.py [total_rows ...]   (default: 10000 100000 1000000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, insert, select
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from alp.db.models import Base, Concept, Edge  # noqa: E402
+
+ROWS_PER_USER = 200
+LOOKUPS = 500
+
+
+def populate(engine, total_rows: int) -> list[str]:
+    users = [f"user-{i}" for i in range(total_rows // ROWS_PER_USER)]
+    with engine.begin() as conn:
+        concept_id = 0
+        for user_id in users:
+            concepts = []
+            edges = []
+            for j in range(ROWS_PER_USER):
+                concept_id += 1
+                concepts.append({"id": concept_id, "user_id": user_id, "name": f"Concept {j}", "is_known": False})
+                if j:
+                    edges.append({"user_id": user_id, "source_id": concept_id - 1, "target_id": concept_id})
+            conn.execute(insert(Concept), concepts)
+            conn.execute(insert(Edge), edges)
+    return users
+
+
+def time_queries(engine, users: list[str]) -> dict[str, float]:
+    step = max(1, len(users) // LOOKUPS)
+    sample = users[::step][:LOOKUPS]
+    results: dict[str, float] = {}
+    queries = {
+        "parent_lookup": lambda u: select(Concept.id).where(
+            Concept.user_id == u, func.lower(Concept.name) == "concept 42"),
+        "load_concepts": lambda u: select(Concept.id, Concept.name).where(Concept.user_id == u),
+        "load_edges": lambda u: select(Edge.source_id, Edge.target_id).where(Edge.user_id == u),
+        "edge_exists": lambda u: select(Edge.id).where(
+            Edge.user_id == u, Edge.source_id == 1, Edge.target_id == 2),
+    }
+    with engine.connect() as conn:
+        for label, build in queries.items():
+            start = time.perf_counter()
+            for user_id in sample:
+                conn.execute(build(user_id)).all()
+            results[label] = (time.perf_counter() - start) / len(sample) * 1e6
+    return results
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>10} " + " ".join(f"{k:>15}" for k in ("parent_lookup", "load_concepts", "load_edges", "edge_exists"))
+          + "   (us/query)")
+    for total in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", future=True)
+            Base.metadata.create_all(engine)
+            users = populate(engine, total)
+            timings = time_queries(engine, users)
+            print(f"{total:>10} " + " ".join(f"{v:>15.1f}" for v in timings.values()))
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
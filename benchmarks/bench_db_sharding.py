@@ -0,0 +1,89 @@
+"""
+Benchmark: add_note write throughput from concurrent threads vs. number of shard files.
+
+For each shard setting, THREADS writer threads add notes for USERS users (round robin) for
+DURATION seconds on fresh database files. Shard setting "0" is the unsharded single file;
+larger counts hash users across that many files, "per-user" gives each user its own file.
+
+Usage:
+    python benchmarks/bench_db_sharding.py [shards ...]   (default: 0 1 2 4 8 per-user)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ.setdefault("ALP_LOG_LEVEL", "WARNING")
+
+import alp.db.session as session_module  # noqa: E402
+from alp.graph import GraphService  # noqa: E402
+from alp.logging.config import configure_logging  # noqa: E402
+from alp.user import UserService  # noqa: E402
+
+THREADS = 8
+USERS = 32
+DURATION = 5.0
+
+
+def run(shards: str) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        session_module.db_path = Path(tmp) / "bench.db"
+        session_module.DB_SHARDS = shards
+        session_module.shard_engines = session_module.ShardEngines()
+        engine = session_module.make_engine(f"sqlite:///{session_module.db_path}")
+        session_module.engine = engine
+        session_module.SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False,
+                                                   expire_on_commit=False)
+        session_module.Base.metadata.create_all(engine)
+        users = [UserService.create_user(name=f"u{i}").id for i in range(USERS)]
+        for user_id in users:
+            GraphService.add_note(user_id, "Root", "root")  # open shard engines before timing
+
+        stop = threading.Event()
+        counts = {"writes": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def worker(i: int) -> None:
+            n = 0
+            while not stop.is_set():
+                user_id = users[(i + n * THREADS) % USERS]
+                try:
+                    GraphService.add_note(user_id, f"Note {i}-{n}", "content " * 20, parent_name="Root")
+                    key = "writes"
+                except Exception:
+                    key = "errors"
+                with lock:
+                    counts[key] += 1
+                n += 1
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        for t in threads:
+            t.start()
+        time.sleep(DURATION)
+        stop.set()
+        for t in threads:
+            t.join()
+        session_module.shard_engines.dispose_all()
+        engine.dispose()
+    return {k: v / DURATION for k, v in counts.items()}
+
+
+def main(settings: list[str]) -> None:
+    configure_logging()
+    print(f"{THREADS} writer threads, {USERS} users, profile {session_module.DB_PROFILE}")
+    print(f"{'shards':>10} {'writes/s':>10} {'errors/s':>10}")
+    for shards in settings:
+        rates = run(shards)
+        print(f"{shards:>10} {rates['writes']:>10.1f} {rates['errors']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["0", "1", "2", "4", "8", "per-user"])
@@ -0,0 +1,75 @@
+"""
+Benchmark: memory and latency of the networkx vs compact KnowledgeGraph backends.
+
+Builds a random DAG-like graph (~2 edges per node) on each backend and reports the memory
+allocated while building it (tracemalloc) and the time for build, counts(), neighbour
+iteration over every node and a batch of shortest-path queries.
+
+Usage:
+    python benchmarks/bench_graph_backend.py [nodes ...]   (default: 1000 10000 100000)
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from alp.graph import KnowledgeGraph  # noqa: E402
+
+PATH_QUERIES = 200
+
+
+def build(backend: str, n: int, edges: list[tuple[int, int]]) -> KnowledgeGraph:
+    graph = KnowledgeGraph(backend=backend)
+    for i in range(n):
+        graph.add_concept(i + 1, f"Concept {i}", i % 3 == 0)
+    for u, v in edges:
+        graph.add_edge(u, v)
+    return graph
+
+
+def measure(backend: str, n: int, edges: list[tuple[int, int]], queries: list[tuple[int, int]]) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = build(backend, n, edges)
+    build_s = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    graph.counts()
+    counts_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for cid in range(1, n + 1):
+        for _ in graph.neighbors_out(cid):
+            pass
+    neighbors_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for a, b in queries:
+        graph.shortest_path(a, b)
+    path_s = (time.perf_counter() - start) / len(queries)
+    return {"MiB": memory / 2 ** 20, "build_ms": build_s * 1e3, "counts_ms": counts_s * 1e3,
+            "neighbors_ms": neighbors_s * 1e3, "path_ms": path_s * 1e3}
+
+
+def main(sizes: list[int]) -> None:
+    cols = ("MiB", "build_ms", "counts_ms", "neighbors_ms", "path_ms")
+    print(f"{'nodes':>8} {'backend':>9} " + " ".join(f"{c:>12}" for c in cols))
+    for n in sizes:
+        rng = random.Random(42)
+        edges = [(rng.randint(1, i - 1), i) for i in range(2, n + 1)]
+        edges += [(rng.randint(1, n), rng.randint(1, n)) for _ in range(n)]
+        queries = [(rng.randint(1, n), rng.randint(1, n)) for _ in range(PATH_QUERIES)]
+        for backend in ("networkx", "compact"):
+            result = measure(backend, n, edges, queries)
+            print(f"{n:>8} {backend:>9} " + " ".join(f"{result[c]:>12.2f}" for c in cols))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
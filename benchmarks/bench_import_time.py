@@ -0,0 +1,57 @@
+"""
+Benchmark: cold import time of the application entry modules.
+
+Imports each module in a fresh interpreter under `python -X importtime` (pointed at a temporary,
+not yet existing database file) and reports the median cumulative import time over RUNS processes,
+whether the import created the database file, and the slowest third-party packages pulled in by
+alp.api.
+
+Usage:
+    python benchmarks/bench_import_time.py [runs]   (default: 5)
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULES = ("alp.db.session", "alp.graph", "alp.user", "alp.ai", "alp.api")
+TOP = 8
+
+
+def import_times(module: str, db_file: Path) -> dict[str, int]:
+    """Cumulative import time (us) of every module imported by `import module` in a fresh process."""
+    env = {**os.environ, "ALP_DB_PATH": str(db_file), "ALP_OTEL_ENABLED": "0"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(runs: int) -> None:
+    print(f"{'module':>16} {'import ms':>10} {'db created':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for module in MODULES:
+            db_file = Path(tmp) / module / "mvp.db"
+            samples = [import_times(module, db_file)[module] for _ in range(runs)]
+            print(f"{module:>16} {statistics.median(samples) / 1e3:>10.1f} {str(db_file.exists()):>11}")
+        times = import_times("alp.api", Path(tmp) / "top" / "mvp.db")
+    # Top-level third-party packages only (nested modules are included in their package's time)
+    packages = {name: us for name, us in times.items() if "." not in name and name not in ("alp", "site")}
+    print("\nslowest packages imported by alp.api:")
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:TOP]:
+        print(f"{name:>24} {us / 1e3:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
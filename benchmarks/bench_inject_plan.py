@@ -0,0 +1,69 @@
+"""
+Benchmark: GraphService.inject_plan for large plans (bulk curriculum imports).
+
+Builds a chain-plus-fanout plan of N nodes, each with up to two prerequisites, and times its
+injection into an empty graph on a scratch database file. Also counts the SQL statements sent
+(cursor executions) and asserts the concepts go in as multi-row inserts, not one INSERT per node.
+
+Usage:
+    python benchmarks/bench_inject_plan.py [nodes ...]   (default: 30 300 3000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ.setdefault("ALP_LOG_LEVEL", "WARNING")
+
+import alp.db.session as session_module  # noqa: E402
+from alp.ai.learning_plan import LearningPlan, LearningPlanNode  # noqa: E402
+from alp.graph import GraphService  # noqa: E402
+from alp.graph.service import SQLITE_MAX_VARIABLES  # noqa: E402
+from alp.logging.config import configure_logging  # noqa: E402
+from alp.user import UserService  # noqa: E402
+
+
+def make_plan(n: int) -> LearningPlan:
+    nodes = []
+    for i in range(n):
+        prereqs = [f"Topic {j}" for j in (i - 1, i // 2) if 0 <= j < i]
+        nodes.append(LearningPlanNode(name=f"Topic {i}", summary="summary " * 10, difficulty=1,
+                                      prerequisites=sorted(set(prereqs))))
+    return LearningPlan(root_topic="Bench", nodes=nodes)
+
+
+def main(sizes: list[int]) -> None:
+    configure_logging()
+    print(f"{'nodes':>8} {'ms':>10} {'statements':>11}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = session_module.make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            session_module.engine = engine
+            session_module.SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False,
+                                                       expire_on_commit=False)
+            session_module.Base.metadata.create_all(engine)
+            user_id = UserService.create_user(name="bench").id
+            graph = GraphService.load_graph(user_id)
+            plan = make_plan(n)
+            statements = []
+            event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+            start = time.perf_counter()
+            GraphService.inject_plan(user_id, graph, plan, depth=4, max_nodes=n)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{n:>8} {elapsed:>10.1f} {len(statements):>11}")
+            # Revision bump, concept inserts (6 parameters per row) and one executemany for the edges
+            concept_statements = -(-n // (SQLITE_MAX_VARIABLES // 6))
+            assert len(statements) <= 2 + concept_statements, statements
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [30, 300, 3000])
@@ -0,0 +1,78 @@
+"""
+Benchmark: cost of log calls that are filtered out (disabled level, rate or key sampling) compared
+with calls that are written, and of an expensive field passed eagerly vs. through lazy().
+
+Logs CALLS events per case through the synchronous pipeline of alp.logging.config into a temporary
+file and reports nanoseconds per call, next to a plain function call with the same arguments.
+
+Usage:
+    python benchmarks/bench_log_overhead.py [calls]   (default: 200000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ["ALP_LOG_LEVEL"] = "INFO"
+
+import structlog  # noqa: E402
+
+from alp.logging.config import configure_logging, get_logger, lazy, sampling_stats  # noqa: E402
+
+USER_ID = "5b0e6b0c-3c2a-4c1e-9d55-0c8f7e0f1a2b"
+ANSWERS = {f"q{i}": "Hands-on practice" for i in range(20)}
+
+
+def summarize(answers: dict) -> str:
+    """Stand-in for a field that is expensive to compute."""
+    return ";".join(f"{k}={v}" for k, v in sorted(answers.items()))
+
+
+def nop(event, **kw):
+    return None
+
+
+def timed(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(calls: int) -> None:
+    with tempfile.TemporaryFile("w") as stream:
+        configure_logging(queue_size=0, stream=stream, sample_rates="load_graph.done=0.01",
+                          sample_key="request_id=0.1")
+        log = get_logger("bench")
+        cases = [
+            ("function call, no logging", lambda: nop("load_graph.done", nodes=120, edges=240)),
+            ("debug (level disabled)", lambda: log.debug("load_graph.start", user_id=USER_ID)),
+            ("info, rate-sampled 1%", lambda: log.info("load_graph.done", nodes=120, edges=240)),
+            ("info, written", lambda: log.info("add_note.done", concept_id=42)),
+            ("info 1%, eager field", lambda: log.info("load_graph.done", answers=summarize(ANSWERS))),
+            ("info 1%, lazy field", lambda: log.info("load_graph.done", answers=lazy(summarize, ANSWERS))),
+        ]
+        print(f"{calls} calls per case")
+        print(f"{'case':>32} {'ns/call':>9}")
+        for label, fn in cases:
+            print(f"{label:>32} {timed(fn, calls):>9.0f}")
+        # Key sampling: every call of a request shares its fate (10% of requests kept)
+        request_ids = iter(range(calls))
+
+        def keyed() -> None:
+            structlog.contextvars.bind_contextvars(request_id=str(next(request_ids)))
+            log.info("add_note.call", user_id=USER_ID)
+
+        print(f"{'info, key-sampled 10% (+bind)':>32} {timed(keyed, calls):>9.0f}")
+        structlog.contextvars.clear_contextvars()
+        print(f"dropped by sampling: {sampling_stats()}")
+        configure_logging(queue_size=0, stream=stream, sample_rates="", sample_key="")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
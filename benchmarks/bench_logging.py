@@ -0,0 +1,96 @@
+"""
+Benchmark: per-call cost of structlog logging as configured by alp.logging.config.
+
+Logs EVENTS events shaped like the service call logs (add_note.call and friends) from one thread
+and from THREADS threads at once, for each combination of synchronous vs. queued writing and the
+json vs. orjson serializer, into a temporary file and into a "slow" sink whose writes block for
+SLOW_WRITE seconds (like stdout piped to a backed-up log collector). Reports the caller-side cost
+per call (what a request thread pays), p99 per call, the time until everything is written, and
+dropped events.
+
+Usage:
+    python benchmarks/bench_logging.py [events] [queue_size]   (default: 20000 10000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+
+from alp.logging.config import configure_logging, get_log_writer, get_logger  # noqa: E402
+
+THREADS = 8
+SLOW_WRITE = 100e-6
+MODES = [("sync", 0, "json"), ("sync", 0, "orjson"), ("queue", None, "json"), ("queue", None, "orjson")]
+
+
+class SlowStream:
+    """File wrapper whose every write blocks for SLOW_WRITE seconds."""
+
+    def __init__(self, stream) -> None:
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        time.sleep(SLOW_WRITE)
+        return self._stream.write(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def emit(logger, n: int, samples: list[float]) -> None:
+    clock = time.perf_counter
+    for i in range(n):
+        start = clock()
+        logger.info("add_note.call", user_id="5b0e6b0c-3c2a-4c1e-9d55-0c8f7e0f1a2b", title=f"Note {i}",
+                     parent_name="Recursion", content_len=1834, answers={"q1": "Hands-on practice", "q2": "A"})
+        samples.append(clock() - start)
+
+
+def run(sink: str, threads: int, events: int, queue_size: int,
+        serializer: str) -> tuple[float, float, float, int]:
+    with tempfile.TemporaryFile("w") as file:
+        stream = SlowStream(file) if sink == "slow" else file
+        configure_logging(queue_size=queue_size, serializer=serializer, stream=stream)
+        logger = get_logger("bench")
+        per_thread = events // threads
+        samples: list[list[float]] = [[] for _ in range(threads)]
+        workers = [threading.Thread(target=emit, args=(logger, per_thread, samples[t])) for t in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        writer = get_log_writer()
+        if writer is not None:
+            writer.flush(timeout=60)
+        total = time.perf_counter() - start
+        dropped = writer.stats()["dropped"] if writer is not None else 0
+        configure_logging(queue_size=0, stream=file)
+    calls = sorted(s for thread_samples in samples for s in thread_samples)
+    mean_us = sum(calls) / len(calls) * 1e6
+    p99_us = calls[int(len(calls) * 0.99) - 1] * 1e6
+    return mean_us, p99_us, total, dropped
+
+
+def main(events: int, queue_size: int) -> None:
+    print(f"{events} events, queue size {queue_size}")
+    print(f"{'sink':>5} {'mode':>6} {'serializer':>10} {'threads':>8} {'us/call':>9} {'p99 us':>9} "
+          f"{'written s':>10} {'dropped':>8}")
+    for sink in ("file", "slow"):
+        for threads in (1, THREADS):
+            for label, size, serializer in MODES:
+                mean_us, p99_us, total, dropped = run(sink, threads, events,
+                                                      queue_size if size is None else size, serializer)
+                print(f"{sink:>5} {label:>6} {serializer:>10} {threads:>8} {mean_us:>9.2f} {p99_us:>9.2f} "
+                      f"{total:>10.3f} {dropped:>8}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
@@ -0,0 +1,86 @@
+"""
+Benchmark: cost of the metrics layer of alp.logging.instrumentation.
+
+Times QUERIES small SELECTs by primary key on a temporary SQLite engine without listeners, with
+no-op cursor_execute listeners (SQLAlchemy's own event dispatch cost) and with the statement timing
+listeners (inside a request's usage context, as in the API), one histogram
+observation and one counter increment, and rendering /metrics with every endpoint, statement and
+LLM series populated.
+
+Usage:
+    python benchmarks/bench_metrics.py [queries]   (default: 20000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+
+from alp.logging.instrumentation import (  # noqa: E402
+    db_query_duration, finish_request_metrics, instrument_engine, llm_tokens, metrics, record_llm_call,
+    start_request_metrics,
+)
+
+ROUTES = ("/users/onboard", "/users/{user_id}", "/notes", "/notes:batch", "/learning-plan", "/learning-plan/stream")
+
+
+def per_query_us(bind, queries: int) -> float:
+    with bind.connect() as conn:
+        start = time.perf_counter()
+        for i in range(queries):
+            conn.execute(text("SELECT value FROM t WHERE id = :id"), {"id": i % 100}).fetchone()
+        return (time.perf_counter() - start) / queries * 1e6
+
+
+def per_call_ns(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(queries: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = create_engine(f"sqlite:///{tmp}/plain.db")
+        noop = create_engine(f"sqlite:///{tmp}/noop.db")
+        event.listen(noop, "before_cursor_execute", lambda *args: None)
+        event.listen(noop, "after_cursor_execute", lambda *args: None)
+        timed = create_engine(f"sqlite:///{tmp}/timed.db")
+        instrument_engine(timed)
+        for bind in (plain, noop, timed):
+            with bind.begin() as conn:
+                conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)"))
+                conn.execute(text("INSERT INTO t VALUES (:id, 'x')"), [{"id": i} for i in range(100)])
+        print(f"{queries} queries")
+        print(f"{'':>28} {'plain':>11} {'no-op':>11} {'timed':>11}")
+        bare = per_query_us(plain, queries)
+        dispatch = per_query_us(noop, queries)
+        usage, token = start_request_metrics()
+        instrumented = per_query_us(timed, queries)
+        finish_request_metrics(token, usage, "GET", "/bench", 200, 0.0)
+        print(f"{'SELECT by id (us)':>28} {bare:>11.2f} {dispatch:>11.2f} {instrumented:>11.2f}")
+        for bind in (plain, noop, timed):
+            bind.dispose()
+    print(f"{'histogram observe':>28} {per_call_ns(lambda: db_query_duration.observe(0.0004, 'SELECT'), queries):>8.0f} ns")
+    print(f"{'counter inc':>28} {per_call_ns(lambda: llm_tokens.inc(100, 'plan', 'prompt'), queries):>8.0f} ns")
+    for route in ROUTES:
+        for status in ("200", "404", "422", "500"):
+            usage, token = start_request_metrics()
+            finish_request_metrics(token, usage, "POST", route, int(status), 0.05)
+    for operation in ("detect_learning_style", "suggest_parent", "generate_learning_plan", "stream_learning_plan"):
+        record_llm_call(operation, 1.2)
+    start = time.perf_counter()
+    body = metrics.render()
+    print(f"{'render /metrics':>28} {(time.perf_counter() - start) * 1e3:>8.2f} ms "
+          f"({len(body.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
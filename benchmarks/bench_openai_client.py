@@ -0,0 +1,64 @@
+"""
+Benchmark: per-request latency with a fresh OpenAI client per call vs. the shared pooled client.
+
+Runs generate_learning_plan-style requests against the local fake LLM server (benchmarks/fake_llm.py),
+sequentially and from THREADS threads, once creating a new client (new TCP connection) per request and
+once through OpenAIService's shared keep-alive pool.
+
+Usage:
+    python benchmarks/bench_openai_client.py [requests]   (default: 500)
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import openai
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+
+from alp.ai.service import get_openai_client  # noqa: E402
+from fake_llm import start_fake_llm  # noqa: E402
+
+THREADS = 8
+MESSAGES = [{"role": "user", "content": "Classify: I like diagrams"}]
+
+
+def fresh_client_call(base_url: str) -> float:
+    start = time.perf_counter()
+    with openai.OpenAI(api_key="bench", base_url=base_url, max_retries=0) as client:
+        client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+    return time.perf_counter() - start
+
+
+def pooled_client_call(base_url: str) -> float:
+    start = time.perf_counter()
+    get_openai_client(openai, "bench", base_url).chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+    return time.perf_counter() - start
+
+
+def run(fn, base_url: str, n: int, threads: int) -> list[float]:
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(lambda _: fn(base_url), range(n)))
+
+
+def main(n: int) -> None:
+    _, base_url = start_fake_llm()
+    run(pooled_client_call, base_url, 10, 1)  # warm up imports and the pool
+    print(f"{'mode':>16} {'threads':>8} {'p50 ms':>10} {'p99 ms':>10}")
+    for threads in (1, THREADS):
+        for label, fn in (("fresh client", fresh_client_call), ("pooled client", pooled_client_call)):
+            samples = sorted(run(fn, base_url, n, threads))
+            p50 = statistics.median(samples) * 1e3
+            p99 = samples[int(len(samples) * 0.99) - 1] * 1e3
+            print(f"{label:>16} {threads:>8} {p50:>10.2f} {p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
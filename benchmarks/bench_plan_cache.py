@@ -0,0 +1,61 @@
+"""
+Benchmark: generate_learning_plan latency and LLM calls with and without the plan cache.
+
+Replays REQUESTS plan requests drawn from a skewed topic popularity distribution (a few topics are
+requested by most users) against the local fake LLM server (benchmarks/fake_llm.py), once with
+caching disabled and once through a PlanCache, and reports p50/p99 latency and LLM calls made.
+
+Usage:
+    python benchmarks/bench_plan_cache.py [requests] [llm_latency_seconds]   (default: 1000 0.05)
+"""
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+
+from alp.ai.plan_cache import PlanCache  # noqa: E402
+from alp.ai.service import OpenAIService  # noqa: E402
+from fake_llm import start_fake_llm  # noqa: E402
+
+TOPICS = 200
+STYLES = ["Visual", "Auditory", "Kinesthetic", "Analytical"]
+
+
+def workload(n: int) -> list[tuple[str, int, str]]:
+    rng = random.Random(0)
+    # Zipf-like popularity: topic i is requested with weight 1 / (i + 1)
+    weights = [1 / (i + 1) for i in range(TOPICS)]
+    topics = rng.choices([f"Topic {i}" for i in range(TOPICS)], weights=weights, k=n)
+    return [(topic, rng.randint(2, 3), rng.choice(STYLES)) for topic in topics]
+
+
+def main(n: int, latency: float) -> None:
+    _, base_url = start_fake_llm(latency)
+    requests = workload(n)
+    print(f"{n} requests over {TOPICS} topics, fake LLM latency {latency * 1e3:.0f} ms")
+    print(f"{'mode':>10} {'p50 ms':>10} {'p99 ms':>10} {'LLM calls':>10} {'hit rate':>9}")
+    for label, size in (("no cache", 0), ("cache", 512)):
+        cache = PlanCache(max_entries=size)
+        ai = OpenAIService(api_key="bench", base_url=base_url, plan_cache=cache)
+        samples = []
+        for topic, depth, style in requests:
+            start = time.perf_counter()
+            ai.generate_learning_plan(topic, depth, style, 10, [])
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        stats = cache.stats()
+        p50 = statistics.median(samples) * 1e3
+        p99 = samples[int(len(samples) * 0.99) - 1] * 1e3
+        print(f"{label:>10} {p50:>10.2f} {p99:>10.2f} {stats['misses']:>10} {stats['hit_rate']:>9.1%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, float(sys.argv[2]) if len(sys.argv) > 2 else 0.05)
@@ -0,0 +1,67 @@
+"""
+Benchmark: time to first plan node, full-completion vs. streamed learning plan generation.
+
+Requests plans from the local fake LLM server (benchmarks/fake_llm.py), which spreads its response
+latency over the streamed chunks, and injects them into a fresh user's graph: once with
+generate_learning_plan + inject_plan, once with stream_learning_plan + inject_plan_stream.
+Reports the time until the first node is in the graph and until the whole plan is.
+
+Usage:
+    python benchmarks/bench_plan_stream.py [runs] [llm_latency_seconds]   (default: 20 1.0)
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ["ALP_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench_plan_stream.db")
+
+from alp.ai.plan_cache import PlanCache  # noqa: E402
+from alp.ai.service import OpenAIService  # noqa: E402
+from alp.db.session import init_db  # noqa: E402
+from alp.graph import GraphService  # noqa: E402
+from alp.user import UserService  # noqa: E402
+from fake_llm import start_fake_llm  # noqa: E402
+
+
+def full(ai: OpenAIService, user_id: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    plan = ai.generate_learning_plan("Recursion", 4, "Visual", 20, [])
+    GraphService.inject_plan(user_id, GraphService.load_graph(user_id), plan, 4, 20)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def streamed(ai: OpenAIService, user_id: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    nodes = ai.stream_learning_plan("Recursion", 4, "Visual", 20, [])
+    for event in GraphService.inject_plan_stream(user_id, GraphService.load_graph(user_id), nodes, 4, 20):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main(runs: int, latency: float) -> None:
+    init_db()
+    _, base_url = start_fake_llm(latency)
+    # No plan cache: every run must reach the LLM
+    ai = OpenAIService(api_key="bench", base_url=base_url, plan_cache=PlanCache(max_entries=0))
+    print(f"{runs} runs, fake LLM latency {latency * 1e3:.0f} ms")
+    print(f"{'mode':>10} {'first node ms':>14} {'full plan ms':>13}")
+    for label, fn in (("full", full), ("streamed", streamed)):
+        samples = [fn(ai, UserService.create_user(f"bench-{label}-{i}", "Visual").id) for i in range(runs)]
+        first = statistics.median(s[0] for s in samples) * 1e3
+        total = statistics.median(s[1] for s in samples) * 1e3
+        print(f"{label:>10} {first:>14.1f} {total:>13.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20, float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
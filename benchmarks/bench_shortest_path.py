@@ -0,0 +1,62 @@
+"""
+Benchmark: KnowledgeGraph.shortest_path when no directed path exists.
+
+Builds a random tree of N nodes (edges point from parent to child) and queries paths from
+leaves back towards the root, which forces the undirected fallback. Compares the previous
+approach (networkx search on a G.to_undirected() copy), the bidirectional BFS used now, and
+a repeated query answered from the per-version memo (as on Streamlit reruns).
+
+Usage:
+    python benchmarks/bench_shortest_path.py [nodes]   (default: 50000)
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import networkx as nx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from alp.graph import KnowledgeGraph  # noqa: E402
+
+QUERIES = 20
+
+
+def main(n: int) -> None:
+    rng = random.Random(42)
+    graph = KnowledgeGraph(backend="networkx")
+    for i in range(1, n + 1):
+        graph.add_concept(i, f"Concept {i}", False)
+    for i in range(2, n + 1):
+        graph.add_edge(rng.randint(max(1, i - 50), i - 1), i)
+    queries = [(rng.randint(n // 2, n), rng.randint(1, n // 2)) for _ in range(QUERIES)]
+
+    start = time.perf_counter()
+    for a, b in queries:
+        try:
+            nx.shortest_path(graph.G, a, b)
+        except nx.NetworkXNoPath:
+            nx.shortest_path(graph.G.to_undirected(), a, b)
+    copy_ms = (time.perf_counter() - start) / QUERIES * 1e3
+
+    start = time.perf_counter()
+    for a, b in queries:
+        graph.shortest_path(a, b)
+    bfs_ms = (time.perf_counter() - start) / QUERIES * 1e3
+
+    start = time.perf_counter()
+    for a, b in queries:
+        graph.shortest_path(a, b)
+    memo_ms = (time.perf_counter() - start) / QUERIES * 1e3
+
+    print(f"nodes={n} no-directed-path queries, ms/query:")
+    print(f"  to_undirected copy : {copy_ms:10.2f}")
+    print(f"  bidirectional BFS  : {bfs_ms:10.2f}")
+    print(f"  memoized rerun     : {memo_ms:10.4f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,69 @@
+"""
+Benchmark: per-span cost of the span exporters selectable through ALP_OTEL_EXPORTERS.
+
+Records SPANS spans shaped like graph.load_graph (a few attributes) through a TracerProvider with
+no exporter, the previous default (BatchSpanProcessor + ConsoleSpanExporter, writing to a temporary
+file instead of stdout) and the in-memory SpanRing behind a SimpleSpanProcessor. Reports the
+caller-side cost per span and the total time until every span is exported, plus the cost of the
+/debug/traces summary over a full ring.
+
+Usage:
+    python benchmarks/bench_span_export.py [spans]   (default: 20000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor  # noqa: E402
+
+from alp.logging.instrumentation import SpanRing  # noqa: E402
+
+OPERATIONS = ("graph.load_graph", "ai.generate_learning_plan", "graph.inject_plan")
+
+
+def record(tracer, spans: int) -> float:
+    start = time.perf_counter()
+    for i in range(spans):
+        with tracer.start_as_current_span(OPERATIONS[i % len(OPERATIONS)]) as span:
+            span.set_attribute("code.function", "load_graph")
+            span.set_attribute("graph.nodes", i)
+            span.set_attribute("graph.edges", 2 * i)
+    return time.perf_counter() - start
+
+
+def main(spans: int) -> None:
+    print(f"{spans} spans per case")
+    print(f"{'exporter':>10} {'us/span':>9} {'exported s':>11}")
+    with tempfile.TemporaryFile("w") as out:
+        ring = SpanRing()
+        cases = [
+            ("none", None),
+            # Queue every span so none are dropped (at least the default 2048: the queue must hold a batch)
+            ("console", lambda: BatchSpanProcessor(
+                ConsoleSpanExporter(out=out), max_queue_size=max(spans, 2048))),
+            ("memory", lambda: SimpleSpanProcessor(ring)),
+        ]
+        for label, processor in cases:
+            provider = TracerProvider()
+            if processor is not None:
+                provider.add_span_processor(processor())
+            start = time.perf_counter()
+            caller = record(provider.get_tracer("bench"), spans)
+            provider.shutdown()
+            print(f"{label:>10} {caller / spans * 1e6:>9.2f} {time.perf_counter() - start:>11.3f}")
+    start = time.perf_counter()
+    ring.summary()
+    print(f"/debug/traces summary over {sum(len(r) for r in ring._rings.values())} spans: "
+          f"{(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,102 @@
+"""
+Benchmark: overhead of the @traced decorator on hot calls.
+
+Times a cached GraphService.load_graph and two KnowledgeGraph hot calls (is_known, neighbors_out)
+undecorated, with the previous decorator shape (a span per call through start_as_current_span,
+tracer looked up per call) and with the current one: tracing disabled, and enabled with a
+parent-based ratio sampler recording 1% and 100% of traces (no exporter attached, so only the
+span bookkeeping is measured).
+
+Usage:
+    python benchmarks/bench_traced.py [calls]   (default: 50000)
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("ALP_OTEL_ENABLED", "0")
+os.environ["ALP_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench_traced.db")
+os.environ["ALP_LOG_LEVEL"] = "WARNING"
+
+from opentelemetry import trace  # noqa: E402
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased  # noqa: E402
+
+import alp.logging.instrumentation as instrumentation  # noqa: E402
+from alp.db.session import init_db  # noqa: E402
+from alp.graph import GraphService, KnowledgeGraph  # noqa: E402
+from alp.logging.config import configure_logging  # noqa: E402
+from alp.logging.instrumentation import traced  # noqa: E402
+from alp.user import UserService  # noqa: E402
+
+
+def previous_traced(name: str):
+    """The previous decorator shape (benchmark only)."""
+    def deco(fn):
+        def wrapper(*args, **kwargs):
+            tracer = instrumentation._tracer or trace.get_tracer(instrumentation.SERVICE_NAME)
+            with tracer.start_as_current_span(name) as span:
+                span.set_attribute("code.function", fn.__name__)
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    span.record_exception(e)
+                    raise
+
+        return wrapper
+
+    return deco
+
+
+def per_call_ns(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(calls: int) -> None:
+    configure_logging()
+    init_db()
+    user_id = UserService.create_user("bench", "Visual").id
+    for i in range(20):
+        GraphService.add_note(user_id, title=f"Note {i}", content="x", parent_name="Root")
+    GraphService.load_graph(user_id)
+    graph = KnowledgeGraph()
+    for i in range(1, 1001):
+        graph.add_concept(i, f"Concept {i}", i % 2 == 0)
+    for i in range(2, 1001):
+        graph.add_edge(i // 2, i)
+
+    load_graph = GraphService.load_graph.__wrapped__
+    targets = {
+        "load_graph (cached)": lambda fn: (lambda: fn(GraphService, user_id)),
+        "is_known": lambda fn: (lambda: fn(graph, 500)),
+        "neighbors_out": lambda fn: (lambda: fn(graph, 500)),
+    }
+    raw = {"load_graph (cached)": load_graph, "is_known": KnowledgeGraph.is_known,
+           "neighbors_out": KnowledgeGraph.neighbors_out}
+    tracers = [("disabled", None)] + [
+        (f"sampled {ratio:.0%}", TracerProvider(sampler=ParentBased(TraceIdRatioBased(ratio))).get_tracer("bench"))
+        for ratio in (0.01, 1.0)
+    ]
+    print(f"{calls} calls per case, ns per call")
+    print(f"{'call':>20} {'tracing':>12} {'bare':>8} {'previous':>9} {'traced':>8}")
+    for label, bind in targets.items():
+        fn = raw[label]
+        bare = per_call_ns(bind(fn), calls)
+        for tracing, tracer in tracers:
+            instrumentation._tracer = tracer
+            previous = per_call_ns(bind(previous_traced(label)(fn)), calls)
+            current = per_call_ns(bind(traced(label)(fn)), calls)
+            print(f"{label:>20} {tracing:>12} {bare:>8.0f} {previous:>9.0f} {current:>8.0f}")
+    instrumentation._tracer = None
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
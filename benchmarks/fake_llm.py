@@ -0,0 +1,125 @@
+"""
+Local stand-in for the OpenAI chat completions API, used by the benchmarks.
+
+Serves POST /v1/chat/completions over HTTP/1.1 keep-alive, answering every request after
+`latency` seconds with a canned learning plan (or a one-word answer for short prompts).
+Requests with "stream": true receive the same content as SSE chunks spread over `latency`.
+
+Usage (standalone):
+    python benchmarks/fake_llm.py [port] [latency_seconds]
+"""
+from __future__ import annotations
+
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+PLAN = {
+    "root_topic": "Recursion",
+    "nodes": [
+        {"name": "Functions", "summary": "Reusable blocks of code.", "difficulty": 1, "prerequisites": []},
+        {"name": "Call Stack", "summary": "How calls are tracked.", "difficulty": 2,
+         "prerequisites": ["Functions"]},
+        {"name": "Base Case", "summary": "Where recursion stops.", "difficulty": 2,
+         "prerequisites": ["Functions"]},
+        {"name": "Recursion", "summary": "A function calling itself.", "difficulty": 3,
+         "prerequisites": ["Call Stack", "Base Case"]},
+    ],
+}
+
+
+# Characters per streamed chunk, roughly a few tokens
+STREAM_CHUNK = 8
+
+
+def make_handler(latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+        def setup(self) -> None:
+            super().setup()
+            # Headers and body are written separately; avoid Nagle/delayed-ACK stalls on reused connections
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            system = any(m.get("role") == "system" for m in body.get("messages", []))
+            content = json.dumps(PLAN) if system else "Visual"
+            if body.get("stream"):
+                self.stream(body, content)
+                return
+            if latency:
+                time.sleep(latency)
+            payload = json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 200, "total_tokens": 300},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def stream(self, body: dict, content: str) -> None:
+            """Send the content as SSE chunks of STREAM_CHUNK characters, spreading `latency` across them."""
+            pieces = [content[i:i + STREAM_CHUNK] for i in range(0, len(content), STREAM_CHUNK)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for piece in pieces:
+                if latency:
+                    time.sleep(latency / len(pieces))
+                self.write_chunk("data: " + json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": None,
+                                 "delta": {"role": "assistant", "content": piece}}],
+                }) + "\n\n")
+            if body.get("stream_options", {}).get("include_usage"):
+                self.write_chunk("data: " + json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [],
+                    "usage": {"prompt_tokens": 100, "completion_tokens": 200, "total_tokens": 300},
+                }) + "\n\n")
+            self.write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def write_chunk(self, data: str) -> None:
+            raw = data.encode()
+            self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+
+    return Handler
+
+
+def start_fake_llm(latency: float = 0.0, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the fake server in a daemon thread; returns (server, base_url)."""
+    ThreadingHTTPServer.request_queue_size = 1024  # listen backlog; the default (5) resets bursts of connections
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    srv, url = start_fake_llm(float(sys.argv[2]) if len(sys.argv) > 2 else 0.0,
+                              int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+    print(f"fake LLM listening on {url}")
+    threading.Event().wait()
@@ -1,7 +1,15 @@
+import uuid
+
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
 import alp.db.session as session_module
+from alp.ai.plan_cache import plan_cache
+from alp.ai.service import llm_single_flight
+from alp.graph.service import content_cache, graph_cache
+from alp.user import UserService
 
 @pytest.fixture(autouse=True)
 def use_temp_db(monkeypatch):
@@ -9,14 +17,28 @@ def use_temp_db(monkeypatch):
     Fixture to redirect database operations to an in-memory SQLite for tests.
     This avoids persistent side effects and speeds up tests by using a fresh DB.
     """
-    # Create an in-memory SQLite engine
-    engine = create_engine("sqlite:///:memory:", echo=False, future=True)
+    # Create an in-memory SQLite engine; one shared connection so worker threads (async paths) see the same DB.
+    # The named shared-cache database is also opened by the async engine, without pooling so that
+    # connections are not reused across the event loops of separate asyncio.run calls.
+    url = f"file:alp-test-{uuid.uuid4().hex}?mode=memory&cache=shared&uri=true"
+    engine = create_engine(f"sqlite:///{url}", echo=False, future=True,
+                           connect_args={"check_same_thread": False}, poolclass=StaticPool)
     SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
-    # Monkeypatch the global engine and session factory in the session module
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{url}", poolclass=NullPool)
+    # Monkeypatch the global engines and session factories in the session module
     monkeypatch.setattr(session_module, "engine", engine)
     monkeypatch.setattr(session_module, "SessionLocal", SessionLocal)
-    # Recreate all tables in the in-memory database
-    session_module.Base.metadata.create_all(engine)
+    monkeypatch.setattr(session_module, "AsyncSessionLocal",
+                        async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False))
+    # Create all tables in the in-memory database
+    session_module.init_db(engine)
+    # Start every test with an empty process-wide graph cache
+    graph_cache.clear()
+    content_cache.clear()
+    plan_cache.clear()
+    llm_single_flight.reset()
+    UserService.clear_cache()
     yield
-    # Teardown: dispose the engine (database will be discarded as it's in memory)
+    # Teardown: dispose the engines (the database is discarded once its last connection closes)
+    async_engine.sync_engine.dispose()
     engine.dispose()
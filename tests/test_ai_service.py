@@ -1,4 +1,14 @@
-from alp.ai.service import OpenAIService, STYLES
+import asyncio
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from alp.ai.learning_plan import LearningPlan, LearningPlanNode, PlanStreamParser, extract_plan_json, parse_plan_json
+from alp.ai.plan_cache import PlanCache, SQLitePlanStore, plan_cache_key
+from alp.ai.service import OpenAIService, STYLES, llm_single_flight
 
 def test_detect_learning_style_fallback():
     """The AIService should return a valid style (and use heuristics if no API)."""
@@ -17,3 +27,157 @@ def test_suggest_parent_monkeypatch(monkeypatch):
     ai = OpenAIService(api_key=None)
     result = ai.suggest_parent_topic("Limits", "Some content")
     assert result == dummy_response
+
+def test_openai_client_shared_between_instances():
+    """Instances configured with the same key share one pooled client; other keys get their own."""
+    first = OpenAIService(api_key="test-key")
+    second = OpenAIService(api_key="test-key")
+    other = OpenAIService(api_key="other-key")
+    assert first._openai is not None
+    assert first._openai is second._openai
+    assert other._openai is not first._openai
+
+def test_async_detect_learning_style_fallback():
+    """The async variant falls back to the same heuristic when no API key is configured."""
+    ai = OpenAIService(api_key=None)
+    answers = {"Q1": "I learn by hands-on practice"}
+    assert asyncio.run(ai.adetect_learning_style(answers)) == "Kinesthetic"
+    assert asyncio.run(ai.agenerate_learning_plan("Recursion", 2, "Visual", 5, [])) is None
+
+def _plan(name="Base case"):
+    return LearningPlan(root_topic="Recursion", nodes=[LearningPlanNode(name, "", 1, [])])
+
+def test_plan_cache_key_normalizes_inputs():
+    """Equivalent prompt inputs share a key; inputs that change the prompt do not."""
+    key = plan_cache_key("Recursion", 2, "Visual", 5, ["b", "a"])
+    assert plan_cache_key("  recursion ", 2, "visual", 5, ["A", "B"]) == key
+    assert plan_cache_key("Recursion", 3, "Visual", 5, ["a", "b"]) != key
+    assert plan_cache_key("Recursion", 2, "Visual", 5, ["a"]) != key
+
+def test_plan_cache_lru_ttl_and_stats(monkeypatch):
+    """The in-memory tier evicts least recently used plans, expires old ones and counts hits."""
+    cache = PlanCache(max_entries=2, ttl=60)
+    cache.put("a", _plan("A"))
+    cache.put("b", _plan("B"))
+    assert cache.get("a").nodes[0].name == "A"
+    cache.put("c", _plan("C"))  # evicts "b"
+    assert cache.get("b") is None
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 120)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 1 / 3
+
+def test_plan_cache_persistent_tier():
+    """Plans written through to the SQLite store are served after the memory tier is lost."""
+    cache = PlanCache(store=SQLitePlanStore())
+    cache.put("k", _plan())
+    fresh = PlanCache(store=SQLitePlanStore())
+    assert fresh.get("k") == _plan()
+    assert fresh.get("k") == _plan()
+    assert (fresh.stats()["store_hits"], fresh.stats()["hits"]) == (1, 1)
+
+def test_generate_learning_plan_served_from_cache(monkeypatch):
+    """A cached plan is returned without calling the LLM."""
+    cache = PlanCache()
+    ai = OpenAIService(api_key="test-key", plan_cache=cache)
+    cache.put(plan_cache_key("Recursion", 2, "Visual", 5, []), _plan())
+    monkeypatch.setattr(ai._openai.chat.completions, "create",
+                        lambda **kwargs: pytest.fail("LLM called despite a cached plan"))
+    assert ai.generate_learning_plan("recursion", 2, "Visual", 5, []) == _plan()
+    assert asyncio.run(ai.agenerate_learning_plan("Recursion", 2, "Visual", 5, [])) == _plan()
+
+def _completion(content):
+    message = types.SimpleNamespace(content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+def test_concurrent_identical_plan_requests_are_coalesced(monkeypatch):
+    """Threads asking for the same plan at once share one LLM call; each gets its own copy."""
+    ai = OpenAIService(api_key="test-key", plan_cache=PlanCache(max_entries=0))
+    calls = []
+    release = threading.Event()
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        release.wait(5)
+        return _completion('{"root_topic": "Recursion", "nodes": [{"name": "Base case", "difficulty": 1}]}')
+
+    monkeypatch.setattr(ai._openai.chat.completions, "create", create)
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(ai.generate_learning_plan, "Recursion", 2, "Visual", 5, []) for _ in range(4)]
+        while llm_single_flight.stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        plans = [f.result() for f in futures]
+    assert len(calls) == 1
+    assert all(plan == plans[0] for plan in plans)
+    assert len({id(plan) for plan in plans}) == 4
+    assert llm_single_flight.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+def test_concurrent_identical_parent_requests_are_coalesced_async(monkeypatch):
+    """Coroutines asking for the same parent topic at once share one LLM call."""
+    ai = OpenAIService(api_key="test-key")
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        return _completion("Mathematics")
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai, "_async_client", lambda: client)
+
+    async def run():
+        same = [ai.asuggest_parent_topic("Limits", "Some content") for _ in range(3)]
+        return await asyncio.gather(*same, ai.asuggest_parent_topic("Derivatives", "Other content"))
+
+    assert asyncio.run(run()) == ["Mathematics"] * 4
+    assert len(calls) == 2
+    assert llm_single_flight.stats()["coalesced"] == 2
+
+def test_plan_stream_parser_yields_nodes_as_they_complete():
+    """Nodes are returned by the chunk that closes their JSON object, braces in strings notwithstanding."""
+    text = ('```json\n{"root_topic": "Recursion", "nodes": [{"name": "Base {case}", "difficulty": 1}, '
+            '{"name": "Recursion", "difficulty": 2, "prerequisites": ["Base {case}"]}]}\n```')
+    parser = PlanStreamParser()
+    split = text.index("}, ") + 2
+    assert parser.feed(text[:split - 5]) == []
+    assert [n.name for n in parser.feed(text[split - 5:split])] == ["Base {case}"]
+    assert [n.name for n in parser.feed(text[split:])] == ["Recursion"]
+    assert parser.finish() == parse_plan_json(extract_plan_json(text))
+
+def test_stream_learning_plan_yields_nodes_and_caches_plan(monkeypatch):
+    """The streamed completion is turned into nodes incrementally and the full plan is cached."""
+    cache = PlanCache()
+    ai = OpenAIService(api_key="test-key", plan_cache=cache)
+    text = '{"root_topic": "Recursion", "nodes": [{"name": "Functions"}, {"name": "Recursion"}]}'
+
+    def create(**kwargs):
+        assert kwargs["stream"] is True
+        for i in range(0, len(text), 7):
+            delta = types.SimpleNamespace(content=text[i:i + 7])
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+    monkeypatch.setattr(ai._openai.chat.completions, "create", create)
+    nodes = list(ai.stream_learning_plan("Recursion", 2, "Visual", 5, []))
+    assert [n.name for n in nodes] == ["Functions", "Recursion"]
+    assert cache.get(plan_cache_key("Recursion", 2, "Visual", 5, [])).nodes == nodes
+
+
+def test_http2_falls_back_with_warning_without_h2(monkeypatch):
+    """With ALP_OPENAI_HTTP2 on but h2 not importable, clients use HTTP/1.1 and a warning is logged once."""
+    import sys
+
+    from structlog.testing import capture_logs
+
+    import alp.ai.service as service_module
+
+    monkeypatch.setitem(sys.modules, "h2", None)  # makes `import h2` raise ImportError
+    monkeypatch.setattr(service_module, "OPENAI_HTTP2", True)
+    monkeypatch.setattr(service_module, "_http2_warned", False)
+    with capture_logs() as logs:
+        assert service_module._client_options()["http2"] is False
+        assert service_module._client_options()["http2"] is False
+    assert [entry["event"] for entry in logs] == ["openai.http2_unavailable"]
+    assert logs[0]["log_level"] == "warning"
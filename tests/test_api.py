@@ -0,0 +1,164 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from alp.graph import GraphService
+from alp.user import UserService
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """TestClient for the API app (lifespan included), on the test database and with tracing off."""
+    import alp.logging.instrumentation as instrumentation
+
+    # Importing alp.api runs init_tracing(); keep it from installing a tracer for the other tests
+    monkeypatch.setattr(instrumentation, "OTEL_ENABLED", False)
+    from alp.api import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _ndjson(*notes) -> str:
+    return "\n".join(json.dumps(note) for note in notes) + "\n"
+
+
+def test_notes_batch_import(client, monkeypatch):
+    """Notes are streamed through the queue to add_notes in several batches and committed together."""
+    import alp.api as api_module
+    import alp.graph.service as service_module
+
+    monkeypatch.setattr(api_module, "NOTE_BATCH_SIZE", 2)
+    monkeypatch.setattr(service_module, "NOTE_BATCH_SIZE", 2)
+    user_id = UserService.create_user(name="Batch", learning_style="Visual").id
+    body = _ndjson(
+        {"title": "Algebra", "content": "a", "parent_topic": "Math"},
+        {"title": "Groups", "content": "g", "parent_topic": "Algebra"},
+        {"title": "Rings", "content": "r", "parent_topic": "algebra"},
+        {"title": "Sets", "content": "s"},
+        {"title": "Logic", "content": "l"},
+    )
+    response = client.post("/notes:batch", params={"user_id": user_id}, content=body)
+    assert response.status_code == 200
+    assert response.json() == {"added": 5, "parents_created": 1}
+    assert GraphService.load_graph(user_id).counts() == {"nodes": 6, "edges": 3, "known": 5}
+
+
+def test_notes_batch_errors_roll_back(client):
+    """Unknown users get 404; a malformed line gets 422 and nothing of the import is kept."""
+    response = client.post("/notes:batch", params={"user_id": "missing"},
+                           content=_ndjson({"title": "A", "content": "a"}))
+    assert response.status_code == 404
+    user_id = UserService.create_user(name="Rollback", learning_style="Visual").id
+    # Cold cache: the import's user check loads the user inside the transaction that is rolled back
+    UserService.clear_cache()
+    response = client.post("/notes:batch", params={"user_id": user_id},
+                           content=_ndjson({"title": "A", "content": "a"}) + '{"title": "B"}\n')
+    assert response.status_code == 422
+    assert "line 2" in response.json()["detail"]
+    assert GraphService.load_graph(user_id, use_cache=False).counts()["nodes"] == 0
+    assert client.get(f"/users/{user_id}").json()["name"] == "Rollback"
+
+
+def test_debug_traces_opt_in(client, monkeypatch):
+    """/debug/traces is 404 with the default exporters and serves the span ring once "memory" is enabled."""
+    import alp.logging.instrumentation as instrumentation
+
+    monkeypatch.setattr(instrumentation, "OTEL_ENABLED", True)
+    monkeypatch.setattr(instrumentation, "_tracer", None)
+    monkeypatch.setattr(instrumentation, "_span_ring_enabled", False)
+    providers = []
+    monkeypatch.setattr(instrumentation.trace, "set_tracer_provider", providers.append)
+    instrumentation.init_tracing()
+    assert client.get("/debug/traces").status_code == 404
+    instrumentation.init_tracing("memory")
+    instrumentation.span_ring.clear()
+    try:
+        with providers[-1].get_tracer("test").start_as_current_span("graph.load_graph"):
+            pass
+        response = client.get("/debug/traces", params={"operation": "graph.load_graph", "limit": 1})
+        assert response.status_code == 200
+        summary = response.json()["graph.load_graph"]
+        assert summary["count"] == 1 and len(summary["slowest"]) == 1
+    finally:
+        instrumentation.span_ring.clear()
+
+
+def test_metrics_endpoint(client):
+    """/metrics counts requests per route template and includes the registered stats collectors."""
+    from alp.graph.service import graph_cache
+    from alp.logging.instrumentation import metrics
+
+    user_id = UserService.create_user(name="Metrics", learning_style="Visual").id
+    GraphService.load_graph(user_id)
+    GraphService.load_graph(user_id)  # graph cache hit
+    metrics.clear()
+    for _ in range(2):
+        assert client.get(f"/users/{user_id}").status_code == 200
+    assert client.get("/users/missing").status_code == 404
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = dict(line.rsplit(" ", 1) for line in response.text.splitlines() if not line.startswith("#"))
+    route = 'method="GET",route="/users/{user_id}"'
+    assert samples[f'alp_http_request_duration_seconds_count{{{route},status="200"}}'] == "2"
+    assert samples[f'alp_http_request_duration_seconds_count{{{route},status="404"}}'] == "1"
+    assert not any(user_id in name for name in samples)  # raw paths never become labels
+    assert "# TYPE alp_http_request_duration_seconds histogram" in response.text
+    assert int(samples["alp_graph_cache_hits"]) == graph_cache.stats()["hits"] >= 1
+    assert samples["alp_graph_cache_users"] == "1"
+    assert {"alp_plan_cache_hits", "alp_plan_cache_entries", "alp_llm_single_flight_executed"} <= set(samples)
+
+
+def test_async_round_trip_on_file_database(tmp_path, monkeypatch):
+    """
+    Onboarding, profile, note and learning-plan requests through the async engine of a fresh database
+    file: the lifespan creates its schema and each TestClient event loop gets its own async sessionmaker.
+    """
+    import weakref
+
+    import alp.db.session as session_module
+    import alp.logging.instrumentation as instrumentation
+    from alp.ai.learning_plan import LearningPlan, LearningPlanNode
+    from alp.ai.service import OpenAIService
+
+    monkeypatch.setattr(instrumentation, "OTEL_ENABLED", False)
+    from alp.api import app, get_ai_service
+
+    class PlanService(OpenAIService):
+        async def agenerate_learning_plan(self, topic, depth, style, max_nodes, known_samples=None):
+            return LearningPlan(topic, [LearningPlanNode(topic, "", 1, []),
+                                        LearningPlanNode("Limits", "", 2, [topic])])
+
+    monkeypatch.setattr(session_module, "db_path", tmp_path / "alp.db")
+    monkeypatch.setattr(session_module, "engine", None)
+    monkeypatch.setattr(session_module, "SessionLocal", None)
+    monkeypatch.setattr(session_module, "AsyncSessionLocal", None)
+    monkeypatch.setattr(session_module, "_async_sessionmakers", weakref.WeakKeyDictionary())
+    monkeypatch.setitem(app.dependency_overrides, get_ai_service, lambda: PlanService(api_key=None))
+    try:
+        with TestClient(app) as client:
+            assert (tmp_path / "alp.db").exists()  # schema created by the lifespan, not on import
+            user = client.post("/users/onboard", json={"name": "Async", "answers": {"Q1": "diagrams"}}).json()
+            UserService.clear_cache()  # read the profile back through the async engine
+            assert client.get(f"/users/{user['user_id']}").json() == user
+            note = client.post("/notes", json={"user_id": user["user_id"], "title": "Sequences",
+                                               "content": "s", "parent_topic": "Calculus"})
+            assert note.status_code == 200
+            plan = {"user_id": user["user_id"], "topic": "Calculus", "depth": 2, "max_nodes": 5}
+            assert client.post("/learning-plan", json=plan).json() == {"added": 1, "reused": 1, "skipped": []}
+            assert client.post("/learning-plan", json={**plan, "user_id": "missing"}).status_code == 404
+            first = list(session_module._async_sessionmakers.values())
+        # Shutdown disposed the loop's engine; a new client (event loop) gets an engine of its own
+        assert len(first) == 1 and not session_module._async_sessionmakers
+        with TestClient(app) as client:
+            UserService.clear_cache()
+            assert client.get(f"/users/{user['user_id']}").json()["name"] == "Async"
+            second = list(session_module._async_sessionmakers.values())
+        assert len(second) == 1 and second[0] is not first[0]
+        graph = GraphService.load_graph(user["user_id"], use_cache=False)
+        assert sorted(data["name"] for _, data in graph.concepts()) == ["Calculus", "Limits", "Sequences"]
+    finally:
+        if session_module.engine is not None:
+            session_module.engine.dispose()
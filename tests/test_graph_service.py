@@ -1,6 +1,10 @@
+import asyncio
+
+import pytest
+
 from alp.ai.learning_plan import LearningPlan, LearningPlanNode
 from alp.graph import GraphService
-from alp.user import UserService
+from alp.user import UserService, UserNotFoundError
 
 
 def test_load_and_inject_plan():
@@ -60,3 +64,418 @@ def test_mark_concept_known():
     # Reload the graph from DB to verify persistence
     graph2 = GraphService.load_graph(user_id)
     assert graph2.is_known(alg_id)
+
+
+def test_graph_cache_updated_in_place():
+    """Test that load_graph serves a shared cached graph that writes keep up to date."""
+    user = UserService.create_user(name="Tester3", learning_style="Visual")
+    user_id = user.id
+    graph = GraphService.load_graph(user_id)  # miss: loaded from the database and cached
+    assert GraphService.load_graph(user_id) is graph  # hit: same in-memory graph
+    # Adding a note with a new parent updates the cached graph without a reload
+    concept_id = GraphService.add_note(user_id, title="Limits", content="...", parent_name="Calculus")
+    assert graph.has_concept(concept_id)
+    assert graph.counts() == {"nodes": 2, "edges": 1, "known": 1}
+    stats = GraphService.cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["weight"] == 3
+    # Invalidation forces the next load to re-read the database
+    GraphService.invalidate_cache(user_id)
+    reloaded = GraphService.load_graph(user_id)
+    assert reloaded is not graph
+    assert reloaded.counts() == graph.counts()
+
+
+def test_graph_cache_serializes_writes():
+    """Writes to a shared graph go through the cache lock and reach each graph instance once."""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from alp.graph import KnowledgeGraph
+    from alp.graph.service import GraphCache
+
+    cache = GraphCache()
+    cache.finish_load("u", cache.begin_load("u"), KnowledgeGraph())
+    shared = cache.get("u")
+    calls = []
+
+    def record(graph: KnowledgeGraph) -> None:
+        # Another thread cannot take the cache lock while a write runs
+        probe = threading.Thread(target=lambda: calls.append(cache._lock.acquire(blocking=False)))
+        probe.start()
+        probe.join()
+        calls.append(graph)
+
+    cache.apply("u", record, shared)
+    assert calls == [False, shared]
+    own = KnowledgeGraph()
+    calls.clear()
+    cache.apply("u", record, own)
+    assert calls == [False, own, False, shared]
+
+    def add(i: int) -> None:
+        cache.apply("u", lambda g: g.add_concept(i, f"c{i}", i % 2 == 0), shared)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(add, range(2000)))
+    assert shared.counts() == {"nodes": 2000, "edges": 0, "known": 1000}
+    assert cache.stats()["weight"] == 2000
+
+
+@pytest.mark.parametrize("backend", ["networkx", "compact"])
+def test_shared_graph_readers_during_writes(backend):
+    """Readers of a shared cached graph never see its containers change size under them while writers apply."""
+    import threading
+
+    from alp.graph import KnowledgeGraph
+    from alp.graph.service import GraphCache, PlanStreamInjector
+
+    cache = GraphCache()
+    cache.finish_load("u", cache.begin_load("u"), KnowledgeGraph(backend=backend))
+    shared = cache.get("u")
+    done = threading.Event()
+    errors = []
+
+    def write() -> None:
+        try:
+            for i in range(3000):
+                def grow(g: KnowledgeGraph, i: int = i) -> None:
+                    g.add_concept(i, f"c{i}", False, difficulty=i % 7 + 1)
+                    if i:
+                        g.add_edge(i - 1, i)
+
+                cache.apply("u", grow)
+        finally:
+            done.set()
+
+    def read() -> None:
+        try:
+            while not done.is_set():
+                edges = list(shared.edges())
+                # The existing-name maps of inject_plan and PlanStreamInjector
+                names = {data["name"].lower(): cid for cid, data in shared.concepts() if data.get("name")}
+                PlanStreamInjector("u", shared, 3, 10)
+                assert len(edges) < len(names) or not names  # the graph only grows
+                shared.counts(detailed=True)
+                if shared.has_concept(5):
+                    list(shared.neighbors_out(1))
+                    shared.shortest_path(0, 5)
+        except Exception as exc:  # surfaced in the main thread
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert shared.counts()["nodes"] == 3000
+
+
+def test_graph_cache_evicts_least_recently_used():
+    """Test that the cache evicts cold users once its weight budget is exceeded."""
+    from alp.graph import KnowledgeGraph
+    from alp.graph.service import GraphCache
+
+    def make_graph(n: int) -> KnowledgeGraph:
+        g = KnowledgeGraph()
+        for i in range(n):
+            g.add_concept(i, f"c{i}", False)
+        return g
+
+    cache = GraphCache(max_weight=5)
+    for user_id in ("a", "b"):
+        cache.finish_load(user_id, cache.begin_load(user_id), make_graph(2))
+    assert cache.get("a") is not None  # "a" is now most recently used
+    cache.finish_load("c", cache.begin_load("c"), make_graph(2))
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    # A write landing while a load is in flight keeps the (possibly stale) result out of the cache
+    token = cache.begin_load("d")
+    cache.apply("d", lambda g: None)
+    cache.finish_load("d", token, make_graph(1))
+    assert cache.get("d") is None
+
+
+def test_refresh_graph_applies_only_changes():
+    """Test that refresh_graph catches a graph up with rows written after it was loaded."""
+    user = UserService.create_user(name="Tester4", learning_style="Visual")
+    user_id = user.id
+    GraphService.add_note(user_id, title="Math", content="...")
+    stale = GraphService.load_graph(user_id, use_cache=False)
+    GraphService.invalidate_cache(user_id)  # keep `stale` out of the write-through path
+    concept_id = GraphService.add_note(user_id, title="Calculus", content="...", parent_name="Math")
+    GraphService.mark_concept_known(user_id, concept_id)
+    assert not stale.has_concept(concept_id)
+    applied = GraphService.refresh_graph(user_id, stale)
+    assert applied == 2  # the new concept (updated twice) and its edge
+    assert stale.is_known(concept_id)
+    assert stale.counts() == {"nodes": 2, "edges": 1, "known": 2}
+    # Nothing changed since, so a second refresh is a no-op
+    assert GraphService.refresh_graph(user_id, stale) == 0
+
+
+def test_inject_plan_batches_new_concepts_and_edges():
+    """Test that a large plan is inserted with IDs matched to the right names and no duplicate edges."""
+    user = UserService.create_user(name="Tester5", learning_style="Visual")
+    user_id = user.id
+    nodes = [LearningPlanNode(name="Topic 0", summary="root", difficulty=1, prerequisites=[])]
+    for i in range(1, 200):
+        nodes.append(LearningPlanNode(name=f"Topic {i}", summary=f"s{i}", difficulty=1,
+                                      prerequisites=[f"Topic {i - 1}", f"topic {i - 1}", "Missing"]))
+    graph = GraphService.load_graph(user_id)
+    added, reused, skipped = GraphService.inject_plan(user_id, graph, LearningPlan("Topics", nodes),
+                                                      depth=1, max_nodes=500)
+    assert (added, reused, skipped) == (200, 0, ["Missing"])
+    assert graph.counts() == {"nodes": 200, "edges": 199, "known": 0}
+    reloaded = GraphService.load_graph(user_id, use_cache=False)
+    for cid in reloaded.G.nodes:
+        data = reloaded.concept_data(cid)
+        assert graph.concept_data(cid)["name"] == data["name"]
+        assert data["content"] == ("root" if data["name"] == "Topic 0" else f"s{data['name'].split()[1]}")
+    assert reloaded.counts()["edges"] == 199
+    assert reloaded.counts(detailed=True)["by_difficulty"] == {1: {"nodes": 200, "known": 0}}
+
+
+def test_inject_plan_from_stale_graph():
+    """Injecting from a graph that missed another writer's edges skips them instead of failing."""
+    user_id = UserService.create_user(name="Stale", learning_style="Visual").id
+    GraphService.add_note(user_id, title="Math", content="x")
+    GraphService.add_note(user_id, title="Calculus", content="y")
+    first, second, stream = (GraphService.load_graph(user_id, use_cache=False) for _ in range(3))
+    GraphService.invalidate_cache(user_id)
+    plan = LearningPlan("Math", [LearningPlanNode(name="Math", summary="", difficulty=1, prerequisites=[]),
+                                 LearningPlanNode(name="Calculus", summary="", difficulty=2,
+                                                  prerequisites=["Math"])])
+    for graph in (first, second):
+        assert GraphService.inject_plan(user_id, graph, plan, depth=2, max_nodes=10) == (0, 2, [])
+        assert graph.counts()["edges"] == 1
+    assert [e["status"] for e in GraphService.inject_plan_stream(user_id, stream, iter(plan.nodes), 2, 10)] == [
+        "reused", "reused", "done"]
+    assert GraphService.load_graph(user_id, use_cache=False).counts()["edges"] == 1
+
+
+def test_lazy_content_loading(monkeypatch):
+    """Test that lazy mode leaves content out of the graph and serves it on demand."""
+    import alp.graph.service as service_module
+
+    monkeypatch.setattr(service_module, "LAZY_CONTENT", True)
+    user = UserService.create_user(name="Tester6", learning_style="Visual")
+    user_id = user.id
+    concept_id = GraphService.add_note(user_id, title="Math", content="# Long markdown body")
+    graph = GraphService.load_graph(user_id)
+    assert graph.concept_data(concept_id)["name"] == "Math"
+    assert graph.concept_data(concept_id)["content"] is None
+    assert GraphService.concept_content(user_id, concept_id, graph) == "# Long markdown body"
+    assert GraphService.concept_content(user_id, concept_id) == "# Long markdown body"
+    assert service_module.content_cache.stats()["hits"] == 1
+    # Writes to the user's graph evict their cached contents
+    other_id = UserService.create_user(name="Tester6b", learning_style="Visual").id
+    other_concept = GraphService.add_note(other_id, title="Art", content="colours")
+    assert GraphService.concept_content(other_id, other_concept) == "colours"
+    GraphService.mark_concept_known(user_id, concept_id)
+    assert service_module.content_cache.stats()["users"] == 1
+    assert GraphService.concept_content(other_id, other_concept) == "colours"
+    assert service_module.content_cache.stats()["hits"] == 2
+
+
+def test_content_cache_lru():
+    """Test that the content cache bounds its total size and drops a fetch that overlapped an eviction."""
+    from alp.graph.service import ContentCache
+
+    cache = ContentCache(max_entries=3)
+    for concept_id in (1, 2):
+        cache.get("a", concept_id, lambda: "a")
+    cache.get("b", 1, lambda: "b")
+    assert cache.get("a", 1, lambda: "unused") == "a"  # hit: a:1 is now a's most recent entry
+    cache.get("b", 2, lambda: "b")  # over capacity: evicts a:2, the oldest entry of the least recent user
+    assert cache.stats()["entries"] == 3
+    assert cache.get("a", 2, lambda: "refetched") == "refetched"
+
+    def fetch_during_write():
+        cache.invalidate("a")
+        return "stale"
+
+    assert cache.get("a", 3, fetch_during_write) == "stale"
+    assert cache.get("a", 3, lambda: "fresh") == "fresh"
+
+
+def test_inject_plan_stream():
+    """Test progressive injection: nodes land one by one and late prerequisites are linked when they arrive."""
+    user = UserService.create_user(name="Tester7", learning_style="Visual")
+    user_id = user.id
+    GraphService.add_note(user_id, title="Math", content="Basic Math content")
+    graph = GraphService.load_graph(user_id)
+    nodes = [
+        LearningPlanNode(name="Limits", summary="", difficulty=3, prerequisites=["Calculus", "Sets"]),
+        LearningPlanNode(name="Calculus", summary="", difficulty=2, prerequisites=["Math"]),
+        LearningPlanNode(name="math", summary="", difficulty=1, prerequisites=[]),
+        LearningPlanNode(name="Topology", summary="", difficulty=4, prerequisites=[]),
+    ]
+    events = []
+    for event in GraphService.inject_plan_stream(user_id, graph, iter(nodes), depth=3, max_nodes=10):
+        events.append(event)
+        if event["status"] == "added":
+            # Each node is already committed when its event is yielded
+            assert GraphService.load_graph(user_id, use_cache=False).has_concept(event["concept_id"])
+    assert [(e.get("name"), e["status"]) for e in events] == [
+        ("Limits", "added"), ("Calculus", "added"), ("math", "reused"), (None, "done"),
+    ]
+    assert events[-1] == {"status": "done", "added": 2, "reused": 1, "skipped": ["Sets"]}
+    ids = {e["name"]: e["concept_id"] for e in events[:-1]}
+    assert graph.shortest_path(ids["math"], ids["Limits"]) == [ids["math"], ids["Calculus"], ids["Limits"]]
+    assert GraphService.load_graph(user_id, use_cache=False).counts() == {"nodes": 3, "edges": 2, "known": 1}
+
+
+def test_add_notes_batches_and_resolves_parents(monkeypatch):
+    """Test bulk note import: parents resolve to existing concepts or earlier notes, across batches."""
+    import alp.graph.service as service_module
+
+    monkeypatch.setattr(service_module, "NOTE_BATCH_SIZE", 2)
+    user = UserService.create_user(name="Tester8", learning_style="Visual")
+    user_id = user.id
+    math_id = GraphService.add_note(user_id, title="Math", content="Basic Math content")
+    cached = GraphService.load_graph(user_id)
+
+    def notes():
+        yield "Algebra", "a", "math"  # existing concept
+        yield "Groups", "g", "Algebra"  # note earlier in the same batch
+        yield "Rings", "r", "ALGEBRA"  # note from an earlier batch
+        yield "Sets", "s", "Logic"  # unknown parent: created once
+        yield "Relations", "rel", "logic"
+
+    assert GraphService.add_notes(user_id, notes()) == (5, 1)
+    graph = GraphService.load_graph(user_id)
+    assert graph is not cached
+    assert graph.counts() == {"nodes": 7, "edges": 5, "known": 6}
+    ids = {data["name"]: cid for cid, data in graph.concepts()}
+    assert graph.shortest_path(math_id, ids["Rings"]) == [math_id, ids["Algebra"], ids["Rings"]]
+    assert graph.shortest_path(ids["Logic"], ids["Relations"]) == [ids["Logic"], ids["Relations"]]
+    assert graph.concept_data(ids["Groups"])["content"] == "g"
+    # Notes sharing a title keep their own content and parent
+    assert GraphService.add_notes(user_id, [("Dup", "one", None), ("Dup", "two", "Math")]) == (2, 0)
+    graph = GraphService.load_graph(user_id)
+    dups = {graph.concept_data(cid)["content"]: cid for cid, data in graph.concepts() if data["name"] == "Dup"}
+    assert graph.shortest_path(math_id, dups["two"]) == [math_id, dups["two"]]
+    assert graph.shortest_path(math_id, dups["one"]) is None
+
+
+def test_writes_check_user_in_transaction():
+    """Test that require_user rejects unknown users without writing anything."""
+    with pytest.raises(UserNotFoundError):
+        GraphService.add_note("missing", title="Math", content="x", require_user=True)
+    with pytest.raises(UserNotFoundError):
+        GraphService.add_notes("missing", iter([("Math", "x", None)]), require_user=True)
+    assert GraphService.load_graph("missing", use_cache=False).counts()["nodes"] == 0
+    user = UserService.create_user(name="Tester9", learning_style="Visual")
+    UserService.clear_cache()
+    assert GraphService.add_note(user.id, title="Math", content="x", require_user=True)
+
+
+@pytest.mark.parametrize("shards", ["3", "per-user"])
+def test_sharded_storage(monkeypatch, tmp_path, shards):
+    """Test that sharded mode keeps each user's graph in its shard file and bounds open engines."""
+    import alp.db.session as session_module
+    from alp.db.models import Concept
+
+    engines = session_module.ShardEngines(max_open=2)
+    monkeypatch.setattr(session_module, "DB_SHARDS", shards)
+    monkeypatch.setattr(session_module, "db_path", tmp_path / "mvp.db")
+    monkeypatch.setattr(session_module, "shard_engines", engines)
+    users = [UserService.create_user(name=f"Sharded{i}", learning_style="Visual").id for i in range(5)]
+    for i, user_id in enumerate(users):
+        GraphService.add_note(user_id, title=f"Note {i}", content="x", parent_name="Root", require_user=True)
+        GraphService.add_notes(user_id, iter([(f"Child {i}", "y", f"Note {i}")]))
+    assert len(engines) == 2
+    for i, user_id in enumerate(users):
+        graph = GraphService.load_graph(user_id, use_cache=False)
+        assert graph.counts() == {"nodes": 3, "edges": 2, "known": 2}
+        assert {data["name"] for _, data in graph.concepts()} == {"Root", f"Note {i}", f"Child {i}"}
+        assert session_module.shard_path(user_id).exists()
+    files = {session_module.shard_path(user_id) for user_id in users}
+    assert len(files) == 5 if shards == "per-user" else len(files) <= 3
+    # Nothing was written to the main database
+    with session_module.session_scope() as db:
+        assert db.query(Concept).count() == 0
+    engines.dispose_all()
+
+
+def test_shard_opened_once_across_threads(monkeypatch, tmp_path):
+    """Test that threads opening the same new shard file create and upgrade its schema once."""
+    import threading
+
+    import alp.db.session as session_module
+
+    engines = session_module.ShardEngines()
+    real_upgrade = session_module.upgrade_schema
+    upgrades = []
+
+    def slow_upgrade(bind):
+        upgrades.append(bind)
+        threading.Event().wait(0.05)
+        real_upgrade(bind)
+
+    monkeypatch.setattr(session_module, "upgrade_schema", slow_upgrade)
+    factories = []
+    path = tmp_path / "shards" / "0.db"
+    threads = [threading.Thread(target=lambda: factories.append(engines.sessionmaker_for(path)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(upgrades) == 1 and len(factories) == 4
+    assert all(factory is factories[0] for factory in factories)
+    assert len(engines) == 1 and not engines._opening
+    engines.dispose_all()
+
+
+def test_async_graph_operations():
+    """Test that the async service methods read and write the same data as the sync ones."""
+    user = UserService.create_user(name="Tester10", learning_style="Visual")
+    user_id = user.id
+    UserService.clear_cache()
+
+    async def scenario():
+        assert (await UserService.aget_user_by_id(user_id)).name == "Tester10"
+        assert await UserService.aget_user_by_id("missing") is None
+        math_id = await GraphService.aadd_note(user_id, title="Math", content="x", parent_name="Root",
+                                               require_user=True)
+        with pytest.raises(UserNotFoundError):
+            await GraphService.aadd_note("missing", title="Math", content="x", require_user=True)
+        graph = await GraphService.aload_graph(user_id)
+        plan = LearningPlan("Math", [LearningPlanNode("Calculus", "", 2, ["Math", "Sets"])])
+        result = await GraphService.ainject_plan(user_id, graph, plan, depth=4, max_nodes=10)
+        return math_id, graph, result
+
+    math_id, graph, result = asyncio.run(scenario())
+    assert result == (1, 0, ["Sets"])
+    reloaded = GraphService.load_graph(user_id, use_cache=False)
+    assert reloaded.counts() == graph.counts() == {"nodes": 3, "edges": 2, "known": 1}
+    calculus_id = next(cid for cid, data in reloaded.concepts() if data["name"] == "Calculus")
+    assert reloaded.has_edge(math_id, calculus_id)
+
+
+def test_lazy_startup(tmp_path):
+    """Test that importing the API opens no database and defers heavy imports until init_db/first use."""
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    db_file = tmp_path / "data" / "mvp.db"
+    code = (
+        "import sys, alp.api\n"
+        "print(sorted(m for m in ('networkx', 'openai', 'sqlalchemy.ext.asyncio') if m in sys.modules))\n"
+        "import alp.db.session as s\n"
+        "assert s.engine is None and not s.db_path.exists()\n"
+        "s.init_db()\n"
+        "from alp.user import UserService\n"
+        "print(UserService.create_user(name='Lazy', learning_style='Visual').name)\n"
+    )
+    env = {**os.environ, "ALP_DB_PATH": str(db_file), "ALP_OTEL_ENABLED": "0"}
+    result = subprocess.run([sys.executable, "-c", code], env=env, cwd=Path(__file__).resolve().parents[1],
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-2:] == ["[]", "Lazy"]
+    assert db_file.exists()
@@ -0,0 +1,183 @@
+import networkx as nx
+import pytest
+
+from alp.graph import KnowledgeGraph
+from alp.graph.compact_graph import CompactKnowledgeGraph
+
+
+@pytest.fixture(params=["networkx", "compact"])
+def graph(request):
+    return KnowledgeGraph(backend=request.param)
+
+
+def test_backend_selection():
+    """Test that the backend is chosen at construction."""
+    assert isinstance(KnowledgeGraph(backend="compact"), CompactKnowledgeGraph)
+    assert type(KnowledgeGraph(backend="networkx")) is KnowledgeGraph
+    with pytest.raises(ValueError):
+        KnowledgeGraph(backend="nope")
+
+
+def test_backends_share_api(graph):
+    """Test construction, queries and export behave the same on every backend."""
+    graph.add_concept(10, "Math", True, "content")
+    graph.add_concept(20, "Calculus", False)
+    graph.add_concept(30, "Limits", False)
+    graph.add_edge(10, 20)
+    graph.add_edge(20, 30)
+    graph.add_edge(20, 30)  # duplicate
+    graph.add_edge(10, 10)  # self-loop
+    graph.add_edge(10, 99)  # missing node
+    assert graph.counts() == {"nodes": 3, "edges": 2, "known": 1}
+    assert graph.has_edge(10, 20) and not graph.has_edge(20, 10)
+    assert graph.concept_data(10) == {"name": "Math", "known": True, "content": "content", "difficulty": None}
+    assert list(graph.neighbors_out(20)) == [30]
+    assert list(graph.neighbors_in(20)) == [10]
+    assert graph.shortest_path(10, 30) == [10, 20, 30]
+    # No directed path from Limits back to Math: falls back to undirected
+    assert graph.shortest_path(30, 10) == [30, 20, 10]
+    graph.add_concept(40, "Isolated", False)
+    assert graph.shortest_path(10, 40) is None
+    graph.mark_known(30)
+    assert graph.is_known(30)
+    assert graph.counts()["known"] == 2
+    elements = graph.to_cytoscape_elements(highlight_path=[30, 20])
+    assert len(elements) == 6
+    highlighted = [e for e in elements if e["data"].get("pathHighlight")]
+    assert len(highlighted) == 3  # two nodes and the reversed edge
+    graph.clear()
+    assert graph.counts() == {"nodes": 0, "edges": 0, "known": 0}
+
+
+def test_counts_detailed(graph):
+    """Test that maintained counters and difficulty/depth tallies track every mutation."""
+    graph.add_concept(1, "Note", True)  # no difficulty: counted, not tallied
+    graph.add_concept(2, "Basics", False, difficulty=1)
+    graph.add_concept(3, "Advanced", False, difficulty=3)
+    graph.add_concept(3, "Advanced", False, difficulty=2)  # re-adding moves its tally
+    graph.mark_known(2)
+    graph.mark_known(2)  # already known
+    graph.add_edge(2, 3)
+    counts = graph.counts(detailed=True)
+    assert (counts["nodes"], counts["edges"], counts["known"]) == (3, 1, 2)
+    assert counts["by_difficulty"] == {1: {"nodes": 1, "known": 1}, 2: {"nodes": 1, "known": 0}}
+    assert counts["by_depth"] == {1: {"nodes": 1, "known": 1}, 2: {"nodes": 2, "known": 1}}
+    graph.clear()
+    assert graph.counts(detailed=True)["by_difficulty"] == {}
+
+
+def test_layout_cached_and_incremental(graph):
+    """Test that positions are reused per version and existing nodes stay pinned when nodes are added."""
+    for cid in range(1, 6):
+        graph.add_concept(cid, f"C{cid}", False)
+        if cid > 1:
+            graph.add_edge(cid - 1, cid)
+    first = graph._layout()
+    assert graph._layout() is first  # same version: no recomputation
+    graph.mark_known(1)  # version changes, structure does not
+    assert graph._layout() == first
+    graph.add_concept(6, "C6", False)
+    graph.add_edge(5, 6)
+    second = graph._layout()
+    assert set(second) == set(range(1, 7))
+    assert all(second[cid] == first[cid] for cid in first)
+
+
+def test_layout_computed_once_across_threads(graph, monkeypatch):
+    """Test that threads sharing a graph wait for a single layout instead of racing on the cache."""
+    import threading
+
+    import alp.graph.knowledge_graph as kg_module
+
+    for cid in range(1, 6):
+        graph.add_concept(cid, f"C{cid}", False)
+    calls = []
+    real_layout = kg_module.incremental_layout
+
+    def slow_layout(*args):
+        calls.append(threading.get_ident())
+        threading.Event().wait(0.05)
+        return real_layout(*args)
+
+    monkeypatch.setattr(kg_module, "incremental_layout", slow_layout)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(graph._layout())) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_grid_layout_for_large_graphs(monkeypatch):
+    """Test that the grid-accelerated layout is used above the threshold and pins existing nodes."""
+    import alp.graph.layout as layout_module
+
+    monkeypatch.setattr(layout_module, "LAYOUT_FAST_THRESHOLD", 50)
+    nodes = list(range(200))
+    edges = [(i // 2, i) for i in range(1, 200)]
+    pos = layout_module.incremental_layout(nodes, edges)
+    assert set(pos) == set(nodes)
+    assert all(-1.0 <= c <= 1.0 for xy in pos.values() for c in xy)
+    grown = layout_module.incremental_layout(nodes + [200], edges + [(100, 200)], pos)
+    assert all(grown[n] == pos[n] for n in nodes)
+
+
+def test_shortest_path_memo_and_undirected_fallback(graph):
+    """Test shortest paths over directed and undirected edges and their per-version memo."""
+    # 1 -> 2 -> 3 <- 4 -> 5: no directed path from 1 to 5
+    for cid in range(1, 6):
+        graph.add_concept(cid, f"C{cid}", False)
+    for u, v in [(1, 2), (2, 3), (4, 3), (4, 5)]:
+        graph.add_edge(u, v)
+    assert graph.shortest_path(1, 5) == [1, 2, 3, 4, 5]
+    assert graph.shortest_path(1, 1) == [1]
+    with pytest.raises(nx.NodeNotFound):
+        graph.shortest_path(1, 99)
+    path = graph.shortest_path(1, 5)
+    path.append(0)  # callers get a copy, not the memoized list
+    assert graph.shortest_path(1, 5) == [1, 2, 3, 4, 5]
+    graph.add_edge(1, 5)  # version change invalidates the memo
+    assert graph.shortest_path(1, 5) == [1, 5]
+
+
+def test_missing_concepts_raise_like_networkx(graph):
+    """Test that every backend raises networkx's errors for concepts that are not in the graph."""
+    graph.add_concept(1, "A", False)
+    with pytest.raises(nx.NodeNotFound):
+        graph.shortest_path(99, 1)
+    with pytest.raises(nx.NetworkXError):
+        list(graph.neighbors_out(99))
+    with pytest.raises(nx.NetworkXError):
+        list(graph.neighbors_in(99))
+
+
+def test_shortest_path_memo_across_threads(graph, monkeypatch):
+    """Test that threads sharing a graph keep its path memo consistent while evicting."""
+    import threading
+
+    import alp.graph.knowledge_graph as kg_module
+
+    monkeypatch.setattr(kg_module, "PATH_MEMO_SIZE", 4)
+    for cid in range(100):
+        graph.add_concept(cid, f"C{cid}", False)
+        if cid:
+            graph.add_edge(cid - 1, cid)
+    errors = []
+
+    def query(offset):
+        try:
+            for i in range(500):
+                start = (i + offset) % 40
+                assert graph.shortest_path(start, start + 50) == list(range(start, start + 51))
+        except Exception as exc:  # surfaced in the main thread
+            errors.append(exc)
+
+    threads = [threading.Thread(target=query, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(graph._path_memo) <= 4
@@ -4,3 +4,288 @@ def test_plan_logs(caplog, monkeypatch):
     caplog.set_level("INFO")
     plan = ai.generate_learning_plan("Recursion", 2, "Visual", 5, [])
     assert "generate_learning_plan" in caplog.text
+
+
+def test_log_writer_drops_on_overflow():
+    import io
+    import json
+    import threading
+    import time
+
+    from alp.logging.config import LogWriter
+
+    gate = threading.Event()
+
+    class BlockedStream(io.StringIO):
+        def write(self, s):
+            gate.wait(5)
+            return super().write(s)
+
+    stream = BlockedStream()
+    writer = LogWriter(lambda _, __, event: json.dumps(event), stream, max_size=2)
+    writer.put({"event": "a"})
+    while writer.stats()["queued"]:
+        time.sleep(0.001)
+    # The writer thread is stuck writing "a": two events fit in the queue, the third is dropped
+    for event in ("b", "c", "d"):
+        writer.put({"event": event})
+    gate.set()
+    assert writer.flush()
+    assert [json.loads(line)["event"] for line in stream.getvalue().splitlines()] == ["a", "b", "c"]
+    assert writer.stats()["dropped"] == 1 and writer.stats()["written"] == 3
+    writer.close()
+
+
+def test_log_writer_counts_concurrent_puts():
+    import io
+    import sys
+    import threading
+
+    from alp.logging.config import LogWriter
+
+    gate = threading.Event()
+
+    class BlockedStream(io.StringIO):
+        def write(self, s):
+            gate.wait(5)
+            return super().write(s)
+
+    writer = LogWriter(lambda _, __, event: str(event), BlockedStream(), max_size=100)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible to interleave the puts
+    try:
+        threads = [threading.Thread(target=lambda: [writer.put({"event": "e"}) for _ in range(5000)])
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    gate.set()
+    stats = writer.stats()
+    assert stats["enqueued"] + stats["dropped"] == 8 * 5000
+    assert writer.flush()
+    assert writer.stats()["written"] == stats["enqueued"]
+    writer.close()
+
+
+def test_queued_logging():
+    import io
+    import json
+    import logging
+
+    import structlog
+
+    from alp.logging.config import configure_logging, get_log_writer, get_logger
+
+    stream = io.StringIO()
+    try:
+        configure_logging(queue_size=100, serializer="orjson", stream=stream)
+        get_logger("test").info("queued.event", n=1, payload={1: "x"})
+        logging.getLogger("test.stdlib").warning("stdlib %s", "record")
+        assert get_log_writer().flush()
+        lines = stream.getvalue().splitlines()
+        assert json.loads(lines[0])["event"] == "queued.event"
+        assert json.loads(lines[0])["payload"] == {"1": "x"}
+        assert lines[1] == "stdlib record"
+    finally:
+        configure_logging(queue_size=0)
+        structlog.reset_defaults()
+    assert get_log_writer() is None
+
+
+def test_log_sampling_and_lazy_fields():
+    import io
+    import json
+
+    import structlog
+
+    from alp.logging.config import configure_logging, get_logger, lazy, sampling_stats
+
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return "computed"
+
+    stream = io.StringIO()
+    try:
+        configure_logging(queue_size=0, stream=stream, sample_rates="noisy.event=0,*=1", sample_key="request_id=0.5")
+        log = get_logger("test")
+        log.debug("disabled.event", field=lazy(expensive))
+        for _ in range(10):
+            log.info("noisy.event", field=lazy(expensive))
+        log.error("noisy.event", field=lazy(expensive))
+        log.info("kept.event", field=lazy(expensive))
+        # Key sampling keeps or drops every event of a request id together
+        for rid in range(20):
+            structlog.contextvars.bind_contextvars(request_id=str(rid))
+            log.info("request.step")
+            log.info("request.step")
+        structlog.contextvars.clear_contextvars()
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [(e["event"], e["level"]) for e in events[:2]] == [("noisy.event", "error"), ("kept.event", "info")]
+        assert all(e["field"] == "computed" for e in events[:2]) and len(calls) == 2
+        steps = [e["request_id"] for e in events[2:]]
+        assert 0 < len(steps) < 40 and all(steps.count(rid) == 2 for rid in steps)
+        stats = sampling_stats()
+        assert stats["by_event"] == {"noisy.event": 10} and stats["by_key"] == 40 - len(steps)
+    finally:
+        configure_logging(queue_size=0, sample_rates="", sample_key="")
+        structlog.reset_defaults()
+
+
+def test_lazy_field_renders_without_resolver():
+    """A lazy field logged through a pipeline without resolve_lazy still shows its value."""
+    import io
+
+    import structlog
+
+    from alp.logging.config import lazy
+
+    stream = io.StringIO()
+    structlog.configure(processors=[structlog.processors.KeyValueRenderer()],
+                        logger_factory=structlog.PrintLoggerFactory(stream))
+    try:
+        structlog.get_logger().info("plain.event", size=lazy(len, [1, 2, 3]), name=lazy(str.upper, "a"))
+        assert stream.getvalue().strip() == "size=3 name='A' event='plain.event'"
+        assert f"{lazy(len, 'ab')}" == "2"
+    finally:
+        structlog.reset_defaults()
+
+
+def test_traced_spans(monkeypatch):
+    import asyncio
+
+    import pytest
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.trace import StatusCode
+
+    import alp.logging.instrumentation as instrumentation
+    from alp.graph import GraphService
+    from alp.logging.instrumentation import traced
+    from alp.user import UserService
+
+    @traced("test.fail")
+    async def fail():
+        """Always fails."""
+        raise ValueError("boom")
+
+    assert GraphService.load_graph.__name__ == "load_graph" and fail.__doc__ == "Always fails."
+    user_id = UserService.create_user(name="Traced", learning_style="Visual").id
+    GraphService.add_note(user_id, title="Math", content="x")
+    # Tracing disabled: plain calls
+    assert GraphService.load_graph(user_id).counts()["nodes"] == 1
+    recorded = {}
+    for ratio in (1.0, 0.0):
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(ratio)))
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        monkeypatch.setattr(instrumentation, "_tracer", provider.get_tracer("test"))
+        GraphService.load_graph(user_id)
+        with pytest.raises(ValueError):
+            asyncio.run(fail())
+        recorded[ratio] = {span.name: span for span in exporter.get_finished_spans()}
+    assert recorded[0.0] == {}
+    spans = recorded[1.0]
+    assert spans["graph.load_graph"].attributes["graph.nodes"] == 1
+    assert spans["graph.load_graph"].attributes["code.function"] == "load_graph"
+    assert spans["test.fail"].status.status_code == StatusCode.ERROR
+
+
+def test_default_tracing_is_noop(monkeypatch):
+    """With the default exporters and no OTLP endpoint nothing is installed and @traced adds no spans."""
+    import alp.logging.instrumentation as instrumentation
+    from alp.logging.instrumentation import trace, traced
+
+    monkeypatch.setattr(instrumentation, "OTEL_ENABLED", True)
+    monkeypatch.setattr(instrumentation, "OTLP_ENDPOINT", None)
+    monkeypatch.setattr(instrumentation, "_tracer", None)
+    providers = []
+    monkeypatch.setattr(instrumentation.trace, "set_tracer_provider", providers.append)
+    assert instrumentation.init_tracing() is None
+    assert instrumentation._tracer is None and providers == []
+
+    @traced("test.noop")
+    def current_span():
+        return trace.get_current_span()
+
+    assert not current_span().is_recording()
+
+
+def test_span_ring():
+    import pytest
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+    from alp.logging.instrumentation import SpanRing, init_tracing
+
+    with pytest.raises(ValueError):
+        init_tracing("memory,zipkin")
+    ring = SpanRing(size=3, max_operations=2)
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(ring))
+    tracer = provider.get_tracer("test")
+    for i in range(5):
+        with tracer.start_as_current_span("graph.load_graph") as span:
+            span.set_attribute("graph.nodes", i)
+    for name in ("graph.inject_plan", "ai.generate_learning_plan"):
+        with tracer.start_as_current_span(name):
+            pass
+    summary = ring.summary()
+    # Only the last 3 spans per operation are kept, and at most 2 operations
+    assert set(summary) == {"graph.load_graph", "graph.inject_plan"}
+    assert summary["graph.load_graph"]["count"] == 3
+    slowest = ring.summary("graph.load_graph", limit=2)["graph.load_graph"]["slowest"]
+    assert len(slowest) == 2 and slowest[0]["duration_ms"] >= slowest[1]["duration_ms"]
+    assert {r["attributes"]["graph.nodes"] for r in slowest} <= {2, 3, 4}
+    assert len(slowest[0]["trace_id"]) == 32
+    ring.clear()
+    assert ring.summary() == {}
+
+
+def test_metrics(monkeypatch):
+    import types
+
+    import alp.db.session as session_module
+    from alp.ai.service import OpenAIService
+    from alp.logging.instrumentation import (
+        MetricsRegistry, db_queries_per_request, finish_request_metrics, instrument_engine, llm_request_duration,
+        llm_tokens, metrics, start_request_metrics,
+    )
+    from alp.user import UserService
+
+    metrics.clear()
+    instrument_engine(session_module.engine)
+    usage, token = start_request_metrics()
+    UserService.create_user(name="Metrics", learning_style="Visual")
+    finish_request_metrics(token, usage, "POST", "/users/onboard", 200, 0.004)
+    assert usage.queries >= 1 and usage.seconds > 0
+    assert db_queries_per_request.count("/users/onboard") == 1
+
+    ai = OpenAIService(api_key="test-key")
+
+    def create(**kwargs):
+        message = types.SimpleNamespace(content="Visual")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)],
+                                     usage=types.SimpleNamespace(prompt_tokens=12, completion_tokens=1))
+
+    monkeypatch.setattr(ai._openai.chat.completions, "create", create)
+    assert ai.detect_learning_style({"q1": "A"}, use_gpt=True) == "Visual"
+    assert llm_request_duration.count("detect_learning_style", "ok") == 1
+    assert llm_tokens.value("detect_learning_style", "prompt") == 12
+
+    text = metrics.render()
+    assert ('alp_http_request_duration_seconds_bucket{method="POST",route="/users/onboard",status="200",'
+            'le="0.005"} 1') in text
+    assert 'alp_http_request_duration_seconds_count{method="POST",route="/users/onboard",status="200"} 1' in text
+    assert "# TYPE alp_llm_tokens_total counter" in text
+    # Stats collectors are rendered as gauges; non-numeric values are skipped
+    registry = MetricsRegistry()
+    registry.register_collector("alp_test", lambda: {"hits": 3, "hit_rate": 0.5, "name": "x"})
+    assert registry.render() == ("# TYPE alp_test_hit_rate gauge\nalp_test_hit_rate 0.5\n"
+                                 "# TYPE alp_test_hits gauge\nalp_test_hits 3\n")
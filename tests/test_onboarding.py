@@ -1,3 +1,7 @@
+import asyncio
+
+import pytest
+
 from alp.user import UserService
 from alp.ai.service import OpenAIService
 
@@ -12,3 +16,37 @@ def test_onboard_user(monkeypatch):
     assert new_user.id is not None
     assert new_user.name == "Test User"
     assert new_user.learning_style == dummy_style
+
+def test_aonboard_user(monkeypatch):
+    """The async onboarding path awaits the AI service and persists the user."""
+    async def fake_detect(self, answers, use_gpt=False):
+        return "Auditory"
+    monkeypatch.setattr(OpenAIService, "adetect_learning_style", fake_detect)
+    new_user = asyncio.run(UserService.aonboard_user(name="Async User", answers={"Q1": "X"}, ai_service=OpenAIService()))
+    assert new_user.id is not None
+    assert new_user.learning_style == "Auditory"
+
+def test_user_lookup_cache(monkeypatch):
+    """Created users are served from the lookup cache; unknown users are not cached."""
+    import alp.user.service as user_module
+
+    user = UserService.create_user(name="Cached", learning_style="Visual")
+    assert UserService.get_user_by_id("missing") is None
+    with monkeypatch.context() as m:
+        m.setattr(user_module, "session_scope", lambda: pytest.fail("cached lookup opened a session"))
+        assert UserService.get_user_by_id(user.id).name == "Cached"
+    UserService.invalidate_user(user.id)
+    assert UserService.get_user_by_id(user.id).learning_style == "Visual"
+
+def test_user_cache_survives_rollback():
+    """A user first looked up inside a transaction that rolls back is still usable from the cache."""
+    from alp.db.session import session_scope
+
+    user_id = UserService.create_user(name="Rollback", learning_style="Visual").id
+    UserService.clear_cache()
+    with pytest.raises(RuntimeError):
+        with session_scope() as db:
+            UserService.ensure_user(db, user_id)
+            raise RuntimeError("abort the import")
+    cached = UserService.get_user_by_id(user_id)
+    assert (cached.name, cached.learning_style) == ("Rollback", "Visual")